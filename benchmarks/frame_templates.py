@@ -0,0 +1,90 @@
+""" CPU time per frame of `ChargePoint.call` against pre-serialized templates.
+
+The charge point talks to a loopback connection answering every call at
+once, so only the simulator side is measured. Run from the repository root:
+
+    python -m benchmarks.frame_templates [frames]
+"""
+import asyncio
+import json
+import logging
+import sys
+import time
+from datetime import datetime
+
+from ocpp.v201 import call, datatypes
+
+from ocpp_simulator.cp_management import cp as Cp
+from ocpp_simulator.cp_management import templates
+
+RESPONSES = {
+    'Heartbeat': {'currentTime': '2023-01-01T00:00:00Z'},
+    'StatusNotification': {},
+    'MeterValues': {},
+}
+
+
+class LoopbackConnection:
+    """ Answers every call with the result in RESPONSES, through the charge point routing. """
+
+    def __init__(self):
+        self.cp = None
+
+    async def send(self, frame):
+        _, unique_id, action, _ = json.loads(frame)
+        response = json.dumps([3, unique_id, RESPONSES[action]], separators=(',', ':'))
+        asyncio.get_running_loop().call_soon(asyncio.ensure_future, self.cp.route_message(response))
+
+
+def meter_values_payload(value):
+    return call.MeterValuesPayload(evse_id=1, meter_value=[datatypes.MeterValueType(
+        timestamp=str(datetime.now()),
+        sampled_value=[datatypes.SampledValueType(value=value, measurand='Energy.Active.Import.Register')],
+    )])
+
+
+CASES = {
+    'Heartbeat': (
+        lambda cp, index: cp.call(call.HeartbeatPayload()),
+        lambda cp, index: cp.call_template(templates.heartbeat()),
+    ),
+    'StatusNotification': (
+        lambda cp, index: cp.call(call.StatusNotificationPayload(
+            timestamp=str(datetime.now()), connector_status='Occupied', evse_id=1, connector_id=1)),
+        lambda cp, index: cp.call_template(
+            templates.status_notification(), str(datetime.now()), 'Occupied', 1, 1),
+    ),
+    'MeterValues': (
+        lambda cp, index: cp.call(meter_values_payload(index)),
+        lambda cp, index: cp.call_template(templates.meter_values(), 1, str(datetime.now()), index),
+    ),
+}
+
+
+async def measure(send, frames: int) -> float:
+    """ Process CPU microseconds per frame. """
+    connection = LoopbackConnection()
+    cp = connection.cp = Cp.ChargePoint('BENCH', connection)
+    await send(cp, 0)
+    started_at = time.process_time()
+    for index in range(frames):
+        await send(cp, index)
+    return round((time.process_time() - started_at) / frames * 1_000_000, 2)
+
+
+async def main(frames: int):
+    results = {}
+    for action, (payload, template) in CASES.items():
+        call_us = await measure(payload, frames)
+        template_us = await measure(template, frames)
+        results[action] = {
+            'call_us': call_us,
+            'template_us': template_us,
+            'speedup': round(call_us / template_us, 2),
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    logging.getLogger('ocpp').setLevel(logging.WARNING)
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000))
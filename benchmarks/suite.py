@@ -0,0 +1,269 @@
+""" Fixed workloads run against the mock central system, to catch performance
+regressions between versions.
+
+Every workload boots a fleet of 1, 100 or 10k charge points and sends a fixed
+number of messages per charge point: heartbeats only, a MeterValues heavy mix,
+or a burst of commands from the central system. The mock central system runs
+in its own process, so the CPU time per message and the memory (RSS) are
+those of the simulator alone. Run from the repository root:
+
+    python -m benchmarks.suite [--only heartbeat] [--max-cps 100] [--output results.json]
+    python -m benchmarks.suite --baseline results.json
+    python -m benchmarks.suite --only heartbeat-10k --ws-profile lean
+
+With a baseline the run fails when a workload got slower, more CPU or memory
+hungry than the baseline by more than the tolerance.
+"""
+import argparse
+import asyncio
+import importlib.metadata
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import socket
+import sys
+import time
+from collections import namedtuple
+from datetime import datetime
+
+from ocpp_simulator.cp_management import mock_csms
+from ocpp_simulator.cp_management import templates
+from ocpp_simulator.cp_management.connection import PROFILES as CONNECTION_PROFILES
+from ocpp_simulator.cp_management.fleet import Fleet
+from ocpp_simulator.cp_management.histogram import Histogram, LatencyRecorder
+from ocpp_simulator.cp_management.meter import MEASURANDS
+from ocpp_simulator.cp_management.metrics import rss_kb
+
+# `messages` is the number of messages per charge point
+Workload = namedtuple('Workload', ['name', 'kind', 'cps', 'messages'])
+
+WORKLOADS = (
+    Workload('heartbeat-1', 'heartbeat', 1, 5000),
+    Workload('heartbeat-100', 'heartbeat', 100, 100),
+    Workload('heartbeat-10k', 'heartbeat', 10000, 2),
+    Workload('meter-mix-1', 'meter-mix', 1, 5000),
+    Workload('meter-mix-100', 'meter-mix', 100, 100),
+    Workload('meter-mix-10k', 'meter-mix', 10000, 2),
+    Workload('command-burst-1', 'command-burst', 1, 2000),
+    Workload('command-burst-100', 'command-burst', 100, 50),
+    Workload('command-burst-10k', 'command-burst', 10000, 1),
+)
+
+# Higher is better for the first one, lower for the others
+COMPARED = ('msgs_per_s', 'p99_ms', 'cpu_us_per_msg', 'rss_mb')
+
+# Commands of the burst, sent in turn by the central system
+COMMANDS = (
+    mock_csms.ChargePoint.send_reset,
+    mock_csms.ChargePoint.send_data_transfer,
+    mock_csms.ChargePoint.send_get_base_report,
+    mock_csms.ChargePoint.send_set_variables,
+)
+
+
+def rss_mb() -> float:
+    return round(rss_kb() / 1024, 1)
+
+
+def free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+async def _burst(messages: int):
+    """ `messages` commands to every connected charge point, all charge points
+    at once. Returns how many were sent, the seconds it took and their latency.
+    """
+    latencies = Histogram()
+
+    async def command(cs):
+        for index in range(messages):
+            started_at = time.perf_counter()
+            await COMMANDS[index % len(COMMANDS)](cs)
+            latencies.record((time.perf_counter() - started_at) * 1_000_000)
+
+    charge_points = list(mock_csms.connections)
+    started_at = time.perf_counter()
+    await asyncio.gather(*(command(cs) for cs in charge_points))
+    return len(charge_points) * messages, time.perf_counter() - started_at, latencies.to_dict()
+
+
+async def _serve_csms(port: int, seed: int, pipe):
+    mock_csms.raise_open_files_limit()
+    mock_csms.fake.seed_instance(seed)
+    server = await mock_csms.start_central_system('127.0.0.1', port, backlog=4096)
+    pipe.send('ready')
+    loop = asyncio.get_running_loop()
+    # Every request is the number of burst commands per charge point, None to stop
+    while (messages := await loop.run_in_executor(None, pipe.recv)) is not None:
+        pipe.send(await _burst(messages))
+    server.close()
+    await server.wait_closed()
+
+
+def serve_csms(port: int, seed: int, pipe):
+    logging.getLogger().setLevel(logging.WARNING)
+    asyncio.run(_serve_csms(port, seed, pipe))
+
+
+async def _heartbeats(cp, messages: int):
+    template = templates.heartbeat()
+    for _ in range(messages):
+        await cp.call_template(template)
+
+
+async def _meter_mix(cp, messages: int):
+    """ Out of every 10 messages, 8 MeterValues, a StatusNotification and a Heartbeat. """
+    meter_values = templates.meter_values(MEASURANDS)
+    status_notification = templates.status_notification()
+    heartbeat = templates.heartbeat()
+    for index in range(messages):
+        step = index % 10
+        if step < 8:
+            await cp.call_template(meter_values, 1, str(datetime.now()), 1000 + index, 7400, 32, 230)
+        elif step == 8:
+            await cp.call_template(status_notification, str(datetime.now()), 'Occupied', 1, 1)
+        else:
+            await cp.call_template(heartbeat)
+
+
+SENDERS = {'heartbeat': _heartbeats, 'meter-mix': _meter_mix}
+
+
+async def run_workload(workload: Workload, url: str, pipe, seed: int, ws_profile: str = 'default') -> dict:
+    loop = asyncio.get_running_loop()
+    rss_before = rss_mb()
+    fleet = Fleet(url, workload.cps, id_pattern='BENCH{:05d}', seed=seed, reconnect=False,
+                  connection=CONNECTION_PROFILES[ws_profile])
+    await fleet.start()
+    # Only the messages of the workload are measured
+    await fleet.heartbeats.stop()
+    latencies = LatencyRecorder()
+    for cp in fleet.charge_points.values():
+        cp.latencies = latencies
+    rss_connected = rss_mb()
+
+    cpu_started_at = time.process_time()
+    started_at = time.perf_counter()
+    if workload.kind == 'command-burst':
+        pipe.send(workload.messages)
+        messages, seconds, histogram = await loop.run_in_executor(None, pipe.recv)
+        histogram = Histogram.from_dict(histogram)
+        failed = 0
+    else:
+        send = SENDERS[workload.kind]
+        results = await asyncio.gather(*(send(cp, workload.messages) for cp in fleet.charge_points.values()),
+                                       return_exceptions=True)
+        seconds = time.perf_counter() - started_at
+        histogram = Histogram()
+        for action_histogram in latencies.histograms.values():
+            histogram.merge(action_histogram)
+        messages = histogram.count
+        failed = sum(isinstance(result, BaseException) for result in results)
+    cpu = time.process_time() - cpu_started_at
+    await fleet.stop()
+
+    return {
+        'cps': workload.cps,
+        'connected': fleet.summary['connected'],
+        'messages': messages,
+        'failed_cps': failed,
+        'seconds': round(seconds, 3),
+        'msgs_per_s': round(messages / seconds, 1) if seconds else 0,
+        'p50_ms': histogram.percentile(50) / 1000,
+        'p99_ms': histogram.percentile(99) / 1000,
+        'max_ms': histogram.max / 1000,
+        'cpu_us_per_msg': round(cpu / messages * 1_000_000, 2) if messages else 0,
+        'rss_mb': rss_connected,
+        'rss_kb_per_cp': round((rss_connected - rss_before) * 1024 / workload.cps, 1),
+    }
+
+
+def environment() -> dict:
+    return {
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'ocpp': importlib.metadata.version('ocpp'),
+        'websockets': importlib.metadata.version('websockets'),
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float):
+    """ Regressions of `results` against `baseline`, as readable strings. """
+    regressions = []
+    for name, result in results['workloads'].items():
+        previous = baseline.get('workloads', {}).get(name)
+        if previous is None:
+            continue
+        for metric in COMPARED:
+            before, after = previous.get(metric), result.get(metric)
+            if not before or after is None:
+                continue
+            change = after / before - 1
+            worse = change < -tolerance if metric == 'msgs_per_s' else change > tolerance
+            if worse:
+                regressions.append(f'{name}: {metric} {before} -> {after} ({change:+.0%})')
+    return regressions
+
+
+async def run(workloads, seed: int, ws_profile: str = 'default') -> dict:
+    mock_csms.raise_open_files_limit()
+    port = free_port()
+    pipe, csms_pipe = multiprocessing.Pipe()
+    csms = multiprocessing.Process(target=serve_csms, args=(port, seed, csms_pipe), daemon=True)
+    csms.start()
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, pipe.recv)
+    results = {'environment': environment(), 'seed': seed, 'ws_profile': ws_profile, 'workloads': {}}
+    try:
+        for workload in workloads:
+            print(f'{workload.name}...', file=sys.stderr)
+            url = f'127.0.0.1:{port}'
+            results['workloads'][workload.name] = await run_workload(workload, url, pipe, seed, ws_profile)
+    finally:
+        pipe.send(None)
+        await loop.run_in_executor(None, csms.join, 10)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the benchmark workloads against the mock central system.')
+    parser.add_argument('--only', action='append', help='Run the workloads whose name contains this, repeatable')
+    parser.add_argument('--max-cps', type=int, help='Skip the workloads with more charge points')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--ws-profile', choices=sorted(CONNECTION_PROFILES), default='default',
+                        help='Websocket buffers of the charge points')
+    parser.add_argument('--output', help='File the JSON results are written to, standard output by default')
+    parser.add_argument('--baseline', help='JSON results of a previous run to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='Relative change allowed by the comparison')
+    options = parser.parse_args()
+
+    workloads = [
+        workload for workload in WORKLOADS
+        if (not options.only or any(only in workload.name for only in options.only))
+        and (options.max_cps is None or workload.cps <= options.max_cps)
+    ]
+    logging.getLogger().setLevel(logging.WARNING)
+    results = asyncio.run(run(workloads, options.seed, options.ws_profile))
+
+    if options.output:
+        with open(options.output, 'w', encoding='utf-8') as output:
+            json.dump(results, output, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+    if options.baseline:
+        with open(options.baseline, 'r', encoding='utf-8') as baseline_file:
+            regressions = compare(results, json.load(baseline_file), options.tolerance)
+        for regression in regressions:
+            print(f'Regression: {regression}', file=sys.stderr)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
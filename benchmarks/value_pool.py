@@ -0,0 +1,51 @@
+""" CPU time per message field value of Faker and uuid4, the former source
+of the random field values, against the seeded `ValuePool`. Run from the
+repository root:
+
+    python -m benchmarks.value_pool [values]
+"""
+import json
+import sys
+import time
+import uuid
+
+from faker import Faker
+
+from ocpp_simulator.cp_management.pool import ValuePool
+
+fake = Faker()
+pool = ValuePool(seed=1)
+
+CASES = {
+    'string': (lambda: fake.pystr(1, 12), lambda: pool.string(1, 12)),
+    'integer': (fake.random_int, pool.integer),
+    'decimal': (lambda: float(fake.pydecimal(right_digits=2, min_value=0, max_value=100)), pool.decimal),
+    'uuid': (lambda: str(uuid.uuid4()), pool.uuid),
+    'url': (fake.url, pool.url),
+}
+
+
+def measure(draw, values: int) -> float:
+    """ Process CPU microseconds per value. """
+    draw()
+    started_at = time.process_time()
+    for _ in range(values):
+        draw()
+    return round((time.process_time() - started_at) / values * 1_000_000, 3)
+
+
+def main(values: int):
+    results = {}
+    for kind, (faker, value_pool) in CASES.items():
+        faker_us = measure(faker, values)
+        pool_us = measure(value_pool, values)
+        results[kind] = {
+            'faker_us': faker_us,
+            'pool_us': pool_us,
+            'speedup': round(faker_us / pool_us, 1),
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -1,27 +1,71 @@
 import asyncio
+import json
+import logging
+from datetime import datetime
+from typing import List, Optional
+
 import typer
 import questionary
 import websockets
 
 from cp_management import cp as Cp  # noqa
+from cp_management import mock_csms  # noqa
+from cp_management.config import FleetConfig  # noqa
+from cp_management.connection import PROFILES as CONNECTION_PROFILES, ConnectionSettings  # noqa
+from cp_management.fleet import BOOT_PROFILE, Fleet  # noqa
+from cp_management.faults import FaultPlan  # noqa
+from cp_management.heartbeat import HeartbeatScheduler  # noqa
+from cp_management.load import PROFILES, build_profile  # noqa
+from cp_management.metrics import start_metrics_server  # noqa
+from cp_management.providers import FixedProvider, RandomProvider  # noqa
+from cp_management.replay import TrafficReplayer  # noqa
+from cp_management.responses import ResponsePolicies  # noqa
+from cp_management.scenario import load_scenario, run_scenario  # noqa
+from cp_management.sharding import run_sharded  # noqa
+from cp_management.validation import MODES as VALIDATION_MODES  # noqa
 
 app = typer.Typer()
 
+heartbeats = HeartbeatScheduler()
+
+# Websocket buffer options of every command opening websockets
+WS_PROFILE = typer.Option('default', help="Websocket buffers: default (those of the websockets library) or lean")
+WS_MAX_SIZE = typer.Option(None, help="Largest websocket message in bytes, instead of the one of the profile")
+WS_MAX_QUEUE = typer.Option(None, help="Websocket messages waiting to be read, instead of those of the profile")
+WS_READ_LIMIT = typer.Option(None, help="Bytes read from a socket at once, instead of those of the profile")
+WS_WRITE_LIMIT = typer.Option(None, help="Bytes waiting to be written, instead of those of the profile")
+WS_COMPRESSION = typer.Option(None, '--compression/--no-compression',
+                              help="permessage-deflate, instead of the setting of the profile")
+
+
+def connection_settings(profile: str, max_size: Optional[int], max_queue: Optional[int], read_limit: Optional[int],
+                        write_limit: Optional[int], compression: Optional[bool]) -> ConnectionSettings:
+    if profile not in CONNECTION_PROFILES:
+        raise typer.BadParameter(f"--ws-profile must be one of {', '.join(CONNECTION_PROFILES)}")
+    return CONNECTION_PROFILES[profile].replace(max_size=max_size, max_queue=max_queue, read_limit=read_limit,
+                                                write_limit=write_limit, compression=compression)
 
-async def connect_cp_to_central_system(url_websocket_address: str, cp_serial_number: str) -> Cp.ChargePoint:
+
+async def connect_cp_to_central_system(url_websocket_address: str, cp_serial_number: str,
+                                       connection: ConnectionSettings = None, boot: bool = True) -> Cp.ChargePoint:
     # Connect to central system
     ws = await websockets.connect(
         f'ws://{url_websocket_address}/{cp_serial_number}',
-        subprotocols=['ocpp2.0.1']
+        subprotocols=['ocpp2.0.1'],
+        **(connection or ConnectionSettings()).options()
     )
     cp = Cp.ChargePoint(cp_serial_number, ws)
     loop = asyncio.get_event_loop()
     loop.create_task(cp.start())
+    if not boot:
+        return cp
 
     # Boot notification
     typer.secho('Boot notification', fg=typer.colors.BRIGHT_GREEN, bold=True)
     message = await cp.send_boot_notification()
     typer.echo(message)
+    if message is not None and message.status == 'Accepted':
+        heartbeats.add(cp, message.interval)
 
     # Status notification
     typer.secho('Status notification', fg=typer.colors.BRIGHT_GREEN, bold=True)
@@ -31,13 +75,40 @@ async def connect_cp_to_central_system(url_websocket_address: str, cp_serial_num
     return cp
 
 
+def report(summary, latencies, latency_dump: Optional[str] = None):
+    if summary.get('connections_rss_kb') and summary.get('connected'):
+        summary['rss_kb_per_connection'] = round(summary['connections_rss_kb'] / summary['connected'], 1)
+    typer.echo(json.dumps({'summary': summary, 'latencies': latencies.summary()}, indent=2))
+    if latency_dump:
+        with open(latency_dump, 'w', encoding='utf-8') as dump:
+            json.dump(latencies.to_dict(), dump)
+
+
 async def send_message(cp, message: str):
     response = await cp.messages[message](cp)
     typer.echo(response)
 
 
+def load_responses(path: str) -> ResponsePolicies:
+    try:
+        return ResponsePolicies.from_file(path)
+    except ValueError as error:
+        raise typer.BadParameter(f"--responses: {error}")
+
+
 @app.command()
-def start():
+def start(
+    scenario: Optional[str] = typer.Option(
+        None, help="JSON or YAML scenario the charge point plays instead of the interactive menu"),
+    ws_profile: str = WS_PROFILE,
+    max_size: Optional[int] = WS_MAX_SIZE,
+    max_queue: Optional[int] = WS_MAX_QUEUE,
+    read_limit: Optional[int] = WS_READ_LIMIT,
+    write_limit: Optional[int] = WS_WRITE_LIMIT,
+    compression: Optional[bool] = WS_COMPRESSION,
+):
+    connection = connection_settings(ws_profile, max_size, max_queue, read_limit, write_limit, compression)
+
     async def _start():
         # Program initialization
         program_continue = typer.confirm("You have just started Charge Point simulator, do you want to continue")
@@ -48,8 +119,15 @@ def start():
         cp_serial_number = typer.prompt("Enter charge point serial number")
         central_system_url = typer.prompt("Enter central system URL")
 
+        # Play the scenario, which boots the charge point itself, fields without a fixed value are asked for
+        if scenario is not None:
+            cp = await connect_cp_to_central_system(central_system_url, cp_serial_number, connection, boot=False)
+            for response in await run_scenario(cp, load_scenario(scenario, Cp.PromptProvider())):
+                typer.echo(response)
+            return
+
         # Connect to charge point
-        cp = await connect_cp_to_central_system(central_system_url, cp_serial_number)
+        cp = await connect_cp_to_central_system(central_system_url, cp_serial_number, connection)
 
         answer = await questionary.select(
             "What action do you want to perform: ",
@@ -79,5 +157,212 @@ def start():
     asyncio.run(_start())
 
 
+@app.command()
+def fleet(  # pylint: disable=too-many-locals
+    url: str = typer.Option(..., help="Central system URL"),
+    count: int = typer.Option(100, help="Number of charge points to simulate"),
+    id_pattern: str = typer.Option('CP{:05d}', help="Charge point ID pattern, formatted with the CP index"),
+    first_id: int = typer.Option(0, help="Index of the first charge point"),
+    concurrency: int = typer.Option(500, help="Maximum number of websocket handshakes in progress"),
+    connect_rate: Optional[float] = typer.Option(None, help="Maximum number of websocket handshakes per second"),
+    duration: Optional[float] = typer.Option(
+        None, help="Simulated seconds to keep the fleet running, forever if not given"),
+    workers: int = typer.Option(1, help="Number of worker processes the charge points are split across"),
+    profile: Optional[str] = typer.Option(None, help="JSON file with fixed message field values"),
+    scenario: Optional[str] = typer.Option(None, help="JSON or YAML scenario every charge point plays"),
+    load_rate: Optional[float] = typer.Option(None, help="Open loop target rate in messages per second"),
+    load_action: str = typer.Option('MeterValues', help="OCPP action sent by the open loop load"),
+    load_profile: str = typer.Option('constant', help=f"Load rate profile: {', '.join(PROFILES)}"),
+    load_ramp: float = typer.Option(0, help="Seconds of the linear ramp, or of the spike"),
+    load_steps: int = typer.Option(5, help="Number of stairs of the step profile"),
+    load_peak: Optional[float] = typer.Option(None, help="Peak rate of the spike profile, twice the rate by default"),
+    latency_dump: Optional[str] = typer.Option(None, help="File the raw, mergeable latency histograms are dumped to"),
+    metrics_port: Optional[int] = typer.Option(None, help="Serve Prometheus metrics on this local port"),
+    seed: Optional[int] = typer.Option(None, help="Seed of the random message field values"),
+    meter_interval: Optional[float] = typer.Option(None, help="Seconds between meter samples of charging EVSEs"),
+    meter_samples: int = typer.Option(1, help="Meter samples packed per MeterValues message"),
+    transaction_interval: Optional[float] = typer.Option(
+        None, help="Run transactions, with an Updated event at this interval in seconds"),
+    session_duration: float = typer.Option(3600, help="Mean seconds of a transaction"),
+    idle_duration: float = typer.Option(600, help="Mean seconds between two transactions"),
+    connectors: str = typer.Option('1', help="Connectors of every EVSE of a charge point, comma separated"),
+    reconnect: bool = typer.Option(True, help="Open lost websockets again, with exponential backoff"),
+    backoff_max: float = typer.Option(60, help="Longest delay in seconds between two reconnection attempts"),
+    offline_queue: Optional[str] = typer.Option(
+        None, help="Log file keeping the transaction events and meter values sent while offline"),
+    replay_rate: float = typer.Option(20, help="Messages per second a charge point replays once back online"),
+    record: Optional[str] = typer.Option(None, help="Log file capturing every frame sent and received"),
+    clock_speed: float = typer.Option(
+        1, help="Simulated seconds per second, 0 to jump from event to event as fast as possible"),
+    clock_start: Optional[str] = typer.Option(None, help="ISO date and time the simulated clock starts at"),
+    validation: str = typer.Option('always', help="JSON schema validation of the messages: always, sampled or off"),
+    validation_every: int = typer.Option(100, help="Messages per action for one validated when sampled"),
+    responses: Optional[str] = typer.Option(
+        None, help="JSON or YAML file with the accept, reject and error ratios and delay of the replies per action"),
+    faults: Optional[str] = typer.Option(
+        None, help="JSON or YAML file with the share of the frames dropped, delayed, reordered, duplicated or "
+                   "corrupted and of the connections killed, by default, per charge point and per action"),
+    ws_profile: str = WS_PROFILE,
+    max_size: Optional[int] = WS_MAX_SIZE,
+    max_queue: Optional[int] = WS_MAX_QUEUE,
+    read_limit: Optional[int] = WS_READ_LIMIT,
+    write_limit: Optional[int] = WS_WRITE_LIMIT,
+    compression: Optional[bool] = WS_COMPRESSION,
+):
+    # Logging every single frame of thousands of charge points is not an option
+    logging.getLogger('ocpp').setLevel(logging.WARNING)
+    provider = FixedProvider.from_file(profile, FixedProvider(BOOT_PROFILE, RandomProvider(seed))) if profile else None
+    try:
+        layout = [int(count) for count in connectors.split(',')]
+    except ValueError:
+        layout = []
+    if not layout or min(layout) < 1:
+        raise typer.BadParameter("--connectors must be comma separated positive integers, e.g. 2,1")
+    connection = connection_settings(ws_profile, max_size, max_queue, read_limit, write_limit, compression)
+    if validation not in VALIDATION_MODES:
+        raise typer.BadParameter(f"--validation must be one of {', '.join(VALIDATION_MODES)}")
+    try:
+        start_time = datetime.fromisoformat(clock_start) if clock_start else None
+    except ValueError:
+        raise typer.BadParameter("--clock-start must be an ISO date and time, e.g. 2024-01-01T08:00:00") from None
+    if responses:
+        # Checked here rather than in every worker
+        load_responses(responses)
+    if faults:
+        try:
+            FaultPlan.from_file(faults)
+        except ValueError as error:
+            raise typer.BadParameter(f"--faults: {error}")
+    compiled_scenario = load_scenario(scenario, provider or RandomProvider(seed)) if scenario else None
+    rate_profile = None
+    if load_action not in Cp.ChargePoint.actions:
+        raise typer.BadParameter(f"--load-action must be one of {', '.join(Cp.ChargePoint.actions)}")
+    if load_rate is not None:
+        if duration is None:
+            raise typer.BadParameter("An open loop load needs a --duration")
+        if clock_speed != 1:
+            raise typer.BadParameter("An open loop load runs on the wall clock, it needs a --clock-speed of 1")
+        rate_profile = build_profile(load_profile, load_rate, duration, load_ramp, load_steps, load_peak)
+
+    config = FleetConfig(
+        id_pattern=id_pattern, first_id=first_id, concurrency=concurrency, connect_rate=connect_rate,
+        provider=provider, scenario=compiled_scenario, layout=layout, load_action=load_action,
+        load_profile=rate_profile, metrics_port=metrics_port, seed=seed, meter_interval=meter_interval,
+        meter_samples=meter_samples, transaction_interval=transaction_interval, session_duration=session_duration,
+        idle_duration=idle_duration, reconnect=reconnect, backoff_max=backoff_max, offline_queue=offline_queue,
+        replay_rate=replay_rate, record=record, clock_speed=clock_speed, clock_start=start_time,
+        validation=validation, validation_every=validation_every, responses=responses, faults=faults,
+        connection=connection,
+    )
+
+    if workers > 1:
+        summary, latencies = run_sharded(url, count, config, workers=workers, duration=duration)
+        report(summary, latencies, latency_dump)
+        return
+
+    cp_fleet = Fleet(url, count, config)
+    try:
+        asyncio.run(cp_fleet.run(duration))
+    except KeyboardInterrupt:
+        pass
+    report(cp_fleet.summary, cp_fleet.latencies, latency_dump)
+
+
+@app.command()
+def replay(
+    logs: List[str] = typer.Argument(..., help="Logs recorded by fleet --record, merged in time order"),
+    url: str = typer.Option(..., help="Central system URL"),
+    speed: float = typer.Option(1, help="Times faster than recorded, 0 for as fast as possible"),
+    max_in_flight: int = typer.Option(1000, help="Maximum number of calls waiting for their response"),
+    concurrency: int = typer.Option(500, help="Maximum number of websocket handshakes in progress"),
+    latency_dump: Optional[str] = typer.Option(None, help="File the raw, mergeable latency histograms are dumped to"),
+):
+    """ Send the calls of recorded charge points again. """
+    logging.getLogger('ocpp').setLevel(logging.WARNING)
+    replayer = TrafficReplayer(logs, url, speed=speed, max_in_flight=max_in_flight, concurrency=concurrency)
+    try:
+        asyncio.run(replayer.run())
+    except KeyboardInterrupt:
+        pass
+    report(replayer.report, replayer.latencies, latency_dump)
+
+
+@app.command()
+def serve(
+    host: str = typer.Option('0.0.0.0', help="Address central systems connect to"),  # nosec
+    port: int = typer.Option(9000, help="Port central systems connect to"),
+    backlog: int = typer.Option(100, help="Connections waiting to be accepted"),
+    metrics_port: Optional[int] = typer.Option(None, help="Serve Prometheus metrics on this local port"),
+    responses: Optional[str] = typer.Option(
+        None, help="JSON or YAML file with the accept, reject and error ratios and delay of the replies per action"),
+    ws_profile: str = WS_PROFILE,
+    max_size: Optional[int] = WS_MAX_SIZE,
+    max_queue: Optional[int] = WS_MAX_QUEUE,
+    read_limit: Optional[int] = WS_READ_LIMIT,
+    write_limit: Optional[int] = WS_WRITE_LIMIT,
+    compression: Optional[bool] = WS_COMPRESSION,
+):
+    """ Charge points answering the central systems that connect to them. """
+    connection = connection_settings(ws_profile, max_size, max_queue, read_limit, write_limit, compression)
+    if responses:
+        Cp.ChargePoint.responses = load_responses(responses)
+
+    async def _serve():
+        server = await Cp.start_cp(host, port, backlog, connection=connection)
+        if metrics_port is not None:
+            await start_metrics_server(Cp.ChargePoint.metrics, port=metrics_port)
+        await server.wait_closed()
+
+    logging.getLogger('ocpp').setLevel(logging.WARNING)
+    try:
+        asyncio.run(_serve())
+    except KeyboardInterrupt:
+        pass
+
+
+@app.command()
+def csms(
+    host: str = typer.Option('0.0.0.0', help="Address charge points connect to"),  # nosec
+    port: int = typer.Option(9000, help="Port charge points connect to"),
+    backlog: int = typer.Option(1024, help="Connections waiting to be accepted"),
+    latency: str = typer.Option('0', help="Response latency in ms: N, uniform:LOW:HIGH, exp:MEAN or "
+                                          "lognormal:MEDIAN:SIGMA"),
+    error_rate: float = typer.Option(0, help="Share of the calls answered with an InternalError"),
+    behaviour: Optional[str] = typer.Option(None, help="JSON or YAML file with the latency and error rate per action"),
+    seed: Optional[int] = typer.Option(None, help="Seed of the latencies and injected errors"),
+    ws_profile: str = WS_PROFILE,
+    max_size: Optional[int] = WS_MAX_SIZE,
+    max_queue: Optional[int] = WS_MAX_QUEUE,
+    read_limit: Optional[int] = WS_READ_LIMIT,
+    write_limit: Optional[int] = WS_WRITE_LIMIT,
+    compression: Optional[bool] = WS_COMPRESSION,
+):
+    """ Mock central system answering every charge point that connects. """
+    connection = connection_settings(ws_profile, max_size, max_queue, read_limit, write_limit, compression)
+    try:
+        if behaviour:
+            csms_behaviour = mock_csms.MockBehaviour.from_file(behaviour, seed=seed)
+        else:
+            csms_behaviour = mock_csms.MockBehaviour(latency, error_rate, seed=seed)
+    except ValueError as error:
+        raise typer.BadParameter(f"{error}, expected latencies in ms as N, uniform:LOW:HIGH, exp:MEAN or "
+                                 f"lognormal:MEDIAN:SIGMA") from None
+
+    async def _csms():
+        server = await mock_csms.start_central_system(host, port, backlog, behaviour=csms_behaviour,
+                                                      connection=connection)
+        await server.wait_closed()
+
+    typer.echo(f'Up to {mock_csms.raise_open_files_limit()} open files')
+    # Nor logging every frame and every connection of thousands of charge points
+    logging.getLogger('ocpp').setLevel(logging.WARNING)
+    logging.getLogger('websockets').setLevel(logging.WARNING)
+    try:
+        asyncio.run(_csms())
+    except KeyboardInterrupt:
+        pass
+    typer.echo(json.dumps(dict(csms_behaviour.report), indent=2))
+
+
 if __name__ == '__main__':
-    typer.run(start)
+    app()
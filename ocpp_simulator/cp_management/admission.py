@@ -0,0 +1,56 @@
+import asyncio
+import time
+from collections import Counter
+
+import websockets.exceptions
+
+from .histogram import LatencyRecorder
+
+# Latencies of the websocket handshakes are recorded under this name
+HANDSHAKE = 'Handshake'
+
+
+class AdmissionController:
+    """ Gate every websocket handshake of a fleet goes through.
+
+    Handshakes start at most `rate` per second, evenly spaced, and at most
+    `concurrency` of them are in progress at once. Their latency is recorded
+    in `latencies` and the failed ones are counted by error type in `report`.
+    """
+
+    def __init__(self, rate: float = None, concurrency: int = 500, latencies: LatencyRecorder = None,
+                 timeout: float = 10):
+        self.rate = rate
+        self.concurrency = concurrency
+        self.latencies = latencies or LatencyRecorder()
+        self.timeout = timeout
+        self.report = Counter()
+        self._next_at = 0
+        # Created on first use, inside the event loop
+        self._semaphore = None
+
+    async def _admit(self):
+        if not self.rate:
+            return
+        now = asyncio.get_running_loop().time()
+        admitted_at = max(now, self._next_at)
+        self._next_at = admitted_at + 1 / self.rate
+        if admitted_at > now:
+            await asyncio.sleep(admitted_at - now)
+
+    async def connect(self, uri: str, **kwargs):
+        """ `websockets.connect(uri, **kwargs)` once admitted. """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        await self._admit()
+        async with self._semaphore:
+            started_at = time.perf_counter()
+            try:
+                ws = await websockets.connect(uri, open_timeout=self.timeout, **kwargs)
+            except (OSError, asyncio.TimeoutError, websockets.exceptions.WebSocketException) as error:
+                self.report['handshakes_failed'] += 1
+                self.report[f'handshakes_failed_{error.__class__.__name__}'] += 1
+                raise
+        self.latencies.record(HANDSHAKE, time.perf_counter() - started_at)
+        self.report['handshakes'] += 1
+        return ws
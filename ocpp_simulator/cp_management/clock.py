@@ -0,0 +1,179 @@
+import asyncio
+import heapq
+import itertools
+from datetime import datetime, timedelta
+
+
+class Clock:
+    """ Time of the simulation, the wall clock itself.
+
+    Timestamps of the messages come from `now`, and everything paced by the
+    simulation (heartbeats, meter ticks, transactions) is scheduled in
+    `time` seconds with `call_at` and `sleep`, so another clock makes the
+    same simulation run faster. Tasks started by timers are handed to
+    `track`, for clocks that need to know when the simulation is idle.
+    """
+
+    speed = 1
+
+    def time(self) -> float:
+        return asyncio.get_running_loop().time()
+
+    def now(self) -> datetime:
+        return datetime.now()
+
+    def timestamp(self) -> str:
+        return str(self.now())
+
+    def call_at(self, when: float, callback, *args):
+        """ Call `callback(*args)` at `time()` `when`, the returned handle has `when()` and `cancel()`. """
+        return asyncio.get_running_loop().call_at(when, callback, *args)
+
+    async def sleep(self, seconds: float):
+        await asyncio.sleep(seconds)
+
+    def track(self, task):
+        return task
+
+    async def stop(self):
+        pass
+
+
+class _Timer:
+    __slots__ = ('_when', 'callback', 'args', 'handle', 'cancelled')
+
+    def __init__(self, when: float, callback, args):
+        self._when = when
+        self.callback = callback
+        self.args = args
+        self.handle = None
+        self.cancelled = False
+
+    def when(self) -> float:
+        return self._when
+
+    def cancel(self):
+        self.cancelled = True
+        if self.handle is not None:
+            self.handle.cancel()
+
+
+class ScaledClock(Clock):
+    """ Simulated time running `speed` times faster than the wall clock, from `start`. """
+
+    def __init__(self, speed: float = 60, start: datetime = None):
+        self.speed = speed
+        self.start = start or datetime.now()
+        # Loop time of the simulation start, taken on first use
+        self._origin = None
+
+    def _loop_time(self) -> float:
+        loop_time = asyncio.get_running_loop().time()
+        if self._origin is None:
+            self._origin = loop_time
+        return loop_time
+
+    def time(self) -> float:
+        return (self._loop_time() - self._origin) * self.speed
+
+    def now(self) -> datetime:
+        return self.start + timedelta(seconds=self.time())
+
+    def call_at(self, when: float, callback, *args):
+        self._loop_time()
+        timer = _Timer(when, callback, args)
+        timer.handle = asyncio.get_running_loop().call_at(self._origin + when / self.speed, callback, *args)
+        return timer
+
+    async def sleep(self, seconds: float):
+        await asyncio.sleep(seconds / self.speed)
+
+
+def _wake(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class DiscreteClock(Clock):
+    """ Discrete-event time, running as fast as the simulation allows.
+
+    Timers are kept in a heap and time jumps from one to the next. All the
+    timers due within `lookahead` seconds fire together, then time waits for
+    the tasks they started (see `track`) to be done before moving on: charge
+    points keep sending concurrently, and time never runs away from the
+    central system.
+    """
+
+    speed = 0
+
+    def __init__(self, start: datetime = None, lookahead: float = 1):
+        self.start = start or datetime.now()
+        self.lookahead = lookahead
+        self._now = 0.0
+        self._heap = []
+        self._sequence = itertools.count()
+        self._busy = set()
+        self._runner = None
+
+    def time(self) -> float:
+        return self._now
+
+    def now(self) -> datetime:
+        return self.start + timedelta(seconds=self._now)
+
+    def call_at(self, when: float, callback, *args):
+        timer = _Timer(max(when, self._now), callback, args)
+        heapq.heappush(self._heap, (timer.when(), next(self._sequence), timer))
+        if self._runner is None:
+            self._runner = asyncio.ensure_future(self._run())
+        return timer
+
+    async def sleep(self, seconds: float):
+        future = asyncio.get_running_loop().create_future()
+        timer = self.call_at(self._now + seconds, _wake, future)
+        try:
+            await future
+        finally:
+            timer.cancel()
+
+    def track(self, task):
+        self._busy.add(task)
+        task.add_done_callback(self._busy.discard)
+        return task
+
+    async def _run(self):
+        heap = self._heap
+        try:
+            while heap:
+                # Let the work of the last timers start, then wait for it
+                await asyncio.sleep(0)
+                if self._busy:
+                    await asyncio.wait(list(self._busy))
+                    continue
+                horizon = heap[0][0] + self.lookahead
+                while heap and heap[0][0] <= horizon:
+                    when, _, timer = heapq.heappop(heap)
+                    if timer.cancelled:
+                        continue
+                    self._now = max(self._now, when)
+                    timer.callback(*timer.args)
+                    if timer.callback is _wake:
+                        # The sleeper runs before time moves on
+                        break
+        finally:
+            self._runner = None
+
+    async def stop(self):
+        self._heap.clear()
+        if self._runner is not None:
+            self._runner.cancel()
+            await asyncio.gather(self._runner, return_exceptions=True)
+
+
+def make_clock(speed: float = 1, start: datetime = None) -> Clock:
+    """ Wall clock at speed 1, a scaled clock above, a discrete-event clock at speed 0. """
+    if speed == 0:
+        return DiscreteClock(start)
+    if speed == 1 and start is None:
+        return Clock()
+    return ScaledClock(speed, start)
@@ -0,0 +1,95 @@
+from .connection import ConnectionSettings
+from .validation import ALWAYS
+
+
+class FleetConfig:
+    """ Everything a fleet is run with but its central system and size, built
+    once by the command line and handed as is to every fleet and worker.
+
+    Charge points get their ID from `id_pattern`, formatted with their index
+    from `first_id`, and their field values from `provider`. Up to
+    `concurrency` handshakes are in progress at a time, started at most
+    `connect_rate` per second. Every charge point boots and reports the status
+    of every connector of its `layout` (connectors of every EVSE), or plays
+    `scenario`. With a `load_profile` the fleet also sends `load_action` open
+    loop at that rate. `metrics_port` serves Prometheus metrics and `seed`
+    makes the random values reproducible.
+
+    With a `meter_interval` every booted charge point charges on its EVSEs and
+    streams meter values, `meter_samples` samples per payload. With a
+    `transaction_interval` the EVSEs rather go through transactions of about
+    `session_duration` seconds, sending Updated events at that interval, with
+    idle times of about `idle_duration` seconds in between.
+
+    Lost websockets are opened again when `reconnect`, after a random delay of
+    up to `backoff_base` seconds, doubled after every failed attempt up to
+    `backoff_max`. With an `offline_queue` log file, the transaction events and
+    meter values of the charge points waiting for it are kept there and
+    replayed in order, `replay_rate` per second, once they are back. With a
+    `record` log file every frame the charge points send and receive is
+    captured there, to be replayed later.
+
+    Timestamps, heartbeats, meter ticks, transactions, scenarios and the run
+    duration follow a simulated clock running `clock_speed` times faster than
+    the wall clock from `clock_start`, or with a `clock_speed` of 0 jumping
+    from event to event as fast as the central system answers.
+
+    The JSON schemas validate the calls and responses according to
+    `validation`: always, one in `validation_every` per action when sampled,
+    or off. With a `responses` policy file the charge points reject, fail or
+    delay some of their replies, with a `faults` plan file the frames they send
+    are dropped, delayed, reordered, duplicated or corrupted, and their
+    connections killed, on purpose. The websockets are opened with the
+    buffers of `connection`.
+    """
+
+    # Every setting and its default
+    DEFAULTS = {
+        'id_pattern': 'CP{:05d}',
+        'first_id': 0,
+        'concurrency': 500,
+        'connect_rate': None,
+        'response_timeout': 30,
+        'provider': None,
+        'scenario': None,
+        'layout': (1,),
+        'load_action': 'MeterValues',
+        'load_profile': None,
+        'metrics_port': None,
+        'seed': None,
+        'meter_interval': None,
+        'meter_samples': 1,
+        'transaction_interval': None,
+        'session_duration': 3600,
+        'idle_duration': 600,
+        'reconnect': True,
+        'backoff_base': 1,
+        'backoff_max': 60,
+        'offline_queue': None,
+        'replay_rate': 20,
+        'record': None,
+        'clock_speed': 1,
+        'clock_start': None,
+        'validation': ALWAYS,
+        'validation_every': 100,
+        'responses': None,
+        'faults': None,
+        'connection': None,
+    }
+
+    __slots__ = tuple(DEFAULTS)
+
+    def __init__(self, **settings):
+        unknown = set(settings) - set(self.DEFAULTS)
+        if unknown:
+            raise TypeError(f'Unknown fleet settings {", ".join(sorted(unknown))}')
+        for name, default in self.DEFAULTS.items():
+            setattr(self, name, settings.get(name, default))
+        self.layout = tuple(self.layout)
+        self.connection = self.connection or ConnectionSettings()
+
+    def replace(self, **changes) -> 'FleetConfig':
+        """ Copy with the settings in `changes` replaced, None included. """
+        settings = {name: getattr(self, name) for name in self.__slots__}
+        settings.update(changes)
+        return FleetConfig(**settings)
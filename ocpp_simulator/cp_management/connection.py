@@ -0,0 +1,90 @@
+import logging
+
+import websockets
+
+
+class ConnectionSettings:
+    """ Buffers of a websocket, by default those of the websockets library.
+
+    `max_size` is the largest message accepted, up to `max_queue` of them wait
+    to be read, the socket is read by chunks of `read_limit` bytes and up to
+    `write_limit` bytes wait to be written. Every connection can hold that
+    much memory, and permessage-deflate (`compression`) adds the zlib buffers
+    of both directions.
+    """
+
+    __slots__ = ('max_size', 'max_queue', 'read_limit', 'write_limit', 'compression')
+
+    def __init__(self, max_size: int = 2 ** 20, max_queue: int = 32, read_limit: int = 2 ** 16,
+                 write_limit: int = 2 ** 16, compression: bool = True):
+        self.max_size = max_size
+        self.max_queue = max_queue
+        self.read_limit = read_limit
+        self.write_limit = write_limit
+        self.compression = compression
+
+    def replace(self, **changes) -> 'ConnectionSettings':
+        """ Copy with the settings in `changes` that are not None replaced. """
+        settings = {name: getattr(self, name) for name in self.__slots__}
+        settings.update((name, value) for name, value in changes.items() if value is not None)
+        return ConnectionSettings(**settings)
+
+    def options(self) -> dict:
+        """ Keyword arguments of `websockets.connect` and `websockets.serve`. """
+        return {
+            'max_size': self.max_size,
+            'max_queue': self.max_queue,
+            'read_limit': self.read_limit,
+            'write_limit': self.write_limit,
+            'compression': 'deflate' if self.compression else None,
+        }
+
+
+PROFILES = {
+    'default': ConnectionSettings(),
+    # OCPP messages are small and answered one at a time, 10k idle stations fit in less than 1 GB
+    'lean': ConnectionSettings(max_size=2 ** 16, max_queue=4, read_limit=2 ** 12, write_limit=2 ** 12,
+                               compression=False),
+}
+
+
+async def negotiate(websocket) -> bool:
+    """ Whether the client of `websocket` speaks OCPP 2.0.1, the connection
+    being closed when it does not.
+    """
+    try:
+        requested_protocols = websocket.request_headers[
+            'Sec-WebSocket-Protocol']
+    except KeyError:
+        requested_protocols = None
+        logging.info("Client hasn't requested any Subprotocol. "
+                     "Closing Connection")
+    if websocket.subprotocol:
+        logging.debug("Protocols Matched: %s", websocket.subprotocol)
+        return True
+    # In the websockets lib if no subprotocols are supported by the
+    # client and the server, it proceeds without a subprotocol,
+    # so we have to manually close the connection.
+    logging.warning('Protocols Mismatched | Expected Subprotocols: %s,'
+                    ' but client supports  %s | Closing connection',
+                    websocket.available_subprotocols,
+                    requested_protocols)
+    await websocket.close()
+    return False
+
+
+async def serve(handler, host: str, port: int, backlog: int, connection: ConnectionSettings = None):
+    """ Serve OCPP 2.0.1 websockets on `host`:`port` with `handler`, `backlog`
+    being the queue of connections not accepted yet, every websocket with the
+    buffers of `connection`.
+    """
+    server = await websockets.serve(
+        handler,
+        host,
+        port,
+        subprotocols=['ocpp2.0.1'],
+        backlog=backlog,
+        **(connection or ConnectionSettings()).options()
+    )
+    logging.info("WebSocket Server Started on %s:%s", host, port)
+    return server
@@ -1,23 +1,57 @@
-import uuid
+import asyncio
+import functools
 from hashlib import sha256
-from datetime import datetime, timedelta
+from datetime import timedelta
 import logging
 
 import typer
 import questionary
-import websockets
+import websockets.exceptions
 
-from faker import Faker
-from ocpp.routing import on
-from ocpp.v201 import ChargePoint as Cp, call, call_result, datatypes, enums
+from ocpp.exceptions import OCPPError
+from ocpp.routing import after, on
+from ocpp.v201 import call, call_result, datatypes, enums
+
+from . import templates
+from .connection import ConnectionSettings, negotiate, serve
+from .pool import ValuePool
+from .providers import ValueProvider, choice_values
+from .registry import StationRegistry
+from .station import OCCUPIED, STATUSES, Station
+from .transactions import IDLE, TransactionTable
+from .transport import ChargePointTransport, constant_reply
 
 logging.basicConfig(level=logging.INFO)
 
-fake = Faker()
+LOGGER = logging.getLogger('ocpp_simulator.cp')
+
+# Random field values of the send_* methods, seed it for reproducible runs
+data_pool = ValuePool()
+
+SECURITY_EVENT_TYPES = (
+    'FirmwareUpdated',
+    'FailedToAuthenticateAtCsms',
+    'CsmsFailedToAuthenticate',
+    'SettingSystemTime',
+    'StartupOfTheDevice',
+    'ResetOrReboot',
+    'SecurityLogWasCleared',
+    'ReconfigurationOfSecurityParameters',
+    'MemoryExhaustion',
+    'InvalidMessages',
+    'AttemptedReplayAttacks',
+    'TamperDetectionActivated',
+    'InvalidFirmwareSignature',
+    'InvalidFirmwareSigningCertificate',
+    'InvalidCsmsCertificate',
+    'InvalidChargingStationCertificate',
+    'InvalidTLSVersion',
+    'InvalidTLSCipherSuite'
+)
 
 
 async def ask_question(enum_type, question: str):
-    choices = [limit.value for limit in enum_type]
+    choices = choice_values(enum_type)
     answer = await questionary.select(
         question,
         choices=list(choices)
@@ -25,13 +59,34 @@ async def ask_question(enum_type, question: str):
     return answer
 
 
+class PromptProvider(ValueProvider):
+    """ Interactive provider, every field is asked for in the terminal. """
+
+    async def value(self, field: str, question: str, default):
+        return typer.prompt(question, default=default())
+
+    async def choice(self, field: str, options, question: str):
+        return await ask_question(options, question)
+
+
 # pylint: disable=too-many-public-methods
-class ChargePoint(Cp):
+class ChargePoint(ChargePointTransport):
+
+    def __init__(self, id, connection, response_timeout=30, provider: ValueProvider = None, station: Station = None):
+        super().__init__(id, connection, response_timeout)
+        # Source of the field values of the send_* methods, prompts by default
+        self.provider = provider or PromptProvider()
+        # EVSEs and connectors, a single one of each by default
+        self.station = station or Station()
+
+    # Transaction IDs and sequence numbers of every EVSE, shared by the process
+    transactions = TransactionTable(data_pool)
 
     async def send_boot_notification(self):
-        model = typer.prompt('Enter charge point model', default=fake.pystr(1, 12))
-        vendor_name = typer.prompt('Enter charge point vendor name', default=fake.pystr(1, 12))
-        reason_type = await ask_question(enums.BootReasonType, "Which reason type:")
+        model = await self.provider.value('model', 'Enter charge point model', lambda: data_pool.string(1, 12))
+        vendor_name = await self.provider.value('vendor_name', 'Enter charge point vendor name',
+                                                lambda: data_pool.string(1, 12))
+        reason_type = await self.provider.choice('reason_type', enums.BootReasonType, "Which reason type:")
         request = call.BootNotificationPayload(
             charging_station={
                 'model': model,
@@ -43,23 +98,57 @@ class ChargePoint(Cp):
         return response
 
     async def send_status_notification(self):
-        connector_id = int(typer.prompt('Enter connector ID', default=fake.random_int()))
-        evse_id = int(typer.prompt('Enter EVSE ID', default=fake.random_int()))
-        connector_status = await ask_question(enums.ConnectorStatusType, "Which connector status type:")
+        connector_id = int(await self.provider.value('connector_id', 'Enter connector ID', lambda: 1))
+        evse_id = int(await self.provider.value('evse_id', 'Enter EVSE ID',
+                                                lambda: data_pool.integer(1, self.station.evses)))
+        connector_status = await self.provider.choice('connector_status', enums.ConnectorStatusType,
+                                                      "Which connector status type:")
         request = call.StatusNotificationPayload(
             connector_id=connector_id,
             connector_status=connector_status,
-            timestamp=str(datetime.now()),
+            timestamp=self.clock.timestamp(),
             evse_id=evse_id
         )
+        slot = self.station.slot(evse_id, connector_id)
+        if slot is not None:
+            self.station.statuses[slot] = STATUSES.index(connector_status)
         response = await self.call(request)
         return response
 
+    async def send_connector_status(self, evse_id: int, connector_id: int):
+        """ StatusNotification of a connector, with its status in the station model. """
+        return await self.call_template(templates.status_notification(), self.clock.timestamp(),
+                                        self.station.status(evse_id, connector_id), evse_id, connector_id)
+
+    async def send_station_status(self):
+        """ StatusNotification of every connector, as done after booting. """
+        self.station.changed.clear()
+        for evse_id in range(1, self.station.evses + 1):
+            for connector_id in range(1, self.station.connectors(evse_id) + 1):
+                await self.send_connector_status(evse_id, connector_id)
+
+    async def notify_changes(self):
+        """ StatusNotification of the connectors whose status changed in the station model. """
+        try:
+            for evse_id, connector_id in self.station.pop_changed():
+                await self.send_connector_status(evse_id, connector_id)
+        except (OCPPError, asyncio.TimeoutError, websockets.exceptions.ConnectionClosed) as error:
+            LOGGER.warning('%s: status notification failed: %s', self.id, error)
+
+    def transaction_slot(self, evse_id: int) -> int:
+        """ Slot of the EVSE in the transaction table. """
+        slot = self.station.transaction_slots[evse_id - 1] if 0 < evse_id <= self.station.evses else -1
+        if slot < 0:
+            slot = self.transactions.slot(self.id, evse_id)
+            if 0 < evse_id <= self.station.evses:
+                self.station.transaction_slots[evse_id - 1] = slot
+        return slot
+
     async def send_authorize(self):
-        id_type = await ask_question(enums.IdTokenType, "Which ID token type:")
+        id_type = await self.provider.choice('id_token_type', enums.IdTokenType, "Which ID token type:")
         request = call.AuthorizePayload(
             id_token={
-                'idToken': str(uuid.uuid4()),
+                'idToken': data_pool.uuid(),
                 'type': id_type
             },
         )
@@ -72,7 +161,8 @@ class ChargePoint(Cp):
         return response
 
     async def send_cleared_charging_request(self):
-        charging_limit_source = await ask_question(enums.ChargingLimitSourceType, "Which charging limit source:")
+        charging_limit_source = await self.provider.choice('charging_limit_source', enums.ChargingLimitSourceType,
+                                                           "Which charging limit source:")
         request = call.ClearedChargingLimitPayload(
             charging_limit_source=charging_limit_source
         )
@@ -80,7 +170,8 @@ class ChargePoint(Cp):
         return response
 
     async def send_firmware_status_notification(self):
-        firmware_status = await ask_question(enums.FirmwareStatusType, "Which firmware status notification:")
+        firmware_status = await self.provider.choice('firmware_status', enums.FirmwareStatusType,
+                                                     "Which firmware status notification:")
         request = call.FirmwareStatusNotificationPayload(
             status=firmware_status
         )
@@ -88,35 +179,40 @@ class ChargePoint(Cp):
         return response
 
     async def send_get_15118ev_certificate(self):
-        iso15118_schema_version = typer.prompt('Enter ISO15188 version', default=fake.pystr(1, 12))
-        certificate_action_type = await ask_question(enums.CertificateActionType, "Which certificate action type:")
+        iso15118_schema_version = await self.provider.value('iso15118_schema_version', 'Enter ISO15188 version',
+                                                            lambda: data_pool.string(1, 12))
+        certificate_action_type = await self.provider.choice('certificate_action_type', enums.CertificateActionType,
+                                                             "Which certificate action type:")
         request = call.Get15118EVCertificatePayload(
             iso15118_schema_version=iso15118_schema_version,
             action=certificate_action_type,
-            exi_request=str(uuid.uuid4())
+            exi_request=data_pool.uuid()
         )
         response = await self.call(request)
         return response
 
     async def send_get_certificate_status(self):
-        issuer_name = typer.prompt('Enter issuer name', default=fake.pystr(1, 128))
-        issuer_key = typer.prompt('Enter issuer key', default=fake.pystr(1, 128))
-        serial_number = typer.prompt('Enter serial number', default=fake.pystr(1, 40))
-        responder_url = typer.prompt('Enter responder URL', default=fake.url())
+        issuer_name = await self.provider.value('issuer_name', 'Enter issuer name', lambda: data_pool.string(1, 128))
+        issuer_key = await self.provider.value('issuer_key', 'Enter issuer key', lambda: data_pool.string(1, 128))
+        serial_number = await self.provider.value('serial_number', 'Enter serial number',
+                                                  lambda: data_pool.string(1, 40))
+        responder_url = await self.provider.value('responder_url', 'Enter responder URL', data_pool.url)
         request = call.GetCertificateStatusPayload(
-            ocsp_request_data=datatypes.OCSPRequestDataType(
-                hash_algorithm=enums.HashAlgorithmType.sha256,
-                issuer_name_hash=sha256(issuer_name.encode('utf-8')).hexdigest(),
-                issuer_key_hash=sha256(issuer_key.encode('utf-8')).hexdigest(),
-                responder_url=responder_url,
-                serial_number=serial_number
-            )
+            # The datatype would serialize to 'responderUrl', the schema expects 'responderURL'
+            ocsp_request_data={
+                'hash_algorithm': enums.HashAlgorithmType.sha256,
+                'issuer_name_hash': sha256(issuer_name.encode('utf-8')).hexdigest(),
+                'issuer_key_hash': sha256(issuer_key.encode('utf-8')).hexdigest(),
+                'responderURL': responder_url,
+                'serial_number': serial_number
+            }
         )
         response = await self.call(request)
         return response
 
     async def send_get_display_messages(self):
-        request_id = typer.prompt('Enter serial number', fake.random_int(min=0, max=10))
+        request_id = await self.provider.value('request_id', 'Enter serial number',
+                                               lambda: data_pool.integer(0, 10))
         request = call.GetDisplayMessagesPayload(
             request_id=request_id
         )
@@ -124,7 +220,8 @@ class ChargePoint(Cp):
         return response
 
     async def send_log_status_notification(self):
-        log_status = await ask_question(enums.UploadLogStatusType, "Which log status notification:")
+        log_status = await self.provider.choice('log_status', enums.UploadLogStatusType,
+                                                "Which log status notification:")
         request = call.LogStatusNotificationPayload(
             status=log_status
         )
@@ -132,17 +229,19 @@ class ChargePoint(Cp):
         return response
 
     async def send_meter_value(self):
-        unit = await ask_question(enums.UnitOfMeasureType, "Which measure unit type:")
-        evse_id = int(typer.prompt('Enter EVSE ID', default=fake.random_int()))
-        value = int(typer.prompt('Enter sample value', default=fake.random_int()))
-        value_context = await ask_question(enums.ReadingContextType, "Which value context type:")
-        value_measurand = await ask_question(enums.MeasurandType, "Which value measurand type:")
-        value_phase = await ask_question(enums.PhaseType, "Which value phase type:")
+        unit = await self.provider.choice('unit', enums.UnitOfMeasureType, "Which measure unit type:")
+        evse_id = int(await self.provider.value('evse_id', 'Enter EVSE ID', data_pool.integer))
+        value = int(await self.provider.value('value', 'Enter sample value', data_pool.integer))
+        value_context = await self.provider.choice('value_context', enums.ReadingContextType,
+                                                   "Which value context type:")
+        value_measurand = await self.provider.choice('value_measurand', enums.MeasurandType,
+                                                     "Which value measurand type:")
+        value_phase = await self.provider.choice('value_phase', enums.PhaseType, "Which value phase type:")
         request = call.MeterValuesPayload(
             evse_id=evse_id,
             meter_value=[
                 datatypes.MeterValueType(
-                    timestamp=str(datetime.now()),
+                    timestamp=self.clock.timestamp(),
                     sampled_value=[
                         datatypes.SampledValueType(
                             value=value,
@@ -167,7 +266,7 @@ class ChargePoint(Cp):
                     ]
                 ),
                 datatypes.MeterValueType(
-                    timestamp=str(datetime.now() + timedelta(seconds=5)),
+                    timestamp=str(self.clock.now() + timedelta(seconds=5)),
                     sampled_value=[
                         datatypes.SampledValueType(
                             value=value,
@@ -197,7 +296,8 @@ class ChargePoint(Cp):
         return response
 
     async def send_notify_charging_limit(self):
-        charging_limit_source = await ask_question(enums.ChargingLimitSourceType, "Which charging limit source:")
+        charging_limit_source = await self.provider.choice('charging_limit_source', enums.ChargingLimitSourceType,
+                                                           "Which charging limit source:")
         request = call.NotifyChargingLimitPayload(
             charging_limit={
                 'charging_limit_source': charging_limit_source,
@@ -208,20 +308,20 @@ class ChargePoint(Cp):
         return response
 
     async def send_notify_customer_information(self):
-        data = typer.prompt('Enter customer information data', fake.pystr(1, 12))
-        seq_no = typer.prompt('Enter sequence number', fake.random_int(min=0, max=10))
-        request_id = typer.prompt('Enter request ID', fake.random_int(min=0, max=10))
+        data = await self.provider.value('data', 'Enter customer information data', lambda: data_pool.string(1, 12))
+        seq_no = await self.provider.value('seq_no', 'Enter sequence number', lambda: data_pool.integer(0, 10))
+        request_id = await self.provider.value('request_id', 'Enter request ID', lambda: data_pool.integer(0, 10))
         request = call.NotifyCustomerInformationPayload(
             data=data,
             seq_no=seq_no,
-            generated_at=str(datetime.now()),
+            generated_at=self.clock.timestamp(),
             request_id=request_id
         )
         response = await self.call(request)
         return response
 
     async def send_notify_display_messages(self):
-        request_id = typer.prompt('Enter request ID', fake.random_int(min=0, max=10))
+        request_id = await self.provider.value('request_id', 'Enter request ID', lambda: data_pool.integer(0, 10))
         request = call.NotifyDisplayMessagesPayload(
             request_id=request_id
         )
@@ -229,40 +329,49 @@ class ChargePoint(Cp):
         return response
 
     async def send_notify_ev_charging_needs(self):
-        evse_id = typer.prompt('Enter EVSE ID', fake.random_int(min=0, max=100))
-        energy_amount = typer.prompt('Enter energy amount', fake.random_int(min=0, max=100))
-        ev_min_current = typer.prompt('Enter EV minimum current', fake.random_int(min=0, max=100))
-        ev_max_current = typer.prompt('Enter EV maximum current', fake.random_int(min=ev_min_current))
-        ev_max_voltage = typer.prompt('Enter EV maximum voltage', fake.random_int(min=0, max=100))
-        request_energy_transfer = await ask_question(enums.EnergyTransferModeType, "Which energy transfer:")
+        evse_id = await self.provider.value('evse_id', 'Enter EVSE ID', lambda: data_pool.integer(0, 100))
+        energy_amount = await self.provider.value('energy_amount', 'Enter energy amount',
+                                                  lambda: data_pool.integer(0, 100))
+        ev_min_current = await self.provider.value('ev_min_current', 'Enter EV minimum current',
+                                                   lambda: data_pool.integer(0, 100))
+        ev_max_current = await self.provider.value('ev_max_current', 'Enter EV maximum current',
+                                                   lambda: int(ev_min_current) + data_pool.integer(0, 100))
+        ev_max_voltage = await self.provider.value('ev_max_voltage', 'Enter EV maximum voltage',
+                                                   lambda: data_pool.integer(0, 100))
+        request_energy_transfer = await self.provider.choice('request_energy_transfer', enums.EnergyTransferModeType,
+                                                             "Which energy transfer:")
         request = call.NotifyEVChargingNeedsPayload(
             evse_id=evse_id,
-            charging_needs=datatypes.ChargingNeedsType(
-                request_energy_transfer=request_energy_transfer,
-                ac_charging_parameters=datatypes.ACChargingParametersType(
+            # The datatype would serialize to 'requestEnergyTransfer', the schema expects 'requestedEnergyTransfer'
+            charging_needs={
+                'requested_energy_transfer': request_energy_transfer,
+                'ac_charging_parameters': datatypes.ACChargingParametersType(
                     energy_amount=energy_amount,
                     ev_min_current=ev_min_current,
                     ev_max_current=ev_max_current,
                     ev_max_voltage=ev_max_voltage
                 )
-            )
+            }
         )
         response = await self.call(request)
         return response
 
     async def send_notify_ev_charging_schedule(self):
-        evse_id = typer.prompt('Enter EVSE ID', fake.random_int(min=0, max=100))
-        charging_schedule_period_limit = typer.prompt('Enter charging schedule period limit',
-                                                      fake.pyfloat(min_value=1, max_value=100, positive=True))
-        charging_rate_unit = await ask_question(enums.ChargingRateUnitType, "Which charging rate unit:")
+        evse_id = await self.provider.value('evse_id', 'Enter EVSE ID', lambda: data_pool.integer(0, 100))
+        charging_schedule_period_limit = await self.provider.value(
+            'charging_schedule_period_limit', 'Enter charging schedule period limit',
+            lambda: data_pool.decimal(1, 100)
+        )
+        charging_rate_unit = await self.provider.choice('charging_rate_unit', enums.ChargingRateUnitType,
+                                                        "Which charging rate unit:")
         request = call.NotifyEVChargingSchedulePayload(
-            time_base=str(datetime.now()),
+            time_base=self.clock.timestamp(),
             evse_id=evse_id,
             charging_schedule=datatypes.ChargingScheduleType(
-                id=fake.random_int(),
+                id=data_pool.integer(),
                 charging_rate_unit=charging_rate_unit,
                 charging_schedule_period=[datatypes.ChargingSchedulePeriodType(
-                    start_period=datetime.now().day,
+                    start_period=self.clock.now().day,
                     limit=charging_schedule_period_limit
                 )]
             )
@@ -271,20 +380,25 @@ class ChargePoint(Cp):
         return response
 
     async def send_notify_event(self):
-        seq_no = typer.prompt('Enter sequence number', fake.random_int(min=0, max=100))
-        event_id = typer.prompt('Enter event ID', fake.random_int(min=0, max=100))
-        actual_value = typer.prompt('Enter event data actual value', fake.pystr(1, 50))
-        component_name = typer.prompt('Enter event data component name', fake.pystr(1, 50))
-        component_instance = typer.prompt('Enter event data component instance', fake.pystr(1, 50))
-        variable_name = typer.prompt('Enter event data variable name', fake.pystr(1, 50))
-        trigger = await ask_question(enums.EventTriggerType, "Which trigger type:")
-        event_notification_type = await ask_question(enums.EventNotificationType, "Which event notification type:")
+        seq_no = await self.provider.value('seq_no', 'Enter sequence number', lambda: data_pool.integer(0, 100))
+        event_id = await self.provider.value('event_id', 'Enter event ID', lambda: data_pool.integer(0, 100))
+        actual_value = await self.provider.value('actual_value', 'Enter event data actual value',
+                                                 lambda: data_pool.string(1, 50))
+        component_name = await self.provider.value('component_name', 'Enter event data component name',
+                                                   lambda: data_pool.string(1, 50))
+        component_instance = await self.provider.value('component_instance', 'Enter event data component instance',
+                                                       lambda: data_pool.string(1, 50))
+        variable_name = await self.provider.value('variable_name', 'Enter event data variable name',
+                                                  lambda: data_pool.string(1, 50))
+        trigger = await self.provider.choice('trigger', enums.EventTriggerType, "Which trigger type:")
+        event_notification_type = await self.provider.choice('event_notification_type', enums.EventNotificationType,
+                                                             "Which event notification type:")
         request = call.NotifyEventPayload(
-            generated_at=str(datetime.now()),
+            generated_at=self.clock.timestamp(),
             seq_no=seq_no,
             event_data=[datatypes.EventDataType(
                 event_id=event_id,
-                timestamp=str(datetime.now()),
+                timestamp=self.clock.timestamp(),
                 trigger=trigger,
                 actual_value=actual_value,
                 event_notification_type=event_notification_type,
@@ -301,29 +415,32 @@ class ChargePoint(Cp):
         return response
 
     async def send_notify_monitoring_report(self):
-        request_id = typer.prompt('Enter request ID', fake.random_int(min=0, max=100))
-        seq_no = typer.prompt('Enter sequence number', fake.random_int(min=0, max=100))
+        request_id = await self.provider.value('request_id', 'Enter request ID',
+                                               lambda: data_pool.integer(0, 100))
+        seq_no = await self.provider.value('seq_no', 'Enter sequence number', lambda: data_pool.integer(0, 100))
         request = call.NotifyMonitoringReportPayload(
             request_id=request_id,
             seq_no=seq_no,
-            generated_at=str(datetime.now())
+            generated_at=self.clock.timestamp()
         )
         response = await self.call(request)
         return response
 
     async def send_notify_report(self):
-        request_id = typer.prompt('Enter request ID', fake.random_int(min=0, max=100))
-        seq_no = typer.prompt('Enter sequence number', fake.random_int(min=0, max=100))
+        request_id = await self.provider.value('request_id', 'Enter request ID',
+                                               lambda: data_pool.integer(0, 100))
+        seq_no = await self.provider.value('seq_no', 'Enter sequence number', lambda: data_pool.integer(0, 100))
         request = call.NotifyReportPayload(
             request_id=request_id,
-            generated_at=str(datetime.now()),
+            generated_at=self.clock.timestamp(),
             seq_no=seq_no
         )
         response = await self.call(request)
         return response
 
     async def send_publish_firmware_status_notification(self):
-        status = await ask_question(enums.PublishFirmwareStatusType, "Which publish firmware status:")
+        status = await self.provider.choice('publish_firmware_status', enums.PublishFirmwareStatusType,
+                                            "Which publish firmware status:")
         request = call.PublishFirmwareStatusNotificationPayload(
             status=status
         )
@@ -331,18 +448,28 @@ class ChargePoint(Cp):
         return response
 
     async def send_report_charging_profiles(self):
-        evse_id = typer.prompt('Enter EVSE ID', fake.random_int(min=0, max=100))
-        request_id = typer.prompt('Enter request ID', fake.random_int(min=0, max=100))
-        charging_profile_id = typer.prompt('Enter charging profile ID', fake.random_int(min=0, max=100))
-        stack_level = typer.prompt('Enter stack level', fake.random_int(min=0, max=100))
-        charging_schedule_id = typer.prompt('Enter charging schedule ID', fake.random_int(min=0, max=100))
-        charging_schedule_period_limit = typer.prompt('Enter charging schedule period limit',
-                                                      fake.pyfloat(min_value=1, max_value=100, positive=True))
-        charging_limit_type = await ask_question(enums.ChargingLimitSourceType, "Which charging limit type:")
-        charging_profile_purpose = await ask_question(enums.ChargingProfilePurposeType,
-                                                      "Which charging profile purpose:")
-        charging_profile_kind = await ask_question(enums.ChargingProfileKindType, "Which charging profile kind:")
-        charging_rate_unit = await ask_question(enums.ChargingRateUnitType, "Which charging rate unit:")
+        evse_id = await self.provider.value('evse_id', 'Enter EVSE ID', lambda: data_pool.integer(0, 100))
+        request_id = await self.provider.value('request_id', 'Enter request ID',
+                                               lambda: data_pool.integer(0, 100))
+        charging_profile_id = await self.provider.value('charging_profile_id', 'Enter charging profile ID',
+                                                        lambda: data_pool.integer(0, 100))
+        stack_level = await self.provider.value('stack_level', 'Enter stack level',
+                                                lambda: data_pool.integer(0, 100))
+        charging_schedule_id = await self.provider.value('charging_schedule_id', 'Enter charging schedule ID',
+                                                         lambda: data_pool.integer(0, 100))
+        charging_schedule_period_limit = await self.provider.value(
+            'charging_schedule_period_limit', 'Enter charging schedule period limit',
+            lambda: data_pool.decimal(1, 100)
+        )
+        charging_limit_type = await self.provider.choice('charging_limit_type', enums.ChargingLimitSourceType,
+                                                         "Which charging limit type:")
+        charging_profile_purpose = await self.provider.choice('charging_profile_purpose',
+                                                              enums.ChargingProfilePurposeType,
+                                                              "Which charging profile purpose:")
+        charging_profile_kind = await self.provider.choice('charging_profile_kind', enums.ChargingProfileKindType,
+                                                           "Which charging profile kind:")
+        charging_rate_unit = await self.provider.choice('charging_rate_unit', enums.ChargingRateUnitType,
+                                                        "Which charging rate unit:")
         request = call.ReportChargingProfilesPayload(
             request_id=request_id,
             charging_limit_source=charging_limit_type,
@@ -356,7 +483,7 @@ class ChargePoint(Cp):
                     id=charging_schedule_id,
                     charging_rate_unit=charging_rate_unit,
                     charging_schedule_period=[datatypes.ChargingSchedulePeriodType(
-                        start_period=datetime.now().day,
+                        start_period=self.clock.now().day,
                         limit=charging_schedule_period_limit
                     )]
                 )]
@@ -371,11 +498,12 @@ class ChargePoint(Cp):
         return response
 
     async def send_start_transaction(self):
-        remote_start_id = typer.prompt('Enter remote start', fake.random_int(min=0, max=100))
-        id_token_type = await ask_question(enums.IdTokenType, "Which ID token type:")
+        remote_start_id = await self.provider.value('remote_start_id', 'Enter remote start',
+                                                    lambda: data_pool.integer(0, 100))
+        id_token_type = await self.provider.choice('id_token_type', enums.IdTokenType, "Which ID token type:")
         request = call.RequestStartTransactionPayload(
             id_token={
-                'idToken': str(uuid.uuid4()),
+                'idToken': data_pool.uuid(),
                 'type': id_token_type
             },
             remote_start_id=remote_start_id
@@ -384,7 +512,8 @@ class ChargePoint(Cp):
         return response
 
     async def send_stop_transaction(self):
-        transaction_id = typer.prompt('Enter transaction ID', default=fake.pystr(1, 12))
+        transaction_id = await self.provider.value('transaction_id', 'Enter transaction ID',
+                                                   lambda: data_pool.string(1, 12))
         request = call.RequestStopTransactionPayload(
             transaction_id=transaction_id
         )
@@ -392,9 +521,11 @@ class ChargePoint(Cp):
         return response
 
     async def send_reservation_status_update(self):
-        reservation_id = typer.prompt('Enter reservation ID', default=fake.pyint(1, 100))
-        reservation_update_status = await ask_question(enums.ReservationUpdateStatusType,
-                                                       "Which reservation update status:")
+        reservation_id = await self.provider.value('reservation_id', 'Enter reservation ID',
+                                                   lambda: data_pool.integer(1, 100))
+        reservation_update_status = await self.provider.choice('reservation_update_status',
+                                                               enums.ReservationUpdateStatusType,
+                                                               "Which reservation update status:")
         request = call.ReservationStatusUpdatePayload(
             reservation_id=reservation_id,
             reservation_update_status=reservation_update_status
@@ -403,35 +534,17 @@ class ChargePoint(Cp):
         return response
 
     async def send_security_event_notification(self):
-        security_event_type = await ask_question([
-            'FirmwareUpdated',
-            'FailedToAuthenticateAtCsms',
-            'CsmsFailedToAuthenticate',
-            'SettingSystemTime',
-            'StartupOfTheDevice',
-            'ResetOrReboot',
-            'SecurityLogWasCleared',
-            'ReconfigurationOfSecurityParameters',
-            'MemoryExhaustion',
-            'InvalidMessages',
-            'AttemptedReplayAttacks',
-            'TamperDetectionActivated',
-            'InvalidFirmwareSignature',
-            'InvalidFirmwareSigningCertificate',
-            'InvalidCsmsCertificate',
-            'InvalidChargingStationCertificate',
-            'InvalidTLSVersion',
-            'InvalidTLSCipherSuite'
-        ], "Which reservation update status: ")
+        security_event_type = await self.provider.choice('security_event_type', SECURITY_EVENT_TYPES,
+                                                         "Which security event type:")
         request = call.SecurityEventNotificationPayload(
             type=security_event_type,
-            timestamp=str(datetime.now())
+            timestamp=self.clock.timestamp()
         )
         response = await self.call(request)
         return response
 
     async def send_sign_certificate(self):
-        csr = typer.prompt('Enter Certificate Signing Request', fake.pystr(1, 100))
+        csr = await self.provider.value('csr', 'Enter Certificate Signing Request', lambda: data_pool.string(1, 100))
         request = call.SignCertificatePayload(
             csr=csr
         )
@@ -439,189 +552,252 @@ class ChargePoint(Cp):
         return response
 
     async def send_transaction_event(self):
-        transaction_id = typer.prompt('Enter transaction ID', default=fake.pystr(1, 36))
-        seq_no = typer.prompt('Enter sequence number', default=fake.pyint(1, 100))
-        event_type = await ask_question(enums.TransactionEventType, "Which transaction event type:")
-        trigger_reason = await ask_question(enums.TriggerReasonType, "Which trigger reason:")
+        evse_id = int(await self.provider.value('evse_id', 'Enter EVSE ID', lambda: 1))
+        event_type = await self.provider.choice('event_type', enums.TransactionEventType,
+                                                "Which transaction event type:")
+        trigger_reason = await self.provider.choice('trigger_reason', enums.TriggerReasonType, "Which trigger reason:")
+        next_transaction_id, next_seq_no = self.transactions.event(self.transaction_slot(evse_id), event_type)
+        connector = self.station.slot(evse_id)
+        if connector is not None:
+            if event_type == enums.TransactionEventType.ended:
+                self.station.release(connector)
+            else:
+                self.station.set_status(connector, OCCUPIED)
+        transaction_id = await self.provider.value('transaction_id', 'Enter transaction ID',
+                                                   lambda: next_transaction_id)
+        seq_no = int(await self.provider.value('seq_no', 'Enter sequence number', lambda: next_seq_no))
         request = call.TransactionEventPayload(
             event_type=event_type,
-            timestamp=str(datetime.now()),
+            timestamp=self.clock.timestamp(),
             trigger_reason=trigger_reason,
             seq_no=seq_no,
             transaction_info=datatypes.TransactionType(
                 transaction_id=transaction_id
-            )
+            ),
+            evse=datatypes.EVSEType(id=evse_id)
 
         )
         response = await self.call(request)
+        await self.notify_changes()
         return response
 
     @on(enums.Action.CancelReservation)
-    async def on_cancel_reservation(self, status=enums.CancelReservationStatusType.accepted, **kwargs):
+    async def on_cancel_reservation(self, status=enums.CancelReservationStatusType.accepted, reservation_id=None,
+                                    **kwargs):
+        if status == enums.CancelReservationStatusType.accepted:
+            self.station.cancel_reservation(reservation_id)
         return call_result.CancelReservationPayload(status=status)
 
+    @after(enums.Action.CancelReservation)
+    async def after_cancel_reservation(self, **kwargs):
+        await self.notify_changes()
+
     @on(enums.Action.CertificateSigned)
+    @constant_reply
     async def on_certificate_signed(self, status=enums.CertificateSignedStatusType.accepted, **kwargs):
         return call_result.CertificateSignedPayload(status=status)
 
     @on(enums.Action.ChangeAvailability)
-    async def on_change_availability(self, status=enums.ChangeAvailabilityStatusType.accepted, **kwargs):
+    async def on_change_availability(self, status=enums.ChangeAvailabilityStatusType.accepted,
+                                     operational_status=enums.OperationalStatusType.operative, evse=None, **kwargs):
+        if status == enums.ChangeAvailabilityStatusType.accepted:
+            evse = evse or {}
+            self.station.set_operative(operational_status == enums.OperationalStatusType.operative, evse.get('id'),
+                                       evse.get('connector_id'))
         return call_result.ChangeAvailabilityPayload(status=status)
 
+    @after(enums.Action.ChangeAvailability)
+    async def after_change_availability(self, **kwargs):
+        await self.notify_changes()
+
     @on(enums.Action.ClearChargingProfile)
+    @constant_reply
     async def on_clear_charging_profile(self, status=enums.ClearChargingProfileStatusType.accepted, **kwargs):
         return call_result.ClearChargingProfilePayload(status=status)
 
     @on(enums.Action.ClearDisplayMessage)
+    @constant_reply
     async def on_clear_display_message(self, status=enums.ClearChargingProfileStatusType.accepted, **kwargs):
         return call_result.ClearDisplayMessagePayload(status=status)
 
     @on(enums.Action.ClearVariableMonitoring)
-    async def on_clear_variable_monitoring(self, monitoring_result_id: int = fake.random_int(1, 100),
-                                           status=enums.ClearMonitoringStatusType.accepted, **kwargs):
+    async def on_clear_variable_monitoring(self, id=(), status=enums.ClearMonitoringStatusType.accepted, **kwargs):
         return call_result.ClearVariableMonitoringPayload(
             clear_monitoring_result=[{
                 'status': status,
-                'id': monitoring_result_id,
-            }]
+                'id': monitoring_id,
+            } for monitoring_id in id]
         )
 
     @on('CostUpdated')
+    @constant_reply
     async def on_cost_updated(self, **kwargs):
         return call_result.CostUpdatedPayload()
 
     @on(enums.Action.CustomerInformation)
+    @constant_reply
     async def on_customer_info(self, status=enums.CustomerInformationStatusType.accepted, **kwargs):
         return call_result.CustomerInformationPayload(status=status)
 
     @on(enums.Action.DataTransfer)
+    @constant_reply
     async def on_data_transfer(self, status=enums.DataTransferStatusType.accepted, **kwargs):
         return call_result.DataTransferPayload(status=status)
 
     @on(enums.Action.DeleteCertificate)
+    @constant_reply
     async def on_delete_certificate(self, status=enums.DeleteCertificateStatusType.accepted, **kwargs):
         return call_result.DeleteCertificatePayload(status=status)
 
     @on(enums.Action.GetBaseReport)
+    @constant_reply
     async def on_get_base_report(self, status=enums.GenericDeviceModelStatusType.accepted, **kwargs):
         return call_result.GetBaseReportPayload(status=status)
 
     @on(enums.Action.GetChargingProfiles)
+    @constant_reply
     async def on_get_charging_profiles(self, status=enums.GetChargingProfileStatusType.accepted, **kwargs):
         return call_result.GetChargingProfilesPayload(status=status)
 
     @on(enums.Action.GetCompositeSchedule)
+    @constant_reply
     async def on_get_composite_schedule(self, status=enums.GenericStatusType.accepted, **kwargs):
         return call_result.GetCompositeSchedulePayload(status=status)
 
     @on(enums.Action.GetDisplayMessages)
+    @constant_reply
     async def on_get_display_messages(self, status=enums.GetDisplayMessagesStatusType.accepted, **kwargs):
         return call_result.GetDisplayMessagesPayload(status=status)
 
     @on(enums.Action.GetInstalledCertificateIds)
+    @constant_reply
     async def on_get_installed_certificate_ids(self, status=enums.GetInstalledCertificateStatusType.accepted, **kwargs):
         return call_result.GetInstalledCertificateIdsPayload(status=status)
 
     @on(enums.Action.GetLocalListVersion)
-    async def on_get_local_list_version(self, version_number: int = fake.random_int(1, 1000), **kwargs):
+    async def on_get_local_list_version(self, version_number: int = None, **kwargs):
+        if version_number is None:
+            version_number = data_pool.integer(1, 1000)
         return call_result.GetLocalListVersionPayload(version_number=version_number)
 
     @on(enums.Action.GetLog)
+    @constant_reply
     async def on_get_log(self, status=enums.LogStatusType.accepted, **kwargs):
         return call_result.GetLogPayload(status=status)
 
     @on(enums.Action.GetMonitoringReport)
+    @constant_reply
     async def on_get_monitoring_report(self, status=enums.InstallCertificateStatusType.accepted, **kwargs):
         return call_result.GetMonitoringReportPayload(status=status)
 
     @on(enums.Action.PublishFirmware)
+    @constant_reply
     async def on_publish_firmware(self, status=enums.GenericStatusType.accepted, **kwargs):
         return call_result.PublishFirmwarePayload(status=status)
 
     @on(enums.Action.ReserveNow)
-    async def on_reserve_now(self, status=enums.ReserveNowStatusType.accepted, **kwargs):
+    async def on_reserve_now(self, status=enums.ReserveNowStatusType.accepted, id=None, evse_id=None, **kwargs):
+        if status == enums.ReserveNowStatusType.accepted and self.station.reserve(id, evse_id) is None:
+            status = enums.ReserveNowStatusType.occupied
         return call_result.ReserveNowPayload(status=status)
 
+    @after(enums.Action.ReserveNow)
+    async def after_reserve_now(self, **kwargs):
+        await self.notify_changes()
+
     @on(enums.Action.Reset)
+    @constant_reply
     async def on_reset(self, status=enums.ResetStatusType.accepted, **kwargs):
         return call_result.ResetPayload(status=status)
 
     @on(enums.Action.SendLocalList)
+    @constant_reply
     async def on_send_local_list(self, status=enums.SendLocalListStatusType.accepted, **kwargs):
         return call_result.SendLocalListPayload(status=status)
 
     @on(enums.Action.SetChargingProfile)
+    @constant_reply
     async def on_set_charging_profile(self, status=enums.ChargingProfileStatus.accepted, **kwargs):
         return call_result.SetChargingProfilePayload(status=status)
 
     @on(enums.Action.SetDisplayMessage)
+    @constant_reply
     async def on_set_display_message(self, status=enums.DisplayMessageStatusType.accepted, **kwargs):
         return call_result.SetDisplayMessagePayload(status=status)
 
     @on(enums.Action.SetMonitoringBase)
+    @constant_reply
     async def on_set_monitoring_base(self, status=enums.GenericDeviceModelStatusType.accepted, **kwargs):
         return call_result.SetMonitoringBasePayload(status=status)
 
     @on(enums.Action.SetMonitoringLevel)
+    @constant_reply
     async def on_set_monitoring_level(self, status=enums.GenericStatusType.accepted, **kwargs):
         return call_result.SetMonitoringLevelPayload(status=status)
 
     @on(enums.Action.SetNetworkProfile)
+    @constant_reply
     async def on_set_network_profile(self, status=enums.SetNetworkProfileStatusType.accepted, **kwargs):
         return call_result.SetNetworkProfilePayload(status=status)
 
     @on(enums.Action.SetVariableMonitoring)
-    async def on_set_variable_monitoring(self, status=enums.SetMonitoringStatusType.accepted,
-                                         monitor_type=enums.MonitorType.delta, severity: int = fake.random_int(0, 10),
-                                         component_name: str = fake.pystr(1, 36),
-                                         component_instance: str = fake.pystr(1, 36),
-                                         variable_name: str = fake.pystr(1, 36), **kwargs):
+    async def on_set_variable_monitoring(self, status=enums.SetMonitoringStatusType.accepted, set_monitoring_data=(),
+                                         **kwargs):
         return call_result.SetVariableMonitoringPayload(
-            set_monitoring_result=[datatypes.SetMonitoringResultType(
-                status=status,
-                type=monitor_type,
-                severity=severity,
-                component=datatypes.ComponentType(
-                    name=component_name,
-                    instance=component_instance
-                ),
-                variable=datatypes.VariableType(
-                    name=variable_name
-                )
-            )]
+            set_monitoring_result=[{
+                'status': status,
+                'type': data['type'],
+                'severity': data['severity'],
+                'component': data['component'],
+                'variable': data['variable'],
+            } for data in set_monitoring_data]
         )
 
     @on(enums.Action.SetVariables)
-    async def on_set_variables(self, status=enums.SetVariableStatusType.accepted,
-                               component_name: str = fake.pystr(1, 36),
-                               component_instance: str = fake.pystr(1, 36),
-                               variable_name: str = fake.pystr(1, 36), **kwargs):
+    async def on_set_variables(self, status=enums.SetVariableStatusType.accepted, set_variable_data=(), **kwargs):
         return call_result.SetVariablesPayload(
-            set_variable_result=[datatypes.SetVariableResultType(
-                attribute_status=status,
-                component=datatypes.ComponentType(
-                    name=component_name,
-                    instance=component_instance
-                ),
-                variable=datatypes.VariableType(
-                    name=variable_name
-                )
-            )]
+            set_variable_result=[{
+                'attribute_status': status,
+                'component': data['component'],
+                'variable': data['variable'],
+            } for data in set_variable_data]
         )
 
     @on(enums.Action.TriggerMessage)
+    @constant_reply
     async def on_trigger_message(self, status=enums.TriggerMessageStatusType.accepted, **kwargs):
         return call_result.TriggerMessagePayload(status=status)
 
+    @after(enums.Action.TriggerMessage)
+    async def after_trigger_message(self, requested_message=None, evse=None, **kwargs):
+        if requested_message != enums.MessageTriggerType.status_notification:
+            return
+        evse = evse or {}
+        self.station.changed += self.station.slots(evse.get('id'), evse.get('connector_id'))
+        await self.notify_changes()
+
     @on(enums.Action.UnlockConnector)
-    async def on_unlock_connector(self, status=enums.UnlockStatusType.unlocked, **kwargs):
+    async def on_unlock_connector(self, status=enums.UnlockStatusType.unlocked, evse_id=0, connector_id=0,
+                                  **kwargs):
+        slot = self.station.slot(evse_id, connector_id)
+        if slot is not None and status == enums.UnlockStatusType.unlocked:
+            if self.transactions.states[self.transaction_slot(evse_id)] != IDLE:
+                status = enums.UnlockStatusType.ongoing_authorized_transaction
+            elif self.station.statuses[slot] == OCCUPIED:
+                self.station.release(slot)
         return call_result.UnlockConnectorPayload(status=status)
 
+    @after(enums.Action.UnlockConnector)
+    async def after_unlock_connector(self, **kwargs):
+        await self.notify_changes()
+
     @on(enums.Action.UnpublishFirmware)
+    @constant_reply
     async def on_unpublish_firmware(self, status=enums.UnpublishFirmwareStatusType.unpublished, **kwargs):
         return call_result.UnpublishFirmwarePayload(status=status)
 
     @on(enums.Action.UpdateFirmware)
+    @constant_reply
     async def on_update_firmware(self, status=enums.UpdateFirmwareStatusType.accepted, **kwargs):
         return call_result.UpdateFirmwarePayload(status=status)
 
@@ -655,42 +831,68 @@ class ChargePoint(Cp):
 
     }
 
+    # Send methods by OCPP action name, used by the non-interactive modes
+    actions = {
+        'Authorize': send_authorize,
+        'BootNotification': send_boot_notification,
+        'ClearCache': send_clear_cache,
+        'ClearedChargingLimit': send_cleared_charging_request,
+        'FirmwareStatusNotification': send_firmware_status_notification,
+        'Get15118EVCertificate': send_get_15118ev_certificate,
+        'GetCertificateStatus': send_get_certificate_status,
+        'GetDisplayMessages': send_get_display_messages,
+        'Heartbeat': send_heartbeat,
+        'LogStatusNotification': send_log_status_notification,
+        'MeterValues': send_meter_value,
+        'NotifyChargingLimit': send_notify_charging_limit,
+        'NotifyCustomerInformation': send_notify_customer_information,
+        'NotifyDisplayMessages': send_notify_display_messages,
+        'NotifyEVChargingNeeds': send_notify_ev_charging_needs,
+        'NotifyEVChargingSchedule': send_notify_ev_charging_schedule,
+        'NotifyEvent': send_notify_event,
+        'NotifyMonitoringReport': send_notify_monitoring_report,
+        'NotifyReport': send_notify_report,
+        'PublishFirmwareStatusNotification': send_publish_firmware_status_notification,
+        'ReportChargingProfiles': send_report_charging_profiles,
+        'RequestStartTransaction': send_start_transaction,
+        'RequestStopTransaction': send_stop_transaction,
+        'ReservationStatusUpdate': send_reservation_status_update,
+        'SecurityEventNotification': send_security_event_notification,
+        'SignCertificate': send_sign_certificate,
+        'StatusNotification': send_status_notification,
+        'TransactionEvent': send_transaction_event,
+    }
+
 
 # Part below this line is used to test messages send form central system to charge point
-async def on_connect(websocket, path):
+
+# Charge points connected to the server of start_cp(), by ID
+stations = StationRegistry()
+
+
+async def on_connect(websocket, path, registry: StationRegistry = stations):
     """ For every new charge point that connects, create a ChargePoint
-    instance and start listening for messages.
+    instance, register it and start listening for messages.
     """
-    try:
-        requested_protocols = websocket.request_headers[
-            'Sec-WebSocket-Protocol']
-    except KeyError:
-        logging.info("Client hasn't requested any Subprotocol. "
-                     "Closing Connection")
-    if websocket.subprotocol:
-        logging.info("Protocols Matched: %s", websocket.subprotocol)
-    else:
-        # In the websockets lib if no subprotocols are supported by the
-        # client and the server, it proceeds without a subprotocol,
-        # so we have to manually close the connection.
-        logging.warning('Protocols Mismatched | Expected Subprotocols: %s,'
-                        ' but client supports  %s | Closing connection',
-                        websocket.available_subprotocols,
-                        requested_protocols)
-        return await websocket.close()
+    if not await negotiate(websocket):
+        return
 
     charge_point_id = path.strip('/')
     cp = ChargePoint(charge_point_id, websocket)
 
-    await cp.start()
+    registry.add(cp)
+    ChargePoint.metrics.connected += 1
+    try:
+        await cp.start()
+    finally:
+        ChargePoint.metrics.connected -= 1
+        registry.remove(cp)
 
 
-async def start_cp():  # nosec
-    server = await websockets.serve(
-        on_connect,
-        "0.0.0.0",
-        9000,
-        subprotocols=['ocpp2.0.1']
-    )
-    logging.info("WebSocket Server Started")
-    return server
+async def start_cp(host: str = '0.0.0.0', port: int = 9000, backlog: int = 100,
+                   registry: StationRegistry = stations, connection: ConnectionSettings = None):  # nosec
+    """ Serve charge points to central systems connecting on `host`:`port`,
+    `backlog` being the queue of connections not accepted yet, every
+    websocket with the buffers of `connection`.
+    """
+    return await serve(functools.partial(on_connect, registry=registry), host, port, backlog, connection)
@@ -0,0 +1,16 @@
+import json
+
+
+def load_definition(path: str, kind: str = 'files'):
+    """ Content of a JSON file, or of a YAML one (.yaml or .yml) when PyYAML is
+    installed, `kind` naming what the file holds in the error otherwise.
+    """
+    with open(path, 'r', encoding='utf-8') as definition_file:
+        if not path.endswith(('.yaml', '.yml')):
+            return json.load(definition_file)
+        try:
+            import yaml  # pylint: disable=import-outside-toplevel
+        except ImportError:
+            raise RuntimeError(f'PyYAML is required to load YAML {kind}, install the yaml extra '
+                               f'(pip install ocpp-simulator[yaml]) or use JSON instead') from None
+        return yaml.safe_load(definition_file)
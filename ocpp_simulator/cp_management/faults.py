@@ -0,0 +1,213 @@
+import asyncio
+import random
+from collections import Counter
+
+import websockets.exceptions
+
+from .definitions import load_definition
+from .latency import Latency
+from .pool import ValuePool
+
+# Faults of a frame, at most one per frame
+DROP, DELAY, REORDER, DUPLICATE, CORRUPT = 'drop', 'delay', 'reorder', 'duplicate', 'corrupt'
+FAULTS = (DROP, DELAY, REORDER, DUPLICATE, CORRUPT)
+
+_REPORTS = {
+    DROP: 'frames_dropped',
+    DELAY: 'frames_delayed',
+    REORDER: 'frames_reordered',
+    DUPLICATE: 'frames_duplicated',
+    CORRUPT: 'frames_corrupted',
+}
+
+
+class FaultPolicy:
+    """ Share of the frames dropped, delayed by `latency`, sent after the next
+    one, sent twice or cut in half, and share of the frames the connection
+    is killed right after.
+    """
+
+    __slots__ = ('bounds', 'kill', 'latency')
+
+    def __init__(self, drop: float = 0, delay: float = 0, reorder: float = 0, duplicate: float = 0,
+                 corrupt: float = 0, kill: float = 0, latency='500'):
+        shares = dict(zip(FAULTS, (float(drop), float(delay), float(reorder), float(duplicate), float(corrupt))))
+        if min(shares.values()) < 0 or sum(shares.values()) > 1 or not 0 <= float(kill) <= 1:
+            raise ValueError(f'Invalid fault shares {shares!r}, expected between 0 and 1 and at most 1 in total')
+        # Upper bounds of a uniform draw for every fault, the frame is sent as is above the last one
+        self.bounds = []
+        bound = 0
+        for fault, share in shares.items():
+            if share:
+                bound += share
+                self.bounds.append((bound, fault))
+        self.kill = float(kill)
+        self.latency = Latency(latency)
+
+    def __bool__(self):
+        """ False when no frame is ever touched. """
+        return bool(self.bounds) or self.kill > 0
+
+    def fault(self, draw: float):
+        for bound, fault in self.bounds:
+            if draw < bound:
+                return fault
+        return None
+
+
+def _policy(options: dict):
+    unknown = set(options) - set(FAULTS) - {'kill', 'latency'}
+    if unknown:
+        raise ValueError(f'Unknown fault options {", ".join(sorted(unknown))}')
+    return FaultPolicy(**options) or None
+
+
+def _table(options: dict, actions: dict):
+    return _policy(options), {action: _policy({**options, **action_options})
+                              for action, action_options in actions.items()}
+
+
+class FaultPlan:
+    """ Faults injected in the frames the charge points send, by default, per
+    charge point and per action, the options of an action overriding those
+    of a charge point overriding the defaults.
+
+    Whether a frame is touched is drawn from a precomputed stream of random
+    numbers, and charge points without faults keep their websocket as is,
+    so injecting faults costs next to nothing to the frames it spares.
+    """
+
+    def __init__(self, default: dict = None, actions: dict = None, charge_points: dict = None, seed=None,
+                 reorder_window: float = 0.5):
+        default, actions = default or {}, actions or {}
+        self._table = _table(default, actions)
+        self._charge_points = {cp_id: _table({**default, **options}, actions)
+                               for cp_id, options in (charge_points or {}).items()}
+        self.reorder_window = reorder_window
+        self.report = Counter()
+        self.pool = ValuePool(seed)
+        self.random = random.Random(seed)
+        self.tasks = set()
+
+    @classmethod
+    def from_dict(cls, definition: dict, seed=None):
+        return cls(definition.get('default'), definition.get('actions'), definition.get('charge_points'),
+                   seed=seed, reorder_window=definition.get('reorder_window', 0.5))
+
+    @classmethod
+    def from_file(cls, path: str, seed=None):
+        return cls.from_dict(load_definition(path, 'fault plans'), seed=seed)
+
+    def wrap(self, connection, cp_id: str):
+        """ `connection` of the charge point `cp_id` behind the faults of the plan, if any. """
+        default, actions = self._charge_points.get(cp_id, self._table)
+        if default is None and not any(actions.values()):
+            return connection
+        return FaultyConnection(connection, self, default, actions)
+
+    def spawn(self, coroutine):
+        task = asyncio.ensure_future(coroutine)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+
+
+class FaultyConnection:
+    """ Websocket of a charge point injecting the faults of a plan in the
+    frames sent, everything else goes to the websocket itself.
+
+    The action of the calls received is kept until they are answered, for
+    the faults of their replies.
+    """
+
+    def __init__(self, connection, plan: FaultPlan, default: FaultPolicy, actions: dict):
+        self._connection = connection
+        self._plan = plan
+        self._default = default
+        self._actions = actions
+        self._calls = {}
+        self._held = None
+        self._held_timer = None
+        self._killed = False
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    async def recv(self):
+        frame = await self._connection.recv()
+        if self._actions and frame.startswith('[2'):
+            try:
+                _, unique_id, _, action, _ = frame.split('"', 4)
+                self._calls[unique_id] = action
+            except ValueError:
+                pass
+        return frame
+
+    def _policy(self, frame: str):
+        if not self._actions:
+            return self._default
+        # Unique ID and action read from the frame, the payload is not parsed
+        try:
+            if frame.startswith('[2'):
+                action = frame.split('"', 4)[3]
+            else:
+                action = self._calls.pop(frame.split('"', 2)[1], None)
+        except IndexError:
+            return self._default
+        return self._actions.get(action, self._default)
+
+    async def send(self, frame):
+        policy = self._policy(frame)
+        if policy is None:
+            await self._connection.send(frame)
+            await self._release()
+            return
+        plan = self._plan
+        fault = policy.fault(plan.pool.uniform())
+        if fault is None:
+            await self._connection.send(frame)
+        elif fault == DELAY:
+            plan.spawn(self._send_later(frame, policy.latency.sample(plan.random)))
+        elif fault == REORDER:
+            # Sent after the next frame, or once the window is over
+            await self._release()
+            self._held = frame
+            self._held_timer = asyncio.get_running_loop().call_later(plan.reorder_window, self._release_later)
+        elif fault == DUPLICATE:
+            await self._connection.send(frame)
+            await self._connection.send(frame)
+        elif fault == CORRUPT:
+            await self._connection.send(frame[:len(frame) // 2])
+        if fault is not None:
+            plan.report[_REPORTS[fault]] += 1
+        if fault != REORDER:
+            await self._release()
+        if policy.kill and not self._killed and plan.pool.uniform() < policy.kill:
+            self._killed = True
+            plan.report['connections_killed'] += 1
+            # No closing handshake, as if the station lost power
+            self._connection.transport.abort()
+
+    async def _release(self):
+        if self._held is None:
+            return
+        frame, self._held = self._held, None
+        self._held_timer.cancel()
+        try:
+            await self._connection.send(frame)
+        except websockets.exceptions.ConnectionClosed:
+            pass
+
+    def _release_later(self):
+        self._plan.spawn(self._release())
+
+    async def _send_later(self, frame, delay: float):
+        await asyncio.sleep(delay)
+        try:
+            await self._connection.send(frame)
+        except websockets.exceptions.ConnectionClosed:
+            pass
@@ -0,0 +1,340 @@
+import asyncio
+import functools
+import logging
+import random
+from collections import Counter
+
+import websockets.exceptions
+from ocpp.exceptions import OCPPError
+from ocpp.v201 import enums
+
+from . import cp as Cp
+from .admission import AdmissionController
+from .clock import make_clock
+from .config import FleetConfig
+from .faults import FaultPlan
+from .heartbeat import HeartbeatScheduler
+from .histogram import LatencyRecorder
+from .load import OpenLoopGenerator
+from .meter import MeterEngine
+from .metrics import rss_kb, start_metrics_server
+from .offline import OfflineQueue
+from .providers import FixedProvider, RandomProvider
+from .recording import TrafficRecorder
+from .responses import ResponsePolicies
+from .scenario import run_scenario
+from .station import Station
+from .transactions import TransactionDriver
+from .validation import ValidationPolicy
+
+LOGGER = logging.getLogger('ocpp_simulator.fleet')
+
+# Fields every charge point of the fleet boots with, the rest is random
+BOOT_PROFILE = {
+    'reason_type': enums.BootReasonType.power_up,
+    'connector_status': enums.ConnectorStatusType.available,
+    'evse_id': 1,
+    'connector_id': 1,
+}
+
+
+def merge_summary(summary: Counter, other: dict):
+    """ Merge the `other` run summary into `summary`, `*_max` entries keep the
+    highest value while the others are added up.
+    """
+    for key, value in other.items():
+        if key.endswith('_max'):
+            summary[key] = max(summary[key], value)
+        else:
+            summary[key] += value
+    return summary
+
+
+class Fleet:
+    """ Headless group of charge points sharing a single event loop.
+
+    Every charge point opens its own websocket to the central system, sends
+    a boot notification and the status of every connector of its layout, or
+    plays the scenario of the fleet, and then keeps its `cp.start()` task
+    running until the fleet is stopped. Booted charge points heartbeat at the
+    interval given by the central system. What else they do, and how, is set
+    by `config` (see `FleetConfig`), the keyword arguments replacing some of
+    its settings.
+
+    The memory the websockets take once the fleet is booted is reported in
+    `connections_rss_kb`.
+    """
+
+    def __init__(self, url_websocket_address: str, count: int, config: FleetConfig = None, **options):
+        config = (config or FleetConfig()).replace(**options)
+        if config.load_profile is not None and config.clock_speed != 1:
+            raise ValueError('The open loop load runs on the wall clock, it needs a clock speed of 1')
+        self.config = config
+        self.url_websocket_address = url_websocket_address
+        self.count = count
+        self.id_pattern = config.id_pattern
+        self.first_id = config.first_id
+        self.response_timeout = config.response_timeout
+        self.provider = config.provider or FixedProvider(BOOT_PROFILE, RandomProvider(config.seed))
+        # Seeds the random field values, for reproducible runs
+        self.seed = config.seed
+        self.scenario = config.scenario
+        self.load_action = config.load_action
+        self.load_profile = config.load_profile
+        self.metrics_port = config.metrics_port
+        self.layout = config.layout
+        self.charge_points = {}
+        self.tasks = {}
+        self.scenario_tasks = []
+        self.summary = Counter()
+        self.latencies = LatencyRecorder()
+        self.clock = make_clock(config.clock_speed, config.clock_start)
+        self.validation = ValidationPolicy(config.validation, config.validation_every)
+        self.responses = ResponsePolicies.from_file(config.responses, seed=config.seed) if config.responses else None
+        self.faults = FaultPlan.from_file(config.faults, seed=config.seed) if config.faults else None
+        self.connection = config.connection
+        self.heartbeats = HeartbeatScheduler(seed=config.seed, clock=self.clock)
+        self.meter = None
+        if config.meter_interval:
+            self.meter = MeterEngine(config.meter_interval, config.meter_samples, seed=config.seed, clock=self.clock)
+        self.transactions = None
+        if config.transaction_interval:
+            self.transactions = TransactionDriver(Cp.ChargePoint.transactions, self.meter,
+                                                  config.transaction_interval, config.session_duration,
+                                                  config.idle_duration, seed=config.seed, clock=self.clock)
+        self.reconnect = config.reconnect
+        self.backoff_base = config.backoff_base
+        self.backoff_max = config.backoff_max
+        self.offline_queue_path = config.offline_queue
+        self.offline_queue = None
+        self.replay_rate = config.replay_rate
+        self.reconnect_tasks = set()
+        self.record_path = config.record
+        self.recorder = None
+        self._random = random.Random(config.seed)
+        # Handshakes start at most connect_rate per second, concurrency at a time
+        self.admission = AdmissionController(config.connect_rate, config.concurrency, self.latencies)
+        self._stopping = False
+
+    def charge_point_ids(self):
+        return [self.id_pattern.format(index) for index in range(self.first_id, self.first_id + self.count)]
+
+    async def _open(self, cp_serial_number: str):
+        ws = await self.admission.connect(
+            f'ws://{self.url_websocket_address}/{cp_serial_number}',
+            subprotocols=['ocpp2.0.1'],
+            **self.connection.options()
+        )
+        if self.faults is not None:
+            ws = self.faults.wrap(ws, cp_serial_number)
+        return ws
+
+    def _listen(self, cp):
+        task = asyncio.ensure_future(cp.start())
+        task.add_done_callback(functools.partial(self._on_cp_stopped, cp))
+        self.tasks[cp.id] = task
+
+    async def connect(self, cp_serial_number: str):
+        self.summary['started'] += 1
+        try:
+            ws = await self._open(cp_serial_number)
+        except (OSError, asyncio.TimeoutError, websockets.exceptions.WebSocketException) as error:
+            LOGGER.warning('%s: connection failed: %s', cp_serial_number, error)
+            self.summary['failed'] += 1
+            return None
+
+        cp = Cp.ChargePoint(cp_serial_number, ws, response_timeout=self.response_timeout,
+                            provider=self.provider, station=Station(self.layout))
+        cp.latencies = self.latencies
+        cp.offline_queue = self.offline_queue
+        cp.recorder = self.recorder
+        cp.clock = self.clock
+        cp.validation = self.validation
+        cp.responses = self.responses
+        self.charge_points[cp_serial_number] = cp
+        self.summary['connected'] += 1
+        Cp.ChargePoint.metrics.connected += 1
+        self._listen(cp)
+
+        if self.scenario is not None:
+            self.scenario_tasks.append(asyncio.ensure_future(self.play(cp)))
+            return cp
+
+        try:
+            await self.boot(cp)
+            if self.offline_queue is not None and self.offline_queue.pending(cp.id):
+                # Left over by a previous run
+                await self.replay(cp)
+        except (asyncio.TimeoutError, websockets.exceptions.ConnectionClosed) as error:
+            LOGGER.warning('%s: boot failed: %s', cp_serial_number, error)
+            self.summary['boot_failed'] += 1
+        return cp
+
+    async def reconnect_cp(self, cp):
+        """ Open the websocket of `cp` again, waiting a random time between 0
+        and an exponentially growing delay before every attempt.
+        """
+        attempt = 0
+        while True:
+            delay = min(self.backoff_max, self.backoff_base * 2 ** min(attempt, 32))
+            await self.clock.sleep(self._random.uniform(0, delay))
+            try:
+                ws = await self._open(cp.id)
+                break
+            except (OSError, asyncio.TimeoutError, websockets.exceptions.WebSocketException) as error:
+                LOGGER.debug('%s: reconnection failed: %s', cp.id, error)
+                self.summary['reconnect_failed'] += 1
+                attempt += 1
+
+        cp._connection = ws
+        self.summary['reconnected'] += 1
+        Cp.ChargePoint.metrics.reconnects += 1
+        Cp.ChargePoint.metrics.connected += 1
+        self._listen(cp)
+        if self.offline_queue is None:
+            cp.online = True
+            return
+        try:
+            await self.replay(cp)
+        except (asyncio.TimeoutError, websockets.exceptions.ConnectionClosed) as error:
+            LOGGER.warning('%s: replay failed: %s', cp.id, error)
+
+    async def replay(self, cp):
+        """ Send the offline queue of `cp`, which stays offline until it is empty. """
+        cp.online = False
+        await self.offline_queue.replay(cp, self.replay_rate)
+        cp.online = True
+
+    async def boot(self, cp):
+        response = await cp.send_boot_notification()
+        if response is None or response.status != enums.RegistrationStatusType.accepted:
+            self.summary['boot_rejected'] += 1
+            return response
+        self.summary['boot_accepted'] += 1
+        self.heartbeats.add(cp, response.interval)
+
+        await cp.send_station_status()
+        for evse_id in range(1, cp.station.evses + 1):
+            if self.transactions is not None:
+                self.transactions.add(cp, evse_id)
+            elif self.meter is not None:
+                self.meter.start_session(cp, evse_id)
+        return response
+
+    async def play(self, cp):
+        try:
+            await run_scenario(cp, self.scenario)
+        except (OCPPError, ValueError, asyncio.TimeoutError, websockets.exceptions.ConnectionClosed) as error:
+            LOGGER.warning('%s: scenario failed: %s', cp.id, error)
+            self.summary['scenario_failed'] += 1
+        else:
+            self.summary['scenario_completed'] += 1
+
+    def _on_cp_stopped(self, cp, task):
+        Cp.ChargePoint.metrics.connected -= 1
+        cp.online = False
+        if task.cancelled():
+            return
+        # Retrieve the exception so asyncio does not complain about it.
+        if task.exception() is not None and not self._stopping:
+            self.summary['disconnected'] += 1
+            if self.reconnect:
+                reconnection = asyncio.ensure_future(self.reconnect_cp(cp))
+                self.reconnect_tasks.add(reconnection)
+                reconnection.add_done_callback(self.reconnect_tasks.discard)
+
+    async def start(self):
+        if self.seed is not None:
+            Cp.data_pool.seed(self.seed)
+        if self.offline_queue_path is not None:
+            self.offline_queue = OfflineQueue(self.offline_queue_path)
+        if self.record_path is not None:
+            self.recorder = TrafficRecorder(self.record_path)
+            self.recorder.start()
+        if self.meter is not None:
+            self.meter.start()
+        rss_before = rss_kb()
+        # Simulated time waits for the whole fleet to be booted
+        await self.clock.track(asyncio.gather(*(self.connect(cp_id) for cp_id in self.charge_point_ids())))
+        self.summary['connections_rss_kb'] += max(0, rss_kb() - rss_before)
+        return self.summary
+
+    async def stop(self):
+        self._stopping = True
+        # Simulated time stops here, whatever is still due
+        await self.clock.stop()
+        for task in self.reconnect_tasks:
+            task.cancel()
+        await asyncio.gather(*self.reconnect_tasks, return_exceptions=True)
+        await self.heartbeats.stop()
+        merge_summary(self.summary, self.heartbeats.report)
+        self.heartbeats.report.clear()
+        if self.transactions is not None:
+            await self.transactions.stop()
+            merge_summary(self.summary, self.transactions.report)
+            self.transactions.report.clear()
+        if self.meter is not None:
+            await self.meter.stop()
+            merge_summary(self.summary, self.meter.report)
+            self.meter.report.clear()
+        for task in self.scenario_tasks:
+            task.cancel()
+        await asyncio.gather(*self.scenario_tasks, return_exceptions=True)
+        self.scenario_tasks.clear()
+        for task in self.tasks.values():
+            task.cancel()
+        for cp in self.charge_points.values():
+            for task in cp._delayed:
+                task.cancel()
+        await asyncio.gather(*(cp._connection.close() for cp in self.charge_points.values()),
+                             return_exceptions=True)
+        await asyncio.gather(*self.tasks.values(), return_exceptions=True)
+        self.tasks.clear()
+        merge_summary(self.summary, self.admission.report)
+        self.admission.report.clear()
+        if self.offline_queue is not None:
+            self.offline_queue.close()
+            merge_summary(self.summary, self.offline_queue.report)
+            self.offline_queue.report.clear()
+        if self.recorder is not None:
+            await self.recorder.close()
+            merge_summary(self.summary, self.recorder.report)
+            self.recorder.report.clear()
+        if self.faults is not None:
+            await self.faults.stop()
+            merge_summary(self.summary, self.faults.report)
+            self.faults.report.clear()
+        if self.responses is not None:
+            merge_summary(self.summary, self.responses.report)
+            self.responses.report.clear()
+
+    async def load(self, duration: float = None):
+        generator = OpenLoopGenerator(self.charge_points.values(), Cp.ChargePoint.actions[self.load_action],
+                                      self.load_profile)
+        report = await generator.run(duration)
+        merge_summary(self.summary, {f'load_{key}': value for key, value in report.items()})
+        return report
+
+    async def run(self, duration: float = None):
+        """ Start the fleet, keep it alive for `duration` seconds and return the
+        run summary. Without a duration the fleet runs until its load profile or
+        its scenarios are over, or forever when it has none.
+        """
+        metrics_server = None
+        if self.metrics_port is not None:
+            metrics_server = await start_metrics_server(Cp.ChargePoint.metrics, port=self.metrics_port)
+        try:
+            await self.start()
+            if self.load_profile is not None:
+                await self.load(duration)
+            elif duration is None and self.scenario is not None:
+                await asyncio.gather(*self.scenario_tasks)
+            elif duration is None:
+                await asyncio.Event().wait()
+            else:
+                await self.clock.sleep(duration)
+        finally:
+            await self.stop()
+            if metrics_server is not None:
+                metrics_server.close()
+        return self.summary
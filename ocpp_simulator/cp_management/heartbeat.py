@@ -0,0 +1,78 @@
+import asyncio
+import logging
+import random
+from collections import Counter
+
+import websockets.exceptions
+from ocpp.exceptions import OCPPError
+
+from . import templates
+from .clock import Clock
+from .schedule import DueQueue
+
+LOGGER = logging.getLogger('ocpp_simulator.heartbeat')
+
+
+class _Entry:
+    __slots__ = ('cp', 'interval')
+
+    def __init__(self, cp, interval: float):
+        self.cp = cp
+        self.interval = interval
+
+
+class HeartbeatScheduler:
+    """ Heartbeats of any number of charge points, from a single timer.
+
+    Due times are kept in a `DueQueue`, so an idle charge point costs a heap
+    entry and no task.
+    The first heartbeat happens at a random point of the first interval and
+    every following one up to `jitter` (a fraction of the interval) early, so
+    charge points booted together do not stay in step. Heartbeats are never
+    late on purpose, the central system could think the station is offline.
+    Charge points keep their schedule while offline, without heartbeats.
+    """
+
+    def __init__(self, jitter: float = 0.1, seed=None, clock: Clock = None):
+        self.jitter = jitter
+        self.clock = clock or Clock()
+        self.report = Counter()
+        self._random = random.Random(seed)
+        self._entries = {}
+        self._due = DueQueue(self._on_due, self.clock)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, cp, interval: float):
+        """ Heartbeat `cp` every `interval` seconds, in place of any previous interval. """
+        if not interval or interval <= 0:
+            self.remove(cp)
+            return
+        entry = self._entries[cp.id] = _Entry(cp, interval)
+        self._due.push(self.clock.time() + self._random.uniform(0, interval), entry)
+
+    def remove(self, cp):
+        # The heap entry goes away the next time it is due
+        self._entries.pop(cp.id, None)
+
+    def _on_due(self, entry: _Entry, due: float, now: float):
+        if self._entries.get(entry.cp.id) is not entry:
+            return
+        if entry.cp.online:
+            self._due.spawn(self._beat(entry))
+        interval = entry.interval * (1 - self.jitter * self._random.random())
+        self._due.push(max(due + interval, now), entry)
+
+    async def _beat(self, entry: _Entry):
+        try:
+            await entry.cp.call_template(templates.heartbeat())
+        except (OCPPError, asyncio.TimeoutError, websockets.exceptions.ConnectionClosed) as error:
+            LOGGER.debug('%s: heartbeat failed: %s', entry.cp.id, error)
+            self.report['heartbeats_failed'] += 1
+        else:
+            self.report['heartbeats'] += 1
+
+    async def stop(self):
+        self._entries.clear()
+        await self._due.stop()
@@ -0,0 +1,138 @@
+import math
+from array import array
+
+# Values are recorded in microseconds. Below 2 ** SUB_BUCKET_BITS every value
+# has its own bucket, above that each power of two is split in
+# 2 ** (SUB_BUCKET_BITS - 1) buckets, which keeps the error below 0.8%.
+SUB_BUCKET_BITS = 8
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+HALF_SUB_BUCKETS = SUB_BUCKETS >> 1
+# Highest trackable value, about 19 hours
+MAX_VALUE = (1 << 36) - 1
+
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+def bucket_index(value: int) -> int:
+    if value < SUB_BUCKETS:
+        return value
+    shift = value.bit_length() - SUB_BUCKET_BITS
+    return SUB_BUCKETS + (shift - 1) * HALF_SUB_BUCKETS + (value >> shift) - HALF_SUB_BUCKETS
+
+
+def bucket_range(index: int):
+    """ Lowest and highest value counted in the bucket at `index`. """
+    if index < SUB_BUCKETS:
+        return index, index
+    shift, offset = divmod(index - SUB_BUCKETS, HALF_SUB_BUCKETS)
+    shift += 1
+    lowest = (offset + HALF_SUB_BUCKETS) << shift
+    return lowest, lowest + (1 << shift) - 1
+
+
+BUCKETS = bucket_index(MAX_VALUE) + 1
+
+
+class Histogram:
+    """ Log bucketed (HDR style) histogram of microsecond values.
+
+    Recording is a couple of integer operations on a preallocated array, so
+    it can stay on for every message. Histograms are merged by adding their
+    buckets, also across processes through `to_dict` / `from_dict`.
+    """
+
+    def __init__(self):
+        self.counts = array('Q', bytes(8 * BUCKETS))
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, value: int):
+        value = min(max(int(value), 0), MAX_VALUE)
+        self.counts[bucket_index(value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other: 'Histogram'):
+        for index, count in enumerate(other.counts):
+            if count:
+                self.counts[index] += count
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        return self
+
+    def percentile(self, percentile: float) -> int:
+        """ Highest value equivalent to the given percentile of the recorded values. """
+        if not self.count:
+            return 0
+        rank = max(1, math.ceil(percentile / 100 * self.count))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bucket_range(index)[1], self.max)
+        return self.max
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0
+
+    def summary(self):
+        """ Count, mean, percentiles and maximum, in milliseconds. """
+        summary = {'count': self.count, 'mean': round(self.mean / 1000, 3)}
+        for percentile in PERCENTILES:
+            summary[f'p{percentile:g}'] = self.percentile(percentile) / 1000
+        summary['max'] = self.max / 1000
+        return summary
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'total': self.total,
+            'max': self.max,
+            'buckets': {index: count for index, count in enumerate(self.counts) if count},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        histogram = cls()
+        for index, count in data['buckets'].items():
+            histogram.counts[int(index)] = count
+        histogram.count = data['count']
+        histogram.total = data['total']
+        histogram.max = data['max']
+        return histogram
+
+
+class LatencyRecorder:
+    """ One histogram per OCPP action. """
+
+    def __init__(self):
+        self.histograms = {}
+
+    def record(self, action: str, seconds: float):
+        try:
+            histogram = self.histograms[action]
+        except KeyError:
+            histogram = self.histograms[action] = Histogram()
+        histogram.record(seconds * 1_000_000)
+
+    def merge(self, other: 'LatencyRecorder'):
+        for action, histogram in other.histograms.items():
+            self.histograms.setdefault(action, Histogram()).merge(histogram)
+        return self
+
+    def summary(self):
+        return {action: self.histograms[action].summary() for action in sorted(self.histograms)}
+
+    def to_dict(self):
+        return {action: histogram.to_dict() for action, histogram in self.histograms.items()}
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        recorder = cls()
+        recorder.histograms = {action: Histogram.from_dict(histogram) for action, histogram in data.items()}
+        return recorder
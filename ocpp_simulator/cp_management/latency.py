@@ -0,0 +1,46 @@
+import random
+
+
+class Latency:
+    """ Response latency distribution, parsed from a spec in milliseconds:
+
+    * ``5`` or ``fixed:5``: always 5 ms
+    * ``uniform:1:20``: uniformly between 1 and 20 ms
+    * ``exp:5``: exponential with a 5 ms mean
+    * ``lognormal:5:0.5``: log-normal with a 5 ms median and a 0.5 shape
+    """
+
+    __slots__ = ('spec', '_draw')
+
+    def __init__(self, spec='0'):
+        self.spec = str(spec)
+        kind, *params = self.spec.split(':')
+        try:
+            if not params:
+                params, kind = [kind], 'fixed'
+            params = [float(param) for param in params]
+            if kind == 'fixed':
+                value, = params
+                self._draw = None if value <= 0 else lambda rng: value / 1000
+            elif kind == 'uniform':
+                low, high = params
+                self._draw = lambda rng: rng.uniform(low, high) / 1000
+            elif kind == 'exp':
+                mean, = params
+                if mean <= 0:
+                    raise ValueError('the mean must be positive')
+                self._draw = lambda rng: rng.expovariate(1 / mean) / 1000
+            elif kind == 'lognormal':
+                median, sigma = params
+                self._draw = lambda rng: median * rng.lognormvariate(0, sigma) / 1000
+            else:
+                raise ValueError(f'unknown distribution {kind!r}')
+        except (TypeError, ValueError) as error:
+            raise ValueError(f'Invalid latency {self.spec!r}: {error}') from None
+
+    def __bool__(self):
+        return self._draw is not None
+
+    def sample(self, rng: random.Random) -> float:
+        """ Seconds, 0 for no latency at all. """
+        return 0 if self._draw is None else self._draw(rng)
@@ -0,0 +1,171 @@
+import asyncio
+import bisect
+import itertools
+import logging
+from collections import Counter
+
+import websockets.exceptions
+from ocpp.exceptions import OCPPError
+
+LOGGER = logging.getLogger('ocpp_simulator.load')
+
+
+class RateProfile:
+    """ Target message rate over time, as a piecewise linear function given by
+    (seconds from start, messages per second) points.
+    """
+
+    def __init__(self, points):
+        self.points = sorted(points, key=lambda point: point[0])
+        self._times = [time for time, _ in self.points]
+        # Messages expected up to every point, the integral of the rate
+        self._expected = [0.0]
+        for (start, start_rate), (end, end_rate) in zip(self.points, self.points[1:]):
+            self._expected.append(self._expected[-1] + (end - start) * (start_rate + end_rate) / 2)
+
+    @classmethod
+    def constant(cls, rate: float, duration: float):
+        return cls([(0, rate), (duration, rate)])
+
+    @classmethod
+    def linear(cls, rate: float, duration: float, ramp: float, start_rate: float = 0):
+        """ Ramp from `start_rate` to `rate` over `ramp` seconds, then hold. """
+        return cls([(0, start_rate), (ramp, rate), (max(ramp, duration), rate)])
+
+    @classmethod
+    def step(cls, rate: float, duration: float, steps: int):
+        """ Climb to `rate` in `steps` equal stairs spread over `duration`. """
+        points = []
+        width = duration / steps
+        for index in range(steps):
+            step_rate = rate * (index + 1) / steps
+            points += [(index * width, step_rate), ((index + 1) * width, step_rate)]
+        return cls(points)
+
+    @classmethod
+    def spike(cls, rate: float, duration: float, peak: float, at: float, width: float):
+        """ Hold `rate` with a single burst up to `peak` lasting `width` seconds. """
+        return cls([(0, rate), (at, rate), (at, peak), (at + width, peak), (at + width, rate),
+                    (max(at + width, duration), rate)])
+
+    @property
+    def duration(self):
+        return self._times[-1]
+
+    def scaled(self, factor: float):
+        """ Same profile with every rate multiplied by `factor`. """
+        return RateProfile([(time, rate * factor) for time, rate in self.points])
+
+    def rate(self, elapsed: float) -> float:
+        index = bisect.bisect_right(self._times, elapsed)
+        if index == 0:
+            return self.points[0][1]
+        if index == len(self.points):
+            return self.points[-1][1]
+        (start, start_rate), (end, end_rate) = self.points[index - 1], self.points[index]
+        return start_rate + (end_rate - start_rate) * (elapsed - start) / (end - start)
+
+    def expected(self, elapsed: float) -> float:
+        """ Number of messages that should have been sent after `elapsed` seconds. """
+        elapsed = min(elapsed, self.duration)
+        index = max(1, bisect.bisect_right(self._times, elapsed))
+        if index == len(self.points):
+            return self._expected[-1]
+        start, start_rate = self.points[index - 1]
+        return self._expected[index - 1] + (elapsed - start) * (start_rate + self.rate(elapsed)) / 2
+
+
+PROFILES = ('constant', 'linear', 'step', 'spike')
+
+
+def build_profile(kind: str, rate: float, duration: float, ramp: float = 0, steps: int = 5,
+                  peak: float = None) -> RateProfile:
+    """ Build one of the named `PROFILES`. `ramp` is the linear ramp time or
+    the spike width, the spike happening halfway through the run.
+    """
+    if kind == 'constant':
+        return RateProfile.constant(rate, duration)
+    if kind == 'linear':
+        return RateProfile.linear(rate, duration, ramp)
+    if kind == 'step':
+        return RateProfile.step(rate, duration, steps)
+    if kind == 'spike':
+        return RateProfile.spike(rate, duration, peak or 2 * rate, duration / 2, ramp or duration / 10)
+    raise ValueError(f"Unknown rate profile '{kind}', expected one of {', '.join(PROFILES)}")
+
+
+class OpenLoopGenerator:
+    """ Fire `send(cp)` at the rate given by `profile`, round robin across the
+    charge points, without waiting for the responses.
+
+    Messages are released every `tick` seconds. When a message starts later
+    than `max_lag` seconds after its tick, the simulator itself (and not the
+    central system) is falling behind the schedule, and it is counted as late.
+    """
+
+    def __init__(self, charge_points, send, profile: RateProfile, tick: float = 0.01, max_lag: float = 0.05,
+                 drain: float = 5):
+        self.charge_points = list(charge_points)
+        self.send = send
+        self.profile = profile
+        self.tick = tick
+        self.max_lag = max_lag
+        # Seconds to wait for the responses still in flight at the end of the run
+        self.drain = drain
+        self.report = Counter()
+        self._in_flight = set()
+
+    async def _fire(self, cp, scheduled_at: float):
+        lag = asyncio.get_running_loop().time() - scheduled_at
+        if lag > self.max_lag:
+            self.report['late'] += 1
+        self.report['lag_ms_max'] = max(self.report['lag_ms_max'], int(lag * 1000))
+        try:
+            await self.send(cp)
+        except (OCPPError, asyncio.TimeoutError, websockets.exceptions.ConnectionClosed) as error:
+            LOGGER.debug('%s: load message failed: %s', cp.id, error)
+            self.report['failed'] += 1
+        else:
+            self.report['completed'] += 1
+
+    async def run(self, duration: float = None):
+        """ Run the profile for `duration` seconds (its own duration by default)
+        and return the report.
+        """
+        duration = self.profile.duration if duration is None else duration
+        if not self.charge_points:
+            return self.report
+
+        loop = asyncio.get_running_loop()
+        charge_points = itertools.cycle(self.charge_points)
+        started_at = loop.time()
+        scheduled_at = started_at
+        fired = 0
+        while scheduled_at - started_at <= duration:
+            now = loop.time()
+            if now - scheduled_at > self.max_lag:
+                self.report['late_ticks'] += 1
+
+            due = int(self.profile.expected(scheduled_at - started_at)) - fired
+            for _ in range(due):
+                task = asyncio.ensure_future(self._fire(next(charge_points), scheduled_at))
+                self._in_flight.add(task)
+                task.add_done_callback(self._in_flight.discard)
+            fired += due
+            self.report['in_flight_max'] = max(self.report['in_flight_max'], len(self._in_flight))
+
+            scheduled_at += self.tick
+            delay = scheduled_at - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+        self.report['sent'] = fired
+        self.report['target'] = int(self.profile.expected(duration))
+        if self._in_flight:
+            await asyncio.wait(self._in_flight, timeout=self.drain)
+        self.report['in_flight'] = len(self._in_flight)
+        # Given up on, rather than left running after the report
+        for task in self._in_flight:
+            task.cancel()
+        await asyncio.gather(*self._in_flight, return_exceptions=True)
+        return self.report
@@ -0,0 +1,209 @@
+import asyncio
+import logging
+import random
+from array import array
+from collections import Counter
+
+import websockets.exceptions
+from ocpp.exceptions import OCPPError
+from ocpp.v201 import enums
+
+from . import templates
+from .clock import Clock
+
+LOGGER = logging.getLogger('ocpp_simulator.meter')
+
+# Sampled on every tick, in this order
+MEASURANDS = (
+    enums.MeasurandType.energy_active_import_register,
+    enums.MeasurandType.power_active_import,
+    enums.MeasurandType.current_import,
+    enums.MeasurandType.voltage,
+)
+# Buffered values of a sample, its timestamp then the measurands
+SAMPLE_SIZE = 1 + len(MEASURANDS)
+
+# Maximum power of the sessions (W) and how often each one is drawn
+CHARGER_POWERS = (3700, 7400, 11000, 22000, 50000, 150000)
+CHARGER_WEIGHTS = (10, 30, 30, 15, 10, 5)
+# Above this power the EVSE is a DC charger
+AC_MAX_POWER = 22000
+AC_PHASE_VOLTAGE = 230.0
+# Power is held up to this state of charge, then tapers off linearly
+TAPER_SOC = 0.8
+MIN_POWER_RATIO = 0.05
+
+
+class MeterEngine:
+    """ Energy, power, current and voltage of every charging session.
+
+    Sessions live in slots of parallel arrays, one per quantity, and a tick
+    advances all the active ones in a single pass. The power follows a
+    constant power / constant voltage charging curve: the session charges at
+    its maximum power until `TAPER_SOC`, then the power drops with the state
+    of charge. A sample is taken every `interval` seconds and sent every
+    `samples` samples, all packed in a single MeterValues payload.
+    """
+
+    def __init__(self, interval: float = 10, samples: int = 1, seed=None, clock: Clock = None):
+        self.interval = interval
+        self.samples = samples
+        self.clock = clock or Clock()
+        self.report = Counter()
+        self._random = random.Random(seed)
+        self.capacity = array('d')
+        self.soc = array('d')
+        self.max_power = array('d')
+        self.energy = array('d')
+        self.power = array('d')
+        self.current = array('d')
+        self.voltage = array('d')
+        self.evse_ids = array('i')
+        self._charge_points = []
+        self._buffers = []
+        # Active slots, and the index of every slot in there
+        self._active = []
+        self._positions = array('i')
+        self._free = []
+        # Energy register (Wh) of every EVSE, by charge point ID and EVSE ID
+        self._registers = {}
+        self._timer = None
+        self._in_flight = set()
+
+    def __len__(self):
+        return len(self._active)
+
+    def start_session(self, cp, evse_id: int, max_power: float = None, soc: float = None,
+                      capacity: float = None, energy: float = None) -> int:
+        """ Start charging on `evse_id` of `cp` and return the session slot.
+
+        Missing parameters are drawn at random: the maximum power (W), the
+        initial state of charge (0 to 1) and the battery capacity (Wh). The
+        energy register (Wh) starts at `energy`, by default where the last
+        session of the EVSE left it.
+        """
+        if max_power is None:
+            max_power = self._random.choices(CHARGER_POWERS, CHARGER_WEIGHTS)[0]
+        if soc is None:
+            soc = self._random.uniform(0.1, 0.6)
+        if capacity is None:
+            capacity = self._random.uniform(40000, 100000)
+        if energy is None:
+            energy = self._registers.get((cp.id, evse_id), 0.0)
+        values = (capacity, soc, max_power, energy, 0.0, 0.0, 0.0)
+        columns = (self.capacity, self.soc, self.max_power, self.energy, self.power, self.current, self.voltage)
+        if self._free:
+            slot = self._free.pop()
+            for column, value in zip(columns, values):
+                column[slot] = value
+            self.evse_ids[slot] = evse_id
+            self._charge_points[slot] = cp
+            self._buffers[slot] = []
+        else:
+            slot = len(self.energy)
+            for column, value in zip(columns, values):
+                column.append(value)
+            self.evse_ids.append(evse_id)
+            self._charge_points.append(cp)
+            self._buffers.append([])
+            self._positions.append(0)
+        self._positions[slot] = len(self._active)
+        self._active.append(slot)
+        return slot
+
+    def stop_session(self, slot: int, flush: bool = True) -> float:
+        """ Stop the session, sending the samples not sent yet when `flush`,
+        and return its energy register (Wh).
+        """
+        # The last active slot takes its place
+        last = self._active.pop()
+        if last != slot:
+            position = self._positions[slot]
+            self._active[position] = last
+            self._positions[last] = position
+        if flush and self._buffers[slot]:
+            self._send(slot)
+        self._registers[self._charge_points[slot].id, self.evse_ids[slot]] = self.energy[slot]
+        self._charge_points[slot] = None
+        self._buffers[slot] = None
+        self._free.append(slot)
+        return self.energy[slot]
+
+    def step(self, seconds: float, timestamp: str = None):
+        """ Advance every active session by `seconds`, take a sample and return
+        the slots whose samples are ready to be sent.
+        """
+        timestamp = timestamp or self.clock.timestamp()
+        uniform = self._random.uniform
+        capacity, soc, max_power = self.capacity, self.soc, self.max_power
+        energy, power, current, voltage = self.energy, self.power, self.current, self.voltage
+        buffers = self._buffers
+        hours = seconds / 3600
+        ready = []
+        for slot in self._active:
+            state = soc[slot]
+            if state < TAPER_SOC:
+                ratio = 1.0
+            else:
+                ratio = max(MIN_POWER_RATIO, (1 - state) / (1 - TAPER_SOC)) if state < 1 else 0.0
+            slot_power = max_power[slot] * ratio * uniform(0.97, 1.0)
+            slot_energy = slot_power * hours
+            energy[slot] += slot_energy
+            soc[slot] = min(1.0, state + slot_energy / capacity[slot])
+            if max_power[slot] > AC_MAX_POWER:
+                slot_voltage = uniform(350, 360) + 100 * state
+                slot_current = slot_power / slot_voltage
+            else:
+                slot_voltage = AC_PHASE_VOLTAGE + uniform(-3, 3)
+                slot_current = slot_power / slot_voltage / (3 if max_power[slot] > 7400 else 1)
+            power[slot] = slot_power
+            voltage[slot] = slot_voltage
+            current[slot] = slot_current
+
+            buffer = buffers[slot]
+            buffer += (timestamp, round(energy[slot], 1), round(slot_power, 1), round(slot_current, 2),
+                       round(slot_voltage, 1))
+            if len(buffer) >= SAMPLE_SIZE * self.samples:
+                ready.append(slot)
+        return ready
+
+    def payload(self, slot: int):
+        """ Frame template and values of the samples buffered for `slot`, which are cleared. """
+        buffer = self._buffers[slot]
+        self._buffers[slot] = []
+        return templates.meter_values(MEASURANDS, len(buffer) // SAMPLE_SIZE), (self.evse_ids[slot], *buffer)
+
+    def _send(self, slot: int):
+        template, values = self.payload(slot)
+        samples = (len(values) - 1) // SAMPLE_SIZE
+        cp = self._charge_points[slot]
+        task = self.clock.track(asyncio.ensure_future(self._call(cp, template, values, samples)))
+        self._in_flight.add(task)
+        task.add_done_callback(self._in_flight.discard)
+
+    async def _call(self, cp, template, values, samples: int):
+        try:
+            await cp.call_template(template, *values)
+        except (OCPPError, asyncio.TimeoutError, websockets.exceptions.ConnectionClosed) as error:
+            LOGGER.debug('%s: meter values failed: %s', cp.id, error)
+            self.report['meter_failed'] += 1
+        else:
+            self.report['meter_payloads'] += 1
+            self.report['meter_samples'] += samples
+
+    def _tick(self):
+        self._timer = self.clock.call_at(self._timer.when() + self.interval, self._tick)
+        for slot in self.step(self.interval):
+            self._send(slot)
+
+    def start(self):
+        """ Tick every `interval` seconds, until stopped. """
+        self._timer = self.clock.call_at(self.clock.time() + self.interval, self._tick)
+
+    async def stop(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        for task in self._in_flight:
+            task.cancel()
+        await asyncio.gather(*self._in_flight, return_exceptions=True)
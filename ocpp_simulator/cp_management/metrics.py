@@ -0,0 +1,127 @@
+import asyncio
+import logging
+import os
+import resource
+from array import array
+
+from ocpp.v201 import enums
+
+LOGGER = logging.getLogger('ocpp_simulator.metrics')
+
+# Counters kept for every action: (name, Prometheus type, help)
+COUNTERS = (
+    ('calls_sent', 'counter', 'Calls sent to the other side.'),
+    ('call_results', 'counter', 'CallResults received for the calls sent.'),
+    ('call_errors', 'counter', 'CallErrors received for the calls sent.'),
+    ('timeouts', 'counter', 'Calls sent that got no response in time.'),
+    ('in_flight', 'gauge', 'Calls sent that are waiting for their response.'),
+    ('calls_received', 'counter', 'Calls received from the other side.'),
+    ('calls_rejected', 'counter', 'Calls received that could not be handled.'),
+)
+CALLS_SENT, CALL_RESULTS, CALL_ERRORS, TIMEOUTS, IN_FLIGHT, CALLS_RECEIVED, CALLS_REJECTED = range(len(COUNTERS))
+
+PREFIX = 'ocpp_simulator'
+
+
+class Metrics:
+    """ Counters and gauges by action, in one preallocated array.
+
+    Every action owns a fixed slot of `len(COUNTERS)` integers, so updating a
+    counter is a dict lookup and an in place array increment.
+    """
+
+    def __init__(self, actions=None):
+        actions = [action.value for action in enums.Action] + ['CostUpdated'] if actions is None else actions
+        self._slots = {}
+        self._values = array('q')
+        for action in actions:
+            self._slot(action)
+        self.connected = 0
+        self.reconnects = 0
+
+    def _slot(self, action: str) -> int:
+        try:
+            return self._slots[action]
+        except KeyError:
+            # Unknown actions only allocate the first time they are seen
+            slot = self._slots[action] = len(self._values)
+            self._values.extend([0] * len(COUNTERS))
+            return slot
+
+    def call_sent(self, action: str) -> int:
+        slot = self._slot(action)
+        self._values[slot + CALLS_SENT] += 1
+        self._values[slot + IN_FLIGHT] += 1
+        return slot
+
+    def call_done(self, slot: int, outcome: int):
+        """ Response of a call sent, `outcome` being CALL_RESULTS, CALL_ERRORS or TIMEOUTS. """
+        self._values[slot + IN_FLIGHT] -= 1
+        if outcome is not None:
+            self._values[slot + outcome] += 1
+
+    def call_received(self, action: str) -> int:
+        slot = self._slot(action)
+        self._values[slot + CALLS_RECEIVED] += 1
+        return slot
+
+    def call_rejected(self, slot: int):
+        self._values[slot + CALLS_REJECTED] += 1
+
+    def value(self, action: str, counter: int) -> int:
+        return self._values[self._slots[action] + counter]
+
+    def render(self) -> str:
+        """ All the metrics in the Prometheus text exposition format. """
+        lines = []
+        for counter, (name, kind, description) in enumerate(COUNTERS):
+            metric = f'{PREFIX}_{name}_total' if kind == 'counter' else f'{PREFIX}_{name}'
+            lines.append(f'# HELP {metric} {description}')
+            lines.append(f'# TYPE {metric} {kind}')
+            for action, slot in self._slots.items():
+                value = self._values[slot + counter]
+                if value:
+                    lines.append(f'{metric}{{action="{action}"}} {value}')
+        lines += [
+            f'# HELP {PREFIX}_connected_charge_points Charge points with an open websocket.',
+            f'# TYPE {PREFIX}_connected_charge_points gauge',
+            f'{PREFIX}_connected_charge_points {self.connected}',
+            f'# HELP {PREFIX}_reconnects_total Websockets opened again after a disconnection.',
+            f'# TYPE {PREFIX}_reconnects_total counter',
+            f'{PREFIX}_reconnects_total {self.reconnects}',
+        ]
+        return '\n'.join(lines) + '\n'
+
+
+def rss_kb() -> int:
+    """ Resident memory of this process in KiB, its peak where /proc is missing. """
+    try:
+        with open('/proc/self/statm', 'r', encoding='utf-8') as statm:
+            pages = int(statm.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') // 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+async def start_metrics_server(metrics: Metrics, host: str = '127.0.0.1', port: int = 9100):
+    """ Serve `metrics.render()` over HTTP, whatever the requested path. """
+    async def handle(reader, writer):
+        try:
+            # Only the request head matters, the body of a GET is empty
+            await reader.readuntil(b'\r\n\r\n')
+            body = metrics.render().encode('utf-8')
+            writer.write(
+                b'HTTP/1.1 200 OK\r\n'
+                b'Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n'
+                b'Content-Length: ' + str(len(body)).encode('ascii') + b'\r\n'
+                b'Connection: close\r\n\r\n' + body
+            )
+            await writer.drain()
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    LOGGER.info('Metrics server started on %s:%s', host, port)
+    return server
@@ -0,0 +1,612 @@
+import asyncio
+import functools
+import logging
+import random
+import resource
+import uuid
+from collections import Counter
+from datetime import datetime
+from hashlib import sha256
+
+import websockets.exceptions
+from faker import Faker
+from ocpp.exceptions import InternalError, OCPPError
+from ocpp.routing import on
+from ocpp.v201 import ChargePoint as cp
+from ocpp.v201 import call_result, enums, call, datatypes
+
+from .connection import ConnectionSettings, negotiate, serve
+from .definitions import load_definition
+from .latency import Latency
+from .registry import StationRegistry
+
+
+logging.basicConfig(level=logging.INFO)
+
+
+fake = Faker()
+
+
+class ActionPolicy:
+    __slots__ = ('latency', 'error_rate')
+
+    def __init__(self, latency: Latency, error_rate: float):
+        if not 0 <= error_rate <= 1:
+            raise ValueError(f'Invalid error rate {error_rate!r}, expected between 0 and 1')
+        self.latency = latency
+        self.error_rate = error_rate
+
+
+class MockBehaviour:
+    """ How the mock central system answers: a response latency and the
+    share of calls answered with an InternalError, by default and per action.
+
+    The policies are resolved once, every call only looks its action up and
+    draws its latency and whether it fails.
+    """
+
+    def __init__(self, latency='0', error_rate: float = 0, actions: dict = None, seed=None):
+        self.default = ActionPolicy(Latency(latency), float(error_rate))
+        self.actions = {
+            action: ActionPolicy(Latency(options.get('latency', latency)),
+                                 float(options.get('error_rate', error_rate)))
+            for action, options in (actions or {}).items()
+        }
+        self.report = Counter()
+        self._random = random.Random(seed)
+
+    @classmethod
+    def from_dict(cls, definition: dict, seed=None):
+        return cls(definition.get('latency', '0'), definition.get('error_rate', 0), definition.get('actions'),
+                   seed=seed)
+
+    @classmethod
+    def from_file(cls, path: str, seed=None):
+        return cls.from_dict(load_definition(path, 'behaviours'), seed=seed)
+
+    def policy(self, action: str) -> ActionPolicy:
+        return self.actions.get(action, self.default)
+
+    def draw(self, action: str):
+        """ (latency in seconds, whether to fail) of the next `action` call. """
+        policy = self.policy(action)
+        self.report['csms_calls'] += 1
+        fails = policy.error_rate > 0 and self._random.random() < policy.error_rate
+        if fails:
+            self.report['csms_errors_injected'] += 1
+        return policy.latency.sample(self._random), fails
+
+
+class ChargePoint(cp):
+    """ Central system side of a charge point connection. With a `behaviour`
+    its answers are delayed and some of them fail on purpose.
+    """
+
+    def __init__(self, id, connection, response_timeout=30, behaviour: MockBehaviour = None):
+        super().__init__(id, connection, response_timeout)
+        self.behaviour = behaviour
+        self._delayed = set()
+
+    async def _handle_call(self, msg):
+        if self.behaviour is None:
+            return await super()._handle_call(msg)
+        delay, fails = self.behaviour.draw(msg.action)
+        if not delay:
+            return await self._respond(msg, fails)
+        # Answered from its own task, the messages that follow are not held up
+        task = asyncio.ensure_future(self._respond(msg, fails, delay))
+        self._delayed.add(task)
+        task.add_done_callback(self._delayed.discard)
+        return None
+
+    async def _respond(self, msg, fails: bool, delay: float = 0):
+        if delay:
+            await asyncio.sleep(delay)
+        try:
+            if fails:
+                raise InternalError(details={'cause': 'Failure injected by the mock central system'})
+            await super()._handle_call(msg)
+        except OCPPError as error:
+            try:
+                await self._send(msg.create_call_error(error).to_json())
+            except websockets.exceptions.ConnectionClosed:
+                pass
+        except websockets.exceptions.ConnectionClosed:
+            pass
+
+    @on(enums.Action.BootNotification)
+    async def on_boot_notification(self, **kwargs):
+        return call_result.BootNotificationPayload(
+            current_time=datetime.utcnow().isoformat(),
+            interval=10,
+            status='Accepted'
+        )
+
+    @on(enums.Action.StatusNotification)
+    async def on_send_notification(self, **kwargs):
+        return call_result.StatusNotificationPayload()
+
+    @on(enums.Action.RequestStartTransaction)
+    async def on_send_start_transaction(self, **kwargs):
+        return call_result.RequestStartTransactionPayload(
+            status=enums.RequestStartStopStatusType.accepted
+        )
+
+    @on(enums.Action.Authorize)
+    async def on_send_authorize(self, **kwargs):
+        return call_result.AuthorizePayload(
+            id_token_info={'status': enums.AuthorizationStatusType.accepted}
+        )
+
+    @on(enums.Action.RequestStopTransaction)
+    async def on_send_stop_transaction(self, **kwargs):
+        return call_result.RequestStopTransactionPayload(
+            status=enums.RequestStartStopStatusType.accepted
+        )
+
+    @on(enums.Action.ClearCache)
+    async def on_clear_cache(self, **kwargs):
+        return call_result.ClearCachePayload(
+            status=enums.ClearCacheStatusType.accepted
+        )
+
+    @on(enums.Action.ClearedChargingLimit)
+    async def on_cleared_charging_limit(self, **kwargs):
+        return call_result.ClearedChargingLimitPayload()
+
+    @on(enums.Action.FirmwareStatusNotification)
+    async def on_firmware_status_notification(self, **kwargs):
+        return call_result.FirmwareStatusNotificationPayload()
+
+    @on(enums.Action.Get15118EVCertificate)
+    async def on_get_15118ev_certificate(self, **kwargs):
+        return call_result.Get15118EVCertificatePayload(
+            status=enums.Iso15118EVCertificateStatusType.accepted,
+            exi_response='Success message'
+        )
+
+    @on(enums.Action.GetCertificateStatus)
+    async def on_get_certificate_status(self, **kwargs):
+        return call_result.GetCertificateStatusPayload(
+            status=enums.GetCertificateStatusType.accepted
+        )
+
+    @on(enums.Action.GetDisplayMessages)
+    async def on_get_display_messages(self, **kwargs):
+        return call_result.GetDisplayMessagesPayload(
+            status=enums.GetDisplayMessagesStatusType.accepted
+        )
+
+    @on(enums.Action.LogStatusNotification)
+    async def on_log_status_notification(self, **kwargs):
+        return call_result.LogStatusNotificationPayload()
+
+    @on(enums.Action.MeterValues)
+    async def on_meter_value(self, **kwargs):
+        return call_result.MeterValuesPayload()
+
+    @on(enums.Action.NotifyChargingLimit)
+    async def on_notify_charging_limit(self, **kwargs):
+        return call_result.NotifyChargingLimitPayload()
+
+    @on(enums.Action.NotifyCustomerInformation)
+    async def on_notify_customer_information(self, **kwargs):
+        return call_result.NotifyCustomerInformationPayload()
+
+    @on(enums.Action.NotifyDisplayMessages)
+    async def on_notify_display_message(self, **kwargs):
+        return call_result.NotifyDisplayMessagesPayload()
+
+    @on(enums.Action.NotifyEVChargingNeeds)
+    async def on_notify_ev_charging_needs(self, **kwargs):
+        return call_result.NotifyEVChargingNeedsPayload(
+            status=enums.NotifyEVChargingNeedsStatusType.accepted
+        )
+
+    @on(enums.Action.NotifyEVChargingSchedule)
+    async def on_notify_ev_charging_schedule(self, **kwargs):
+        return call_result.NotifyEVChargingSchedulePayload(
+            status=enums.GenericStatusType.accepted
+        )
+
+    @on(enums.Action.NotifyEvent)
+    async def on_notify_event(self, **kwargs):
+        return call_result.NotifyEventPayload()
+
+    @on(enums.Action.NotifyMonitoringReport)
+    async def on_notify_monitoring_report(self, **kwargs):
+        return call_result.NotifyMonitoringReportPayload()
+
+    @on(enums.Action.NotifyReport)
+    async def on_notify_report(self, **kwargs):
+        return call_result.NotifyReportPayload()
+
+    @on(enums.Action.PublishFirmwareStatusNotification)
+    async def on_publish_firmware_status_notification(self, **kwargs):
+        return call_result.PublishFirmwareStatusNotificationPayload()
+
+    @on(enums.Action.ReportChargingProfiles)
+    async def on_report_charging_profiles(self, **kwargs):
+        return call_result.ReportChargingProfilesPayload()
+
+    @on(enums.Action.Heartbeat)
+    async def on_heartbeat(self, **kwargs):
+        return call_result.HeartbeatPayload(
+            current_time='10.10.2010'
+        )
+
+    @on(enums.Action.ReservationStatusUpdate)
+    async def on_reservation_status_update(self, **kwargs):
+        return call_result.ReservationStatusUpdatePayload()
+
+    @on(enums.Action.SecurityEventNotification)
+    async def on_security_event_notification(self, **kwargs):
+        return call_result.SecurityEventNotificationPayload()
+
+    @on(enums.Action.SignCertificate)
+    async def on_sign_certificate(self, **kwargs):
+        return call_result.SignCertificatePayload(
+            status=enums.GenericStatusType.accepted
+        )
+
+    @on(enums.Action.TransactionEvent)
+    async def on_transaction_event(self, **kwargs):
+        return call_result.TransactionEventPayload(
+            total_cost=100
+        )
+
+    async def send_cancel_reservation(self):
+        request = call.CancelReservationPayload(
+            reservation_id=12
+        )
+        response = await self.call(request)
+        return response
+
+    async def send_certificate_signed(self):
+        request = call.CertificateSignedPayload(
+            certificate_chain=fake.pystr(1, 12)
+        )
+        response = await self.call(request)
+        return response
+
+    async def send_change_availability(self):
+        request = call.ChangeAvailabilityPayload(
+            operational_status=enums.OperationalStatusType.operative
+        )
+        response = await self.call(request)
+        return response
+
+    async def send_clear_charging_profile(self):
+        request = call.ClearChargingProfilePayload()
+        response = await self.call(request)
+        return response
+
+    async def send_clear_display_message(self):
+        request = call.ClearDisplayMessagePayload(
+            id=fake.random_int(1, 100)
+        )
+        response = await self.call(request)
+        return response
+
+    async def send_clear_variable_monitoring(self):
+        request = call.ClearVariableMonitoringPayload(
+            id=[fake.random_int(1, 100)]
+        )
+        response = await self.call(request)
+        return response
+
+    async def send_cost_updated(self):
+        request = call.CostUpdatedPayload(
+            total_cost=fake.random_int(1, 100),
+            transaction_id=str(uuid.uuid4())
+        )
+        response = await self.call(request)
+        return response
+
+    async def send_customer_info(self):
+        request = call.CustomerInformationPayload(
+            request_id=fake.random_int(1, 100),
+            report=True,
+            clear=True
+        )
+        response = await self.call(request)
+        return response
+
+    async def send_data_transfer(self):
+        request = call.DataTransferPayload(
+            vendor_id=str(uuid.uuid4())
+        )
+        response = await self.call(request)
+        return response
+
+    async def send_delete_certificate(self):
+        request = call.DeleteCertificatePayload(
+            certificate_hash_data=datatypes.CertificateHashDataType(
+                hash_algorithm=enums.HashAlgorithmType.sha256,
+                issuer_name_hash=sha256(fake.pystr(1, 128).encode('utf-8')).hexdigest(),
+                issuer_key_hash=sha256(fake.pystr(1, 128).encode('utf-8')).hexdigest(),
+                serial_number=fake.pystr(1, 40)
+            )
+        )
+        response = await self.call(request)
+        return response
+
+    async def send_get_base_report(self):
+        request = call.GetBaseReportPayload(
+            request_id=fake.random_int(1, 100),
+            report_base=enums.ReportBaseType.configuration_inventory
+        )
+        response = await self.call(request)
+        return response
+
+    async def send_get_charging_profiles(self):
+        request = call.GetChargingProfilesPayload(
+            request_id=fake.random_int(1, 100),
+            charging_profile=datatypes.ChargingProfileCriterionType(
+                stack_level=fake.random_int(min=0, max=100),
+                charging_profile_purpose=enums.ChargingProfilePurposeType.tx_profile
+                )
+            )
+        response = await self.call(request)
+        return response
+
+    async def send_get_composite_schedule(self):
+        request = call.GetCompositeSchedulePayload(
+            duration=fake.random_int(min=0, max=100),
+            evse_id=fake.random_int(min=0, max=100)
+            )
+        response = await self.call(request)
+        return response
+
+    async def send_get_display_messages(self):
+        request = call.GetDisplayMessagesPayload(
+            request_id=fake.random_int(min=0, max=100)
+            )
+        response = await self.call(request)
+        return response
+
+    async def send_get_installed_certificate_ids(self):
+        request = call.GetInstalledCertificateIdsPayload()
+        response = await self.call(request)
+        return response
+
+    async def send_get_local_list_version(self):
+        request = call.GetLocalListVersionPayload()
+        response = await self.call(request)
+        return response
+
+    async def send_get_log(self):
+        request = call.GetLogPayload(
+            log_type=enums.LogType.security_log,
+            request_id=fake.random_int(min=0, max=100),
+            log=datatypes.LogParametersType(
+                remote_location=fake.pystr(1, 128)
+            )
+        )
+        response = await self.call(request)
+        return response
+
+    async def send_get_monitoring_report(self):
+        request = call.GetMonitoringReportPayload(
+            request_id=fake.random_int(min=0, max=100)
+            )
+        response = await self.call(request)
+        return response
+
+    async def send_publish_firmware(self):
+        request = call.PublishFirmwarePayload(
+            location=fake.pystr(1, 512),
+            checksum=fake.pystr(1, 20),
+            request_id=fake.random_int(min=0, max=100)
+            )
+        response = await self.call(request)
+        return response
+
+    async def send_reserve_now(self):
+        request = call.ReserveNowPayload(
+            id=fake.random_int(min=0, max=100),
+            expiry_date_time=str(datetime.now()),
+            id_token={
+                'idToken': str(uuid.uuid4()),
+                'type': enums.IdTokenType.central
+            }
+        )
+        response = await self.call(request)
+        return response
+
+    async def send_reset(self):
+        request = call.ResetPayload(
+            type=enums.ResetType.immediate
+        )
+        response = await self.call(request)
+        return response
+
+    async def send_send_local_list(self):
+        request = call.SendLocalListPayload(
+            version_number=fake.random_int(min=0, max=100),
+            update_type=enums.UpdateType.full
+        )
+        response = await self.call(request)
+        return response
+
+    async def send_set_charging_profile(self):
+        request = call.SetChargingProfilePayload(
+            evse_id=fake.random_int(min=0, max=100),
+            charging_profile=datatypes.ChargingProfileType(
+                id=fake.random_int(min=0, max=100),
+                stack_level=fake.random_int(min=0, max=100),
+                charging_profile_purpose=enums.ChargingProfilePurposeType.charging_station_max_profile,
+                charging_profile_kind=enums.ChargingProfileKindType.absolute,
+                charging_schedule=[datatypes.ChargingScheduleType(
+                    id=fake.random_int(min=0, max=100),
+                    charging_rate_unit=enums.ChargingRateUnitType.amps,
+                    charging_schedule_period=[datatypes.ChargingSchedulePeriodType(
+                        start_period=datetime.now().day,
+                        limit=fake.pyfloat(min_value=1, max_value=100)
+                    )]
+                )]
+            )
+        )
+        response = await self.call(request)
+        return response
+
+    async def send_set_display_message(self):
+        request = call.SetDisplayMessagePayload(
+            message=datatypes.MessageInfoType(
+                id=fake.random_int(min=0, max=100),
+                priority=enums.MessagePriorityType.normal_cycle,
+                message=datatypes.MessageContentType(
+                    format=enums.MessageFormatType.ascii,
+                    content=fake.pystr(1, 512),
+                    language=fake.pystr(1, 8)
+                )
+            )
+        )
+        response = await self.call(request)
+        return response
+
+    async def send_set_monitoring_base(self):
+        request = call.SetMonitoringBasePayload(
+            monitoring_base=enums.MonitorBaseType.all
+        )
+        response = await self.call(request)
+        return response
+
+    async def send_set_monitoring_level(self):
+        request = call.SetMonitoringLevelPayload(
+            severity=fake.random_int(min=0, max=9)
+        )
+        response = await self.call(request)
+        return response
+
+    async def send_set_network_profile(self):
+        request = call.SetNetworkProfilePayload(
+            configuration_slot=fake.random_int(min=0, max=100),
+            connection_data=datatypes.NetworkConnectionProfileType(
+                ocpp_version=enums.OCPPVersionType.ocpp20,
+                ocpp_transport=enums.OCPPTransportType.json,
+                ocpp_csms_url=fake.url(),
+                message_timeout=fake.random_int(min=0, max=100),
+                security_profile=fake.random_int(min=0, max=9),
+                ocpp_interface=enums.OCPPInterfaceType.wired0
+            )
+        )
+        response = await self.call(request)
+        return response
+
+    async def send_set_variable_monitoring(self):
+        request = call.SetVariableMonitoringPayload(
+            set_monitoring_data=[datatypes.SetMonitoringDataType(
+                id=fake.random_int(min=0, max=100),
+                value=fake.pyfloat(min_value=1, max_value=100),
+                type=enums.MonitorType.periodic,
+                severity=fake.random_int(min=0, max=9),
+                component=datatypes.ComponentType(
+                    name=str(uuid.uuid4()),
+                ),
+                variable=datatypes.VariableType(
+                    name=str(uuid.uuid4())
+                )
+            )]
+        )
+        response = await self.call(request)
+        return response
+
+    async def send_set_variables(self):
+        request = call.SetVariablesPayload(
+            set_variable_data=[datatypes.SetVariableDataType(
+                attribute_type=enums.AttributeType.maxSet,
+                attribute_value=fake.pystr(1, 1000),
+                component=datatypes.ComponentType(
+                    name=str(uuid.uuid4()),
+                ),
+                variable=datatypes.VariableType(
+                    name=str(uuid.uuid4())
+                )
+            )]
+        )
+        response = await self.call(request)
+        return response
+
+    async def send_trigger_message(self):
+        request = call.TriggerMessagePayload(
+            requested_message=enums.MessageTriggerType.log_status_notification
+        )
+        response = await self.call(request)
+        return response
+
+    async def send_unlock_connector(self):
+        request = call.UnlockConnectorPayload(
+            evse_id=fake.random_int(min=0, max=100),
+            connector_id=fake.random_int(min=0, max=100)
+        )
+        response = await self.call(request)
+        return response
+
+    async def send_unpublish_firmware(self):
+        request = call.UnpublishFirmwarePayload(
+            checksum=fake.pystr(1, 32)
+        )
+        response = await self.call(request)
+        return response
+
+    async def send_update_firmware(self):
+        request = call.UpdateFirmwarePayload(
+            request_id=fake.random_int(min=0, max=100),
+            firmware=datatypes.FirmwareType(
+                location=fake.pystr(1, 512),
+                retrieval_date_time=str(datetime.now())
+            )
+        )
+        response = await self.call(request)
+        return response
+
+
+# Charge points connected to the mock central system, to send them calls
+connections = StationRegistry()
+
+
+async def on_connect(websocket, path, behaviour: MockBehaviour = None, registry: StationRegistry = connections):
+    """ For every new charge point that connects, create a ChargePoint
+    instance, register it and start listening for messages.
+    """
+    if not await negotiate(websocket):
+        return
+
+    charge_point_id = path.strip('/')
+    cp = ChargePoint(charge_point_id, websocket, behaviour=behaviour)
+
+    registry.add(cp)
+    try:
+        await cp.start()
+    except websockets.exceptions.ConnectionClosed:
+        # Charge points leaving is no error of the central system
+        pass
+    finally:
+        registry.remove(cp)
+        for task in cp._delayed:  # pylint: disable=protected-access
+            task.cancel()
+
+
+def raise_open_files_limit() -> int:
+    """ Raise the soft limit of open files to the hard one, every connection
+    being a file descriptor, and return the new limit.
+    """
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft != hard:
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+        except (ValueError, OSError):
+            return soft
+    return hard
+
+
+async def start_central_system(host: str = '0.0.0.0', port: int = 9000, backlog: int = 100,
+                               behaviour: MockBehaviour = None, registry: StationRegistry = connections,
+                               connection: ConnectionSettings = None):  # nosec
+    """ Serve the mock central system on `host`:`port`, `backlog` being the
+    queue of connections not accepted yet, every websocket with the buffers
+    of `connection`.
+    """
+    return await serve(functools.partial(on_connect, behaviour=behaviour, registry=registry), host, port, backlog,
+                       connection)
@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import os
+import struct
+from collections import Counter, deque
+
+from ocpp.exceptions import OCPPError
+
+LOGGER = logging.getLogger('ocpp_simulator.offline')
+
+# Actions kept while a charge point is offline, the others are lost
+OFFLINE_ACTIONS = frozenset(('TransactionEvent', 'MeterValues'))
+
+# Record: payload length, kind, payload
+_HEADER = struct.Struct('>IB')
+_OFFSET = struct.Struct('>Q')
+FRAME, ACK = 1, 2
+
+
+class OfflineQueue:
+    """ Append-only on-disk log of the calls charge points made while offline.
+
+    A frame record holds the charge point ID, the unique ID, the action and
+    the serialized call. Once replayed, an ack record with the offset of the
+    frame is appended, so opening an existing log only keeps the frames
+    never acknowledged. Only the offsets of the pending frames stay in
+    memory, and the file is emptied whenever nothing is pending.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.report = Counter()
+        self._index = {}
+        self._pending = 0
+        self._load()
+        self._file = open(path, 'ab')  # pylint: disable=consider-using-with
+        self._reader = open(path, 'rb')  # pylint: disable=consider-using-with
+        self._size = self._file.tell()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        frames = {}
+        with open(self.path, 'rb') as log:
+            offset = 0
+            while True:
+                header = log.read(_HEADER.size)
+                if len(header) < _HEADER.size:
+                    break
+                length, kind = _HEADER.unpack(header)
+                payload = log.read(length)
+                if len(payload) < length:
+                    # Torn write of the last record
+                    break
+                if kind == FRAME:
+                    frames[offset] = payload.split(b'\n', 1)[0].decode('utf-8')
+                else:
+                    frames.pop(_OFFSET.unpack(payload)[0], None)
+                offset += _HEADER.size + length
+        for offset, cp_id in frames.items():
+            self._index.setdefault(cp_id, deque()).append(offset)
+        self._pending = len(frames)
+        if not frames:
+            os.truncate(self.path, 0)
+
+    def __len__(self):
+        return self._pending
+
+    def pending(self, cp_id: str) -> int:
+        return len(self._index.get(cp_id, ()))
+
+    def _write(self, kind: int, payload: bytes) -> int:
+        offset = self._size
+        self._file.write(_HEADER.pack(len(payload), kind) + payload)
+        self._file.flush()
+        self._size += _HEADER.size + len(payload)
+        return offset
+
+    def append(self, cp_id: str, unique_id: str, action: str, frame: str):
+        offset = self._write(FRAME, '\n'.join((cp_id, unique_id, action, frame)).encode('utf-8'))
+        self._index.setdefault(cp_id, deque()).append(offset)
+        self._pending += 1
+        self.report['offline_queued'] += 1
+
+    def _read(self, offset: int):
+        self._reader.seek(offset)
+        length, _ = _HEADER.unpack(self._reader.read(_HEADER.size))
+        _, unique_id, action, frame = self._reader.read(length).decode('utf-8').split('\n', 3)
+        return unique_id, action, frame
+
+    def _ack(self, offset: int):
+        self._pending -= 1
+        if self._pending:
+            self._write(ACK, _OFFSET.pack(offset))
+        else:
+            self._file.truncate(0)
+            self._size = 0
+
+    async def replay(self, cp, rate: float = None) -> int:
+        """ Send the frames queued for `cp` in order, at most `rate` per second,
+        and return how many were sent. Frames queued meanwhile are sent too.
+        """
+        offsets = self._index.get(cp.id)
+        replayed = 0
+        while offsets:
+            offset = offsets[0]
+            unique_id, action, frame = self._read(offset)
+            try:
+                await cp.call_frame(action, unique_id, frame, suppress=False)
+            except (OCPPError, asyncio.TimeoutError) as error:
+                # Received but not handled, replaying it again would not help
+                LOGGER.debug('%s: replayed %s failed: %s', cp.id, action, error)
+                self.report['offline_replay_failed'] += 1
+            offsets.popleft()
+            self._ack(offset)
+            replayed += 1
+            self.report['offline_replayed'] += 1
+            if rate and offsets:
+                await asyncio.sleep(1 / rate)
+        self._index.pop(cp.id, None)
+        return replayed
+
+    def close(self):
+        self._file.close()
+        self._reader.close()
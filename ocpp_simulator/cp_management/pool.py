@@ -0,0 +1,97 @@
+import random
+import string
+
+# Maps every byte to an ASCII letter, to turn random bytes into strings in bulk
+_LETTERS = bytes(ord(string.ascii_letters[byte % len(string.ascii_letters)]) for byte in range(256))
+_UUID_VARIANTS = '89ab'
+
+
+class _Pool:
+    __slots__ = ('values', 'index')
+
+    def __init__(self):
+        self.values = ()
+        self.index = 0
+
+
+class ValuePool:
+    """ Seeded pools of random message field values.
+
+    Every kind of value (an integer range, a string length range, uuids...)
+    has its own pool, generated `size` values at a time from one
+    `random.Random`, and handed out one by one. The same seed always gives
+    the same values in the same order.
+    """
+
+    def __init__(self, seed=None, size: int = 4096):
+        self.size = size
+        self._random = random.Random(seed)
+        self._pools = {}
+
+    def seed(self, seed):
+        """ Restart every pool from `seed`. """
+        self._random.seed(seed)
+        self._pools.clear()
+
+    def _draw(self, key):
+        try:
+            pool = self._pools[key]
+        except KeyError:
+            pool = self._pools[key] = _Pool()
+        if pool.index >= len(pool.values):
+            pool.values = getattr(self, f'_fill_{key[0]}')(self.size, *key[1:])
+            pool.index = 0
+        value = pool.values[pool.index]
+        pool.index += 1
+        return value
+
+    def integer(self, low: int = 0, high: int = 9999) -> int:
+        """ Integer between `low` and `high` included. """
+        return self._draw(('integer', low, high))
+
+    def decimal(self, low: float = 0, high: float = 100) -> float:
+        """ Float between `low` and `high` with two decimals. """
+        return self._draw(('decimal', low, high))
+
+    def uniform(self) -> float:
+        """ Float between 0 included and 1 excluded, at full precision. """
+        return self._draw(('uniform',))
+
+    def string(self, min_chars: int = 1, max_chars: int = 20) -> str:
+        """ ASCII letters string of `min_chars` to `max_chars` characters. """
+        return self._draw(('string', min_chars, max_chars))
+
+    def uuid(self) -> str:
+        """ Random (version 4) UUID string. """
+        return self._draw(('uuid',))
+
+    def url(self) -> str:
+        return self._draw(('url',))
+
+    def _fill_integer(self, size, low, high):
+        return self._random.choices(range(low, high + 1), k=size)
+
+    def _fill_decimal(self, size, low, high):
+        span = high - low
+        return [round(low + span * self._random.random(), 2) for _ in range(size)]
+
+    def _fill_uniform(self, size):
+        draw = self._random.random
+        return [draw() for _ in range(size)]
+
+    def _fill_string(self, size, min_chars, max_chars):
+        letters = self._random.randbytes(size * max_chars).translate(_LETTERS).decode('ascii')
+        lengths = self._random.choices(range(min_chars, max_chars + 1), k=size)
+        return [letters[index * max_chars:index * max_chars + length] for index, length in enumerate(lengths)]
+
+    def _fill_uuid(self, size):
+        digits = self._random.randbytes(16 * size).hex()
+        uuids = []
+        for start in range(0, 32 * size, 32):
+            value = digits[start:start + 32]
+            uuids.append(f'{value[:8]}-{value[8:12]}-4{value[13:16]}-'
+                         f'{_UUID_VARIANTS[int(value[16], 16) & 3]}{value[17:20]}-{value[20:]}')
+        return uuids
+
+    def _fill_url(self, size):
+        return [f'https://{self.string(3, 12).lower()}.example.com/' for _ in range(size)]
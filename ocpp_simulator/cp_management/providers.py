@@ -0,0 +1,70 @@
+import json
+import random
+from abc import ABC, abstractmethod
+
+
+def choice_values(options):
+    """ Values to choose from, for an enum type or a plain sequence of strings. """
+    return [getattr(option, 'value', option) for option in options]
+
+
+class ValueProvider(ABC):
+    """ Source of the field values used by the ChargePoint send_* methods.
+
+    `value` is asked for free form fields, `default` being a zero argument
+    callable generating a random value for it. `choice` is asked for fields
+    limited to the values of an enum.
+    """
+
+    @abstractmethod
+    async def value(self, field: str, question: str, default):
+        pass
+
+    @abstractmethod
+    async def choice(self, field: str, options, question: str):
+        pass
+
+
+class RandomProvider(ValueProvider):
+    """ Random values for every field, without touching the terminal. """
+
+    def __init__(self, seed=None):
+        self._random = random.Random(seed)
+        self._choices = {}
+
+    async def value(self, field: str, question: str, default):
+        return default()
+
+    async def choice(self, field: str, options, question: str):
+        try:
+            values = self._choices[options]
+        except KeyError:
+            values = self._choices[options] = choice_values(options)
+        return self._random.choice(values)
+
+
+class FixedProvider(ValueProvider):
+    """ Values of a fixed profile or a caller supplied dict, keyed by field name.
+    Fields missing from it are delegated to `fallback`, random by default.
+    """
+
+    def __init__(self, values: dict, fallback: ValueProvider = None):
+        self.values = dict(values)
+        self.fallback = fallback or RandomProvider()
+
+    @classmethod
+    def from_file(cls, path: str, fallback: ValueProvider = None):
+        with open(path, 'r', encoding='utf-8') as profile:
+            return cls(json.load(profile), fallback)
+
+    async def value(self, field: str, question: str, default):
+        try:
+            return self.values[field]
+        except KeyError:
+            return await self.fallback.value(field, question, default)
+
+    async def choice(self, field: str, options, question: str):
+        try:
+            return self.values[field]
+        except KeyError:
+            return await self.fallback.choice(field, options, question)
@@ -0,0 +1,114 @@
+import asyncio
+import heapq
+import struct
+import time
+from collections import Counter, namedtuple
+
+# Direction of a recorded frame, seen from the charge point
+SENT, RECEIVED = 0, 1
+
+# File header: magic, then wall clock and monotonic time of the recording start in nanoseconds
+MAGIC = b'OCPPREC1'
+_FILE_HEADER = struct.Struct('>8sQQ')
+# Record: frame length, monotonic time in nanoseconds, direction, charge point ID length,
+# followed by the charge point ID and the frame
+_HEADER = struct.Struct('>IQBH')
+
+Record = namedtuple('Record', ['timestamp', 'direction', 'cp_id', 'frame'])
+
+
+class TrafficRecorder:
+    """ Frames exchanged by charge points, captured in a length-prefixed log.
+
+    Recording a frame only appends it to an in-memory batch, which is
+    written to the log from the default executor every `flush_interval`
+    seconds, or as soon as it holds `batch_size` frames, so the event loop
+    never waits for the disk. Frames are stamped with the monotonic clock
+    of the machine, the logs of several processes can be merged.
+    """
+
+    def __init__(self, path: str, flush_interval: float = 0.5, batch_size: int = 10000):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.report = Counter()
+        self._file = open(path, 'wb')  # pylint: disable=consider-using-with
+        self._file.write(_FILE_HEADER.pack(MAGIC, time.time_ns(), time.monotonic_ns()))
+        self._batch = []
+        self._wakeup = None
+        self._writer = None
+        self._closing = False
+
+    def record(self, cp_id: str, direction: int, frame):
+        self._batch.append((time.monotonic_ns(), direction, cp_id, frame))
+        if len(self._batch) >= self.batch_size and self._wakeup is not None:
+            self._wakeup.set()
+
+    def start(self):
+        self._wakeup = asyncio.Event()
+        self._writer = asyncio.ensure_future(self._write_batches())
+
+    async def _write_batches(self):
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self):
+        if not self._batch:
+            return
+        batch, self._batch = self._batch, []
+        written = await asyncio.get_running_loop().run_in_executor(None, self._write, batch)
+        self.report['frames_recorded'] += len(batch)
+        self.report['bytes_recorded'] += written
+
+    def _write(self, batch) -> int:
+        chunks = []
+        pack = _HEADER.pack
+        for timestamp, direction, cp_id, frame in batch:
+            cp_id = cp_id.encode('utf-8')
+            if isinstance(frame, str):
+                frame = frame.encode('utf-8')
+            chunks += (pack(len(frame), timestamp, direction, len(cp_id)), cp_id, frame)
+        data = b''.join(chunks)
+        self._file.write(data)
+        self._file.flush()
+        return len(data)
+
+    async def close(self):
+        self._closing = True
+        if self._writer is not None:
+            # Let the batch being written finish, the log stays in order
+            self._wakeup.set()
+            await self._writer
+            self._writer = None
+        await self.flush()
+        self._file.close()
+
+
+def read_records(path: str, buffer_size: int = 1 << 20):
+    """ Records of a log in order, read as they go rather than all at once. """
+    with open(path, 'rb', buffering=buffer_size) as log:
+        header = log.read(_FILE_HEADER.size)
+        if len(header) < _FILE_HEADER.size or _FILE_HEADER.unpack(header)[0] != MAGIC:
+            raise ValueError(f'{path} is not a traffic recording')
+        while True:
+            header = log.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                return
+            length, timestamp, direction, id_length = _HEADER.unpack(header)
+            body = log.read(id_length + length)
+            if len(body) < id_length + length:
+                # Torn write of the last record
+                return
+            yield Record(timestamp, direction, body[:id_length].decode('utf-8'), body[id_length:].decode('utf-8'))
+
+
+def merge_records(paths):
+    """ Records of several logs of the same machine, in time order. """
+    if len(paths) == 1:
+        return read_records(paths[0])
+    return heapq.merge(*(read_records(path) for path in paths), key=lambda record: record.timestamp)
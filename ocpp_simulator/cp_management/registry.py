@@ -0,0 +1,34 @@
+class StationRegistry:
+    """ Connected charge points by ID.
+
+    A charge point connecting again under the same ID replaces the previous
+    one, which is only unregistered if it is still the registered one.
+    """
+
+    def __init__(self):
+        self._stations = {}
+
+    def add(self, cp):
+        self._stations[cp.id] = cp
+
+    def remove(self, cp):
+        if self._stations.get(cp.id) is cp:
+            del self._stations[cp.id]
+
+    def get(self, cp_id: str):
+        return self._stations.get(cp_id)
+
+    def __getitem__(self, cp_id: str):
+        return self._stations[cp_id]
+
+    def __contains__(self, cp_id: str):
+        return cp_id in self._stations
+
+    def __iter__(self):
+        return iter(self._stations.values())
+
+    def __len__(self):
+        return len(self._stations)
+
+    def ids(self):
+        return self._stations.keys()
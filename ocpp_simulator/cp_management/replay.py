@@ -0,0 +1,115 @@
+import asyncio
+import json
+import logging
+from collections import Counter
+
+import websockets.exceptions
+from ocpp.exceptions import OCPPError
+from ocpp.messages import MessageType
+
+from . import cp as Cp
+from .admission import AdmissionController
+from .histogram import LatencyRecorder
+from .providers import RandomProvider
+from .recording import SENT, merge_records
+
+LOGGER = logging.getLogger('ocpp_simulator.replay')
+
+
+class TrafficReplayer:
+    """ Calls of recorded charge points sent again to a central system.
+
+    The recorded calls are streamed from the logs and sent from their own
+    charge point, `speed` times faster than recorded, or as fast as possible
+    with no `speed`. The calls the central system makes are answered by the
+    charge points rather than replayed, their recorded IDs would not match.
+    At most `max_in_flight` calls wait for their response at once, which
+    bounds memory whatever the size of the logs.
+    """
+
+    def __init__(self, paths, url_websocket_address: str, speed: float = 1, max_in_flight: int = 1000,
+                 concurrency: int = 500, response_timeout: int = 30, seed=None):
+        self.paths = [paths] if isinstance(paths, str) else list(paths)
+        self.url_websocket_address = url_websocket_address
+        self.speed = speed
+        self.response_timeout = response_timeout
+        self.report = Counter()
+        self.latencies = LatencyRecorder()
+        self.admission = AdmissionController(concurrency=concurrency, latencies=self.latencies)
+        self.provider = RandomProvider(seed)
+        self.charge_points = {}
+        self._connecting = {}
+        self._tasks = []
+        self.max_in_flight = max_in_flight
+        # Created in run, inside the event loop
+        self._in_flight = None
+
+    async def _charge_point(self, cp_id: str):
+        cp = self.charge_points.get(cp_id)
+        if cp is not None:
+            return cp
+        # Concurrent calls of a charge point not connected yet share its handshake
+        if cp_id not in self._connecting:
+            self._connecting[cp_id] = asyncio.ensure_future(self._connect(cp_id))
+        return await asyncio.shield(self._connecting[cp_id])
+
+    async def _connect(self, cp_id: str):
+        ws = await self.admission.connect(f'ws://{self.url_websocket_address}/{cp_id}', subprotocols=['ocpp2.0.1'])
+        cp = Cp.ChargePoint(cp_id, ws, response_timeout=self.response_timeout, provider=self.provider)
+        cp.latencies = self.latencies
+        self.charge_points[cp_id] = cp
+        self._tasks.append(asyncio.ensure_future(cp.start()))
+        return cp
+
+    async def _send(self, cp_id: str, unique_id: str, action: str, frame: str):
+        try:
+            cp = await self._charge_point(cp_id)
+            await cp.call_frame(action, unique_id, frame, suppress=False)
+        except (OCPPError, asyncio.TimeoutError, OSError, websockets.exceptions.WebSocketException) as error:
+            LOGGER.debug('%s: replayed %s failed: %s', cp_id, action, error)
+            self.report['replay_failed'] += 1
+        else:
+            self.report['replayed'] += 1
+        finally:
+            self._in_flight.release()
+
+    async def run(self):
+        """ Replay the logs and return the report once every call is answered. """
+        loop = asyncio.get_running_loop()
+        started_at = first_timestamp = None
+        sends = set()
+        self._in_flight = asyncio.Semaphore(self.max_in_flight)
+        try:
+            for record in merge_records(self.paths):
+                # Cheap check first, most frames are not calls of the charge point
+                if record.direction != SENT or not record.frame.startswith('[2'):
+                    continue
+                message_type, unique_id, action, _ = json.loads(record.frame)
+                if message_type != MessageType.Call:
+                    continue
+                if self.speed:
+                    if started_at is None:
+                        started_at, first_timestamp = loop.time(), record.timestamp
+                    due = started_at + (record.timestamp - first_timestamp) / 1e9 / self.speed
+                    lag = loop.time() - due
+                    if lag < 0:
+                        await asyncio.sleep(-lag)
+                    else:
+                        self.report['replay_lag_ms_max'] = max(self.report['replay_lag_ms_max'], int(lag * 1000))
+                await self._in_flight.acquire()
+                send = asyncio.ensure_future(self._send(record.cp_id, unique_id, action, record.frame))
+                sends.add(send)
+                send.add_done_callback(sends.discard)
+            await asyncio.gather(*sends)
+        finally:
+            await self.stop()
+        self.report.update(self.admission.report)
+        return self.report
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*(cp._connection.close() for cp in self.charge_points.values()),
+                             return_exceptions=True)
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
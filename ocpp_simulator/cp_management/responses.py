@@ -0,0 +1,91 @@
+import random
+from collections import Counter
+
+from .definitions import load_definition
+from .latency import Latency
+
+ACCEPT, REJECT, ERROR = 'accept', 'reject', 'error'
+
+
+class ResponsePolicy:
+    """ Replies to one action: the weights of the accepted, rejected and
+    failed ones, their delay, and the status of the rejected ones, derived
+    from the handler when not given.
+    """
+
+    __slots__ = ('reject', 'error', 'delay', 'reject_status')
+
+    def __init__(self, accept: float = None, reject: float = 0, error: float = 0, delay='0',
+                 reject_status: str = None):
+        reject, error = float(reject), float(error)
+        accept = max(0.0, 1 - reject - error) if accept is None else float(accept)
+        total = accept + reject + error
+        if min(accept, reject, error) < 0 or not total:
+            raise ValueError(f'Invalid reply ratios {accept!r}, {reject!r}, {error!r}, expected positive weights')
+        # Upper bounds of a uniform draw, below `reject` it is rejected, then below `error` it fails
+        self.reject = reject / total
+        self.error = (reject + error) / total
+        self.delay = Latency(delay)
+        self.reject_status = reject_status
+
+    def __bool__(self):
+        """ False when every reply is accepted at once. """
+        return self.error > 0 or bool(self.delay)
+
+
+def _policy(options: dict) -> ResponsePolicy:
+    unknown = set(options) - {'accept', 'reject', 'error', 'delay', 'reject_status'}
+    if unknown:
+        raise ValueError(f'Unknown reply options {", ".join(sorted(unknown))}')
+    return ResponsePolicy(**options)
+
+
+class ResponsePolicies:
+    """ How the charge points answer the calls of the central system: the
+    share of accepted, rejected and failed replies and their delay, by
+    default and per action.
+
+    The table is resolved once, actions accepted at once map to None, and
+    drawing a reply is a dict lookup and at most two random numbers.
+    """
+
+    def __init__(self, default: dict = None, actions: dict = None, seed=None):
+        default = default or {}
+        self._default = _policy(default) or None
+        self._actions = {}
+        for action, options in (actions or {}).items():
+            self._actions[action] = _policy({**default, **options}) or None
+        self.report = Counter()
+        self._random = random.Random(seed)
+
+    @classmethod
+    def from_dict(cls, definition: dict, seed=None):
+        return cls(definition.get('default'), definition.get('actions'), seed=seed)
+
+    @classmethod
+    def from_file(cls, path: str, seed=None):
+        return cls.from_dict(load_definition(path, 'reply policies'), seed=seed)
+
+    def draw(self, action: str, reject_status: str = None):
+        """ (outcome, delay in seconds, reject status) of the next reply to `action`,
+        None when it is accepted at once. Rejects use the status of the policy, or
+        `reject_status` of the handler, and are accepted when there is neither.
+        """
+        policy = self._actions.get(action, self._default)
+        if policy is None:
+            return None
+        outcome, status = ACCEPT, None
+        if policy.error:
+            draw = self._random.random()
+            if draw < policy.reject:
+                status = policy.reject_status or reject_status
+                if status is not None:
+                    outcome = REJECT
+                    self.report['replies_rejected'] += 1
+            elif draw < policy.error:
+                outcome = ERROR
+                self.report['replies_failed'] += 1
+        delay = policy.delay.sample(self._random)
+        if delay:
+            self.report['replies_delayed'] += 1
+        return outcome, delay, status
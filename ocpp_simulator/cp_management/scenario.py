@@ -0,0 +1,98 @@
+import asyncio
+import json
+from collections import namedtuple
+
+from .cp import ChargePoint
+from .definitions import load_definition
+from .providers import FixedProvider, RandomProvider, ValueProvider
+
+# One message of a compiled scenario, `at` being its offset in seconds from the scenario start
+Step = namedtuple('Step', ['at', 'action', 'send', 'provider'])
+
+
+class Scenario:
+
+    def __init__(self, name: str, schedule):
+        self.name = name
+        self.schedule = tuple(schedule)
+
+    @property
+    def duration(self):
+        return self.schedule[-1].at if self.schedule else 0
+
+    def __len__(self):
+        return len(self.schedule)
+
+
+def _send_methods():
+    methods = dict(ChargePoint.messages)
+    methods.update(ChargePoint.actions)
+    return methods
+
+
+def compile_scenario(definition: dict, fallback: ValueProvider = None) -> Scenario:
+    """ Resolve every step of a scenario definition into a flat schedule of
+    offsets, so any number of charge points can share it.
+
+    Steps `send` an OCPP action name or a `ChargePoint.messages` key with the
+    given fixed `values`, optionally `repeat`-ed `every` n seconds, or `wait`
+    n seconds. Fields without a fixed value come from `fallback`.
+    """
+    methods = _send_methods()
+    fallback = fallback or RandomProvider()
+    common_values = definition.get('values', {})
+    providers = {}
+    schedule = []
+    cursor = 0.0
+
+    for index, step in enumerate(definition.get('steps', [])):
+        cursor += float(step.get('wait', 0))
+        if 'send' not in step:
+            continue
+
+        action = step['send']
+        try:
+            send = methods[action]
+        except KeyError:
+            raise ValueError(f"Step {index} of scenario sends unknown message '{action}'") from None
+
+        values = dict(common_values, **step.get('values', {}))
+        # Steps with the same values share a provider
+        key = json.dumps(values, sort_keys=True)
+        if key not in providers:
+            providers[key] = FixedProvider(values, fallback)
+
+        repeat = int(step.get('repeat', 1))
+        every = float(step.get('every', 0))
+        for _ in range(repeat):
+            schedule.append(Step(cursor, action, send, providers[key]))
+            cursor += every
+
+    return Scenario(definition.get('name', 'scenario'), schedule)
+
+
+def load_scenario(path: str, fallback: ValueProvider = None) -> Scenario:
+    return compile_scenario(load_definition(path, 'scenarios'), fallback)
+
+
+async def run_scenario(cp: ChargePoint, scenario: Scenario):
+    """ Send every message of the scenario from `cp`, waiting for the offset
+    of each step on the clock of `cp`. Returns the responses in schedule order.
+
+    Every message is tracked by the clock, so a discrete-event clock waits
+    for its response before jumping to the next step.
+    """
+    clock = cp.clock
+    started_at = clock.time()
+    provider = cp.provider
+    responses = []
+    try:
+        for step in scenario.schedule:
+            delay = started_at + step.at - clock.time()
+            if delay > 0:
+                await clock.sleep(delay)
+            cp.provider = step.provider
+            responses.append(await clock.track(asyncio.ensure_future(step.send(cp))))
+    finally:
+        cp.provider = provider
+    return responses
@@ -0,0 +1,73 @@
+import asyncio
+import heapq
+import itertools
+
+from .clock import Clock
+
+
+class DueQueue:
+    """ Due times of any number of items, behind a single timer.
+
+    Due times are kept in a heap and one `clock.call_at` timer wakes up for
+    the earliest of them, calling `on_due(item, due, now)` for every item
+    due, so an idle item costs a heap entry and no task. Items cannot be
+    taken out of the heap: `on_due` skips those that are gone. The tasks
+    started by `on_due` go through `spawn`, tracked by the clock and
+    cancelled on `stop`.
+    """
+
+    def __init__(self, on_due, clock: Clock = None):
+        self.on_due = on_due
+        self.clock = clock or Clock()
+        self._heap = []
+        self._sequence = itertools.count()
+        self._timer = None
+        self._firing = False
+        self._in_flight = set()
+
+    def __len__(self):
+        return len(self._heap)
+
+    def push(self, due: float, item):
+        heapq.heappush(self._heap, (due, next(self._sequence), item))
+        if not self._firing:
+            self._schedule()
+
+    def spawn(self, coroutine):
+        task = self.clock.track(asyncio.get_running_loop().create_task(coroutine))
+        self._in_flight.add(task)
+        task.add_done_callback(self._in_flight.discard)
+        return task
+
+    def _schedule(self):
+        if not self._heap:
+            return
+        due = self._heap[0][0]
+        if self._timer is not None:
+            if self._timer.when() <= due:
+                return
+            self._timer.cancel()
+        self._timer = self.clock.call_at(due, self._fire)
+
+    def _fire(self):
+        self._timer = None
+        now = self.clock.time()
+        heap = self._heap
+        # Items pushed again while firing are scheduled once, at the end
+        self._firing = True
+        try:
+            while heap and heap[0][0] <= now:
+                due, _, item = heapq.heappop(heap)
+                self.on_due(item, due, now)
+        finally:
+            self._firing = False
+        self._schedule()
+
+    async def stop(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._heap.clear()
+        for task in self._in_flight:
+            task.cancel()
+        await asyncio.gather(*self._in_flight, return_exceptions=True)
@@ -0,0 +1,85 @@
+import asyncio
+import logging
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from .config import FleetConfig
+from .fleet import Fleet, merge_summary
+from .histogram import LatencyRecorder
+
+
+def shard_ranges(count: int, workers: int, first_id: int = 0):
+    """ Split `count` charge point indexes starting at `first_id` into at most
+    `workers` contiguous (first_id, count) ranges of nearly equal size.
+    """
+    workers = max(1, min(workers, count))
+    size, remainder = divmod(count, workers)
+    ranges = []
+    for worker in range(workers):
+        shard_count = size + (1 if worker < remainder else 0)
+        ranges.append((first_id, shard_count))
+        first_id += shard_count
+    return ranges
+
+
+def run_shard(url_websocket_address: str, count: int, config: FleetConfig, duration: float = None):
+    """ Run a single fleet shard in its own event loop, used as the process
+    pool worker. Returns the shard summary and latency histograms as plain dicts.
+    """
+    logging.getLogger('ocpp').setLevel(logging.WARNING)
+    fleet = Fleet(url_websocket_address, count, config)
+    try:
+        asyncio.run(fleet.run(duration))
+    except KeyboardInterrupt:
+        pass
+    return dict(fleet.summary), fleet.latencies.to_dict()
+
+
+def shard_config(config: FleetConfig, worker: int, first_id: int, share: float) -> FleetConfig:
+    """ Settings of the worker running the `share` of the charge points starting at `first_id`.
+
+    The handshake budgets and the target rate are shared by the whole machine.
+    Each worker serves its metrics on the port following the one of the
+    previous worker, is seeded with the seed following the one of the previous
+    worker, and keeps its own offline queue and record logs.
+    """
+    return config.replace(
+        first_id=first_id,
+        concurrency=max(1, int(config.concurrency * share)),
+        connect_rate=config.connect_rate * share if config.connect_rate else None,
+        load_profile=config.load_profile.scaled(share) if config.load_profile else None,
+        metrics_port=None if config.metrics_port is None else config.metrics_port + worker,
+        seed=None if config.seed is None else config.seed + worker,
+        offline_queue=None if config.offline_queue is None else f'{config.offline_queue}.{worker}',
+        record=None if config.record is None else f'{config.record}.{worker}',
+    )
+
+
+def run_sharded(url_websocket_address: str, count: int, config: FleetConfig = None, workers: int = None,
+                duration: float = None):
+    """ Split the charge point ID range of `config` across a process pool, one
+    event loop per worker, and merge the worker summaries and latency
+    histograms into a single run summary.
+    """
+    config = config or FleetConfig()
+    ranges = shard_ranges(count, workers or os.cpu_count(), config.first_id)
+    summary = Counter(workers=len(ranges))
+    latencies = LatencyRecorder()
+    with ProcessPoolExecutor(max_workers=len(ranges)) as executor:
+        futures = [
+            executor.submit(run_shard, url_websocket_address, shard_count,
+                            shard_config(config, worker, shard_first_id, shard_count / count), duration)
+            for worker, (shard_first_id, shard_count) in enumerate(ranges)
+        ]
+        for future in futures:
+            while True:
+                try:
+                    shard_summary, shard_latencies = future.result()
+                    break
+                except KeyboardInterrupt:
+                    # Workers got the same SIGINT and are stopping their fleets
+                    continue
+            merge_summary(summary, shard_summary)
+            latencies.merge(LatencyRecorder.from_dict(shard_latencies))
+    return summary, latencies
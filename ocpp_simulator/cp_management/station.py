@@ -0,0 +1,114 @@
+from array import array
+
+from ocpp.v201 import enums
+
+# Connector statuses, stored by their index in this tuple
+STATUSES = tuple(status.value for status in enums.ConnectorStatusType)
+AVAILABLE, OCCUPIED, RESERVED, UNAVAILABLE, FAULTED = (STATUSES.index(status) for status in (
+    enums.ConnectorStatusType.available,
+    enums.ConnectorStatusType.occupied,
+    enums.ConnectorStatusType.reserved,
+    enums.ConnectorStatusType.unavailable,
+    enums.ConnectorStatusType.faulted,
+))
+
+
+class Station:
+    """ EVSEs and connectors of a charging station.
+
+    Every connector has a slot in a few small arrays, the connectors of EVSE
+    n following those of EVSE n - 1, so finding the slot of (evse_id,
+    connector_id) takes a single lookup in the EVSE offsets. Slots whose
+    status changed are queued in `changed` until they are notified.
+    """
+
+    __slots__ = ('offsets', 'evse_ids', 'connector_ids', 'statuses', 'operative', 'transaction_slots',
+                 'reservations', 'changed')
+
+    def __init__(self, layout=(1,)):
+        """ `layout` holds the number of connectors of every EVSE, EVSE IDs starting at 1. """
+        self.offsets = array('H', [0])
+        self.evse_ids = array('H')
+        self.connector_ids = array('H')
+        for evse_id, connectors in enumerate(layout, start=1):
+            self.offsets.append(self.offsets[-1] + connectors)
+            self.evse_ids.extend([evse_id] * connectors)
+            self.connector_ids.extend(range(1, connectors + 1))
+        self.statuses = array('b', [AVAILABLE] * len(self.evse_ids))
+        self.operative = array('b', [1] * len(self.evse_ids))
+        # Slot of every EVSE in the transaction table, found the first time it is needed
+        self.transaction_slots = array('i', [-1] * len(layout))
+        self.reservations = {}
+        self.changed = []
+
+    @property
+    def evses(self) -> int:
+        return len(self.offsets) - 1
+
+    def connectors(self, evse_id: int) -> int:
+        return self.offsets[evse_id] - self.offsets[evse_id - 1]
+
+    def slot(self, evse_id: int, connector_id: int = 1):
+        """ Slot of the connector, None when the station has no such connector. """
+        if 0 < evse_id < len(self.offsets):
+            slot = self.offsets[evse_id - 1] + connector_id - 1
+            if 0 < connector_id and slot < self.offsets[evse_id]:
+                return slot
+        return None
+
+    def slots(self, evse_id: int = None, connector_id: int = None):
+        """ Slots of the whole station, of an EVSE or of a single connector. """
+        if evse_id is None or evse_id == 0:
+            return range(len(self.statuses))
+        if connector_id is not None:
+            slot = self.slot(evse_id, connector_id)
+            return () if slot is None else (slot,)
+        if 0 < evse_id < len(self.offsets):
+            return range(self.offsets[evse_id - 1], self.offsets[evse_id])
+        return ()
+
+    def status(self, evse_id: int, connector_id: int) -> str:
+        return STATUSES[self.statuses[self.slot(evse_id, connector_id)]]
+
+    def set_status(self, slot: int, status: int):
+        if self.statuses[slot] != status:
+            self.statuses[slot] = status
+            self.changed.append(slot)
+
+    def set_operative(self, operative: bool, evse_id: int = None, connector_id: int = None):
+        """ Change the availability of the station, an EVSE or a connector.
+        Occupied connectors keep their status until they are released.
+        """
+        for slot in self.slots(evse_id, connector_id):
+            self.operative[slot] = operative
+            if operative and self.statuses[slot] == UNAVAILABLE:
+                self.set_status(slot, AVAILABLE)
+            elif not operative and self.statuses[slot] in (AVAILABLE, RESERVED):
+                self.set_status(slot, UNAVAILABLE)
+
+    def release(self, slot: int):
+        """ Connector unplugged, or transaction over. """
+        self.set_status(slot, AVAILABLE if self.operative[slot] else UNAVAILABLE)
+
+    def reserve(self, reservation_id: int, evse_id: int = None):
+        """ Reserve the first available connector, of the given EVSE if any, and return its slot. """
+        for slot in self.slots(evse_id):
+            if self.statuses[slot] == AVAILABLE:
+                self.reservations[reservation_id] = slot
+                self.set_status(slot, RESERVED)
+                return slot
+        return None
+
+    def cancel_reservation(self, reservation_id: int) -> bool:
+        slot = self.reservations.pop(reservation_id, None)
+        if slot is None:
+            return False
+        if self.statuses[slot] == RESERVED:
+            self.release(slot)
+        return True
+
+    def pop_changed(self):
+        """ (evse_id, connector_id) of the connectors changed since the last call. """
+        changed = [(self.evse_ids[slot], self.connector_ids[slot]) for slot in dict.fromkeys(self.changed)]
+        self.changed.clear()
+        return changed
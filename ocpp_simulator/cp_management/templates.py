@@ -0,0 +1,133 @@
+import json
+import re
+from dataclasses import asdict
+
+from ocpp.charge_point import remove_nones, snake_to_camel_case
+from ocpp.messages import Call, MessageType, validate_payload
+from ocpp.v201 import call, datatypes, enums
+
+# Placeholder values, json.dumps() turns them into "\u0000<name>\u0000"
+_PLACEHOLDER = '\x00{}\x00'
+_PLACEHOLDERS = re.compile(r'"\\u0000(\w+)\\u0000"')
+
+# Unit of the sampled values of a measurand, Wh (that of the energy registers) being the OCPP default
+UNITS = {
+    enums.MeasurandType.power_active_import.value: 'W',
+    enums.MeasurandType.current_import.value: 'A',
+    enums.MeasurandType.voltage.value: 'V',
+}
+
+
+def _encode(value) -> str:
+    if value.__class__ is str and value.isprintable() and '"' not in value and '\\' not in value:
+        return '"' + value + '"'
+    if value.__class__ is int:
+        return str(value)
+    return json.dumps(value)
+
+
+def _set(payload, path: str, value):
+    keys = [int(key) if key.isdigit() else key for key in path.split('.')]
+    for key in keys[:-1]:
+        payload = payload[key]
+    payload[keys[-1]] = value
+
+
+class FrameTemplate:
+    """ A Call frame serialized once, with holes for the values that change.
+
+    The payload (given with sample values) goes through the usual conversion
+    and schema validation once. The frame is then kept as string segments
+    around the unique ID and the `fields`, dotted paths into the camelCase
+    payload such as 'meterValue.0.timestamp', so rendering a frame only
+    joins the segments with the new values.
+    """
+
+    def __init__(self, payload, fields=(), ocpp_version: str = '2.0.1'):
+        self.action = payload.__class__.__name__[:-7]
+        self.fields = tuple(fields)
+        body = remove_nones(snake_to_camel_case(asdict(payload)))
+        validate_payload(Call(unique_id='template', action=self.action, payload=body), ocpp_version)
+
+        for index, field in enumerate(self.fields):
+            _set(body, field, _PLACEHOLDER.format(index + 1))
+        frame = json.dumps([MessageType.Call, _PLACEHOLDER.format(0), self.action, body], separators=(',', ':'))
+
+        # The unique ID is value 0, fields come next in the given order
+        self._segments = []
+        self._order = []
+        position = 0
+        for placeholder in _PLACEHOLDERS.finditer(frame):
+            self._segments.append(frame[position:placeholder.start()])
+            self._order.append(int(placeholder.group(1)))
+            position = placeholder.end()
+        self._segments.append(frame[position:])
+
+    def render(self, unique_id: str, *values) -> str:
+        values = (unique_id,) + values
+        segments = self._segments
+        pieces = [segments[0]]
+        for index, value in enumerate(self._order):
+            pieces.append(_encode(values[value]))
+            pieces.append(segments[index + 1])
+        return ''.join(pieces)
+
+
+class TemplateCache:
+    """ Frame templates by message shape, built the first time they are asked for. """
+
+    def __init__(self):
+        self._templates = {}
+
+    def get(self, key, build, fields=()) -> FrameTemplate:
+        """ Template for `key`, `build` returning the sample payload. """
+        try:
+            return self._templates[key]
+        except KeyError:
+            template = self._templates[key] = FrameTemplate(build(), fields)
+            return template
+
+    def __len__(self):
+        return len(self._templates)
+
+
+templates = TemplateCache()
+
+
+def heartbeat() -> FrameTemplate:
+    return templates.get('Heartbeat', call.HeartbeatPayload)
+
+
+def status_notification() -> FrameTemplate:
+    """ Rendered with timestamp, connector status, EVSE ID and connector ID. """
+    return templates.get(
+        'StatusNotification',
+        lambda: call.StatusNotificationPayload(timestamp='', connector_status='Available', evse_id=0, connector_id=0),
+        ('timestamp', 'connectorStatus', 'evseId', 'connectorId'),
+    )
+
+
+def _unit(measurand):
+    unit = UNITS.get(getattr(measurand, 'value', measurand))
+    return {'unit': unit} if unit else None
+
+
+def meter_values(measurands=(enums.MeasurandType.energy_active_import_register,), samples: int = 1) -> FrameTemplate:
+    """ Rendered with EVSE ID, then for each of the `samples` meter values a
+    timestamp and one value per measurand.
+    """
+    measurands = tuple(measurands)
+
+    def build():
+        sampled_values = [datatypes.SampledValueType(value=0, measurand=measurand, unit_of_measure=_unit(measurand))
+                          for measurand in measurands]
+        return call.MeterValuesPayload(
+            evse_id=0,
+            meter_value=[datatypes.MeterValueType(timestamp='', sampled_value=sampled_values)] * samples,
+        )
+
+    fields = ['evseId']
+    for sample in range(samples):
+        fields.append(f'meterValue.{sample}.timestamp')
+        fields += [f'meterValue.{sample}.sampledValue.{index}.value' for index in range(len(measurands))]
+    return templates.get(('MeterValues', measurands, samples), build, fields)
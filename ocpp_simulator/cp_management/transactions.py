@@ -0,0 +1,201 @@
+import asyncio
+import logging
+import random
+from array import array
+from collections import Counter
+
+import websockets.exceptions
+from ocpp.exceptions import OCPPError
+from ocpp.v201 import call, enums
+
+from .clock import Clock
+from .meter import MeterEngine
+from .pool import ValuePool
+from .schedule import DueQueue
+from .station import OCCUPIED
+
+LOGGER = logging.getLogger('ocpp_simulator.transactions')
+
+# Transaction state of an EVSE
+IDLE, CHARGING = 0, 1
+
+
+class TransactionTable:
+    """ Transaction state of EVSEs, in slots of parallel arrays.
+
+    Each (charge point ID, EVSE ID) pair owns a slot holding its state, its
+    current transaction ID and the sequence number of the last event sent,
+    which starts at 0 with the Started event and grows by one per event.
+    """
+
+    def __init__(self, pool: ValuePool = None):
+        # Source of the transaction IDs
+        self.pool = pool or ValuePool()
+        self.states = array('b')
+        self.seq_nos = array('i')
+        self.evse_ids = array('i')
+        self.transaction_ids = []
+        self._slots = {}
+
+    def __len__(self):
+        return len(self._slots)
+
+    def slot(self, cp_id: str, evse_id: int) -> int:
+        try:
+            return self._slots[cp_id, evse_id]
+        except KeyError:
+            slot = self._slots[cp_id, evse_id] = len(self.states)
+            self.states.append(IDLE)
+            self.seq_nos.append(0)
+            self.evse_ids.append(evse_id)
+            self.transaction_ids.append(None)
+            return slot
+
+    def event(self, slot: int, event_type: str):
+        """ Move the EVSE in `slot` through an `event_type` TransactionEvent and
+        return the transaction ID and sequence number the event carries.
+
+        An event that does not follow from the state (a Started event during a
+        transaction, or another event without one) begins a new transaction.
+        """
+        if event_type == enums.TransactionEventType.started or self.states[slot] == IDLE:
+            transaction_id = self.transaction_ids[slot] = self.pool.uuid()
+            self.states[slot] = CHARGING
+            self.seq_nos[slot] = 0
+        else:
+            transaction_id = self.transaction_ids[slot]
+            self.seq_nos[slot] += 1
+        if event_type == enums.TransactionEventType.ended:
+            self.states[slot] = IDLE
+            self.transaction_ids[slot] = None
+        return transaction_id, self.seq_nos[slot]
+
+
+class TransactionDriver:
+    """ Charging sessions run automatically on the EVSEs added to it.
+
+    An EVSE stays idle for a random time around `idle_duration` seconds,
+    starts a transaction, sends an Updated event every `update_interval`
+    seconds and ends it after a random time around `session_duration`
+    seconds, over and over. With a `meter` the energy register of its
+    session goes along with every event. The connector of the EVSE is
+    occupied during the session, and a StatusNotification follows the
+    Started and Ended events. All the EVSEs share a single `DueQueue`
+    timer, like the heartbeats.
+    """
+
+    def __init__(self, table: TransactionTable, meter: MeterEngine = None, update_interval: float = 60,
+                 session_duration: float = 3600, idle_duration: float = 600, seed=None, clock: Clock = None):
+        self.table = table
+        self.clock = clock or Clock()
+        self.meter = meter
+        self.update_interval = update_interval
+        self.session_duration = session_duration
+        self.idle_duration = idle_duration
+        self.report = Counter()
+        self._random = random.Random(seed)
+        self._charge_points = {}
+        self._ends_at = {}
+        self._meter_slots = {}
+        self._due = DueQueue(self._on_due, self.clock)
+
+    def __len__(self):
+        return len(self._charge_points)
+
+    def _duration(self, mean: float) -> float:
+        return self._random.uniform(0.5 * mean, 1.5 * mean)
+
+    def add(self, cp, evse_id: int):
+        slot = self.table.slot(cp.id, evse_id)
+        self._charge_points[slot] = cp
+        self._push(self.clock.time() + self._duration(self.idle_duration), slot)
+
+    def remove(self, slot: int):
+        # The heap entry goes away the next time it is due
+        self._charge_points.pop(slot, None)
+        self._ends_at.pop(slot, None)
+        meter_slot = self._meter_slots.pop(slot, None)
+        if meter_slot is not None:
+            self.meter.stop_session(meter_slot, flush=False)
+
+    def _push(self, due: float, slot: int):
+        self._due.push(due, (slot, self._charge_points[slot]))
+
+    def _on_due(self, item, due: float, now: float):
+        slot, cp = item
+        if self._charge_points.get(slot) is not cp:
+            return
+        payload, next_due = self._advance(slot, cp, now)
+        self._push(next_due, slot)
+        self._due.spawn(self._call(slot, cp, payload))
+
+    def _advance(self, slot: int, cp, now: float):
+        """ Next TransactionEvent of the EVSE in `slot`, and when the one after it is due. """
+        table = self.table
+        evse_id = table.evse_ids[slot]
+        extra = {}
+        if table.states[slot] == IDLE:
+            event_type, trigger_reason = enums.TransactionEventType.started, enums.TriggerReasonType.authorized
+            ends_at = self._ends_at[slot] = now + self._duration(self.session_duration)
+            due = min(now + self.update_interval, ends_at)
+            if self.meter is not None:
+                self._meter_slots[slot] = self.meter.start_session(cp, evse_id)
+            extra['evse'] = {'id': evse_id, 'connectorId': 1}
+            extra['id_token'] = {'idToken': table.pool.uuid(), 'type': enums.IdTokenType.iso14443}
+            context = enums.ReadingContextType.transaction_begin
+        elif now < self._ends_at.get(slot, now):
+            event_type = enums.TransactionEventType.updated
+            trigger_reason = enums.TriggerReasonType.meter_value_periodic
+            due = min(now + self.update_interval, self._ends_at[slot])
+            context = enums.ReadingContextType.sample_periodic
+        else:
+            event_type, trigger_reason = enums.TransactionEventType.ended, enums.TriggerReasonType.stop_authorized
+            due = now + self._duration(self.idle_duration)
+            context = enums.ReadingContextType.transaction_end
+
+        transaction_id, seq_no = table.event(slot, event_type)
+        connector = cp.station.slot(evse_id)
+        if connector is not None:
+            if event_type == enums.TransactionEventType.started:
+                cp.station.set_status(connector, OCCUPIED)
+            elif event_type == enums.TransactionEventType.ended:
+                cp.station.release(connector)
+        transaction_info = {'transactionId': transaction_id, 'chargingState': enums.ChargingStateType.charging}
+        timestamp = self.clock.timestamp()
+        meter_slot = self._meter_slots.get(slot)
+        if meter_slot is not None:
+            extra['meter_value'] = [{'timestamp': timestamp, 'sampledValue': [{
+                'value': round(self.meter.energy[meter_slot], 1),
+                'context': context,
+                'measurand': enums.MeasurandType.energy_active_import_register,
+            }]}]
+        if event_type == enums.TransactionEventType.ended:
+            transaction_info = {'transactionId': transaction_id, 'chargingState': enums.ChargingStateType.idle,
+                                'stoppedReason': enums.ReasonType.local}
+            self._ends_at.pop(slot, None)
+            if meter_slot is not None:
+                self.meter.stop_session(self._meter_slots.pop(slot))
+        payload = call.TransactionEventPayload(event_type=event_type, timestamp=timestamp,
+                                               trigger_reason=trigger_reason, seq_no=seq_no,
+                                               transaction_info=transaction_info, **extra)
+        return payload, due
+
+    async def _call(self, slot: int, cp, payload):
+        try:
+            response = await cp.call(payload, suppress=False)
+        except (OCPPError, asyncio.TimeoutError, websockets.exceptions.ConnectionClosed) as error:
+            LOGGER.debug('%s: transaction event failed: %s', cp.id, error)
+            self.report['transaction_events_failed'] += 1
+        else:
+            # No response: kept in the offline queue, to be sent once back online
+            if response is None:
+                self.report['transaction_events_queued'] += 1
+            else:
+                self.report[f'transactions_{payload.event_type.lower()}'] += 1
+        if payload.event_type != enums.TransactionEventType.updated:
+            await cp.notify_changes()
+
+    async def stop(self):
+        for slot in list(self._charge_points):
+            self.remove(slot)
+        await self._due.stop()
@@ -0,0 +1,260 @@
+import asyncio
+from dataclasses import asdict
+import enum
+import inspect
+import json
+import logging
+import time
+
+import websockets.exceptions
+
+from ocpp.exceptions import InternalError, NotSupportedError, OCPPError
+from ocpp.charge_point import camel_to_snake_case, remove_nones, snake_to_camel_case
+from ocpp.messages import Call, MessageType
+from ocpp.v201 import ChargePoint as Cp
+
+from . import metrics as Metrics
+from .clock import Clock
+from .histogram import LatencyRecorder
+from .offline import OFFLINE_ACTIONS
+from .recording import RECEIVED, SENT
+from .responses import ERROR
+from .validation import ValidationPolicy
+
+LOGGER = logging.getLogger('ocpp_simulator.cp')
+
+_action_names = {}
+
+
+def action_name(payload) -> str:
+    """ OCPP action of a call payload, BootNotificationPayload gives BootNotification. """
+    try:
+        return _action_names[payload.__class__]
+    except KeyError:
+        action = _action_names[payload.__class__] = payload.__class__.__name__[:-7]
+        return action
+
+
+def constant_reply(handler):
+    """ Mark an on_* handler whose reply depends neither on the request nor on
+    the charge point: it is built and serialized once, then served as is.
+    """
+    handler._constant_reply = True
+    return handler
+
+
+# Serialized payload of the constant replies, by handler and status
+_constant_replies = {}
+
+_reject_statuses = {}
+
+
+def reject_status(handler):
+    """ Status of a rejected reply of an on_* handler: Rejected when the type of
+    its status has it, its first other value otherwise, None without a status.
+    """
+    try:
+        return _reject_statuses[handler.__func__]
+    except KeyError:
+        pass
+    status = None
+    parameter = inspect.signature(handler).parameters.get('status')
+    if parameter is not None and isinstance(parameter.default, enum.Enum):
+        values = [member.value for member in type(parameter.default)]
+        others = [value for value in values if value != parameter.default.value]
+        status = 'Rejected' if 'Rejected' in values else others[0]
+    _reject_statuses[handler.__func__] = status
+    return status
+
+
+class ChargePointTransport(Cp):
+    """ Calls of a charge point and replies to those of the central system,
+    the `ChargePoint` message catalogue being built on top of it.
+
+    Frames are recorded, calls are timed and counted, kept in the offline
+    queue while offline, and validated as the validation policy says. Replies
+    follow the response policies, constant ones are serialized once.
+    """
+
+    def __init__(self, id, connection, response_timeout=30):
+        super().__init__(id, connection, response_timeout)
+        # Set when the websocket is lost, OFFLINE_ACTIONS then go to the offline queue if any
+        self.online = True
+        self.offline_queue = None
+        # Replies delayed by the response policies
+        self._delayed = set()
+
+    # Latency of the outgoing calls by action, shared by the process unless replaced
+    latencies = LatencyRecorder()
+    # Counters of the calls sent and received, shared by the process
+    metrics = Metrics.Metrics()
+    # TrafficRecorder capturing every frame sent and received, if any
+    recorder = None
+    # Time of the message timestamps, the wall clock unless replaced
+    clock = Clock()
+    # JSON schema validation of the calls and their responses, shared by the process unless replaced
+    validation = ValidationPolicy()
+    # ResponsePolicies of the replies to the central system, all accepted at once unless replaced
+    responses = None
+
+    async def _send(self, message):
+        if self.recorder is not None:
+            self.recorder.record(self.id, SENT, message)
+        await super()._send(message)
+
+    async def route_message(self, raw_msg):
+        if self.recorder is not None:
+            self.recorder.record(self.id, RECEIVED, raw_msg)
+        await super().route_message(raw_msg)
+
+    async def call(self, payload, suppress=True):
+        action = action_name(payload)
+        offline = not self.online and self.offline_queue is not None and action in OFFLINE_ACTIONS
+        if offline and action == 'TransactionEvent':
+            payload.offline = True
+        request = Call(unique_id=str(self._unique_id_generator()), action=action,
+                       payload=remove_nones(snake_to_camel_case(asdict(payload))))
+        if offline:
+            self.offline_queue.append(self.id, request.unique_id, action, request.to_json())
+            return None
+        self.validation.validate(request, self._ocpp_version)
+        try:
+            response = await self._exchange(action, request.unique_id, request.to_json())
+        except OCPPError as error:
+            LOGGER.warning('%s: %s call answered with a CallError: %s', self.id, action, error)
+            if suppress:
+                return None
+            raise
+        response.action = action
+        self.validation.validate(response, self._ocpp_version)
+        return getattr(self._call_result, payload.__class__.__name__)(**camel_to_snake_case(response.payload))
+
+    async def call_template(self, template, *values, suppress=True):
+        """ Send the frame rendered from a pre-serialized `template` with `values`.
+
+        Unlike `call`, neither the request nor the response goes through the
+        schema validation, and the response payload is returned as a dict.
+        """
+        unique_id = str(self._unique_id_generator())
+        frame = template.render(unique_id, *values)
+        if not self.online and self.offline_queue is not None and template.action in OFFLINE_ACTIONS:
+            self.offline_queue.append(self.id, unique_id, template.action, frame)
+            return None
+        return await self.call_frame(template.action, unique_id, frame, suppress)
+
+    async def call_frame(self, action: str, unique_id: str, frame: str, suppress=True):
+        """ Send an already serialized call and return its response payload as a dict. """
+        try:
+            return (await self._exchange(action, unique_id, frame)).payload
+        except OCPPError:
+            if suppress:
+                return None
+            raise
+
+    async def _exchange(self, action: str, unique_id: str, frame: str):
+        """ Send a serialized call and return its CallResult, CallErrors are raised. """
+        slot = self.metrics.call_sent(action)
+        started_at = time.perf_counter()
+        try:
+            async with self._call_lock:
+                await self._send(frame)
+                response = await self._get_specific_response(unique_id, self._response_timeout)
+        except asyncio.TimeoutError:
+            self.metrics.call_done(slot, Metrics.TIMEOUTS)
+            raise
+        except BaseException:
+            self.metrics.call_done(slot, None)
+            raise
+        self.latencies.record(action, time.perf_counter() - started_at)
+        if response.message_type_id == MessageType.CallError:
+            self.metrics.call_done(slot, Metrics.CALL_ERRORS)
+            raise response.to_exception()
+        self.metrics.call_done(slot, Metrics.CALL_RESULTS)
+        return response
+
+    async def _handle_call(self, msg):
+        slot = self.metrics.call_received(msg.action)
+        reply = None
+        if self.responses is not None:
+            handler = self.route_map.get(msg.action, {}).get('_on_action')
+            reply = self.responses.draw(msg.action, handler and reject_status(handler))
+        if reply is not None and reply[1]:
+            # Answered from its own task, the messages that follow are not held up
+            task = asyncio.ensure_future(self._reply_later(msg, slot, reply))
+            self._delayed.add(task)
+            task.add_done_callback(self._delayed.discard)
+            return
+        try:
+            await self._respond(msg, reply)
+        except OCPPError:
+            self.metrics.call_rejected(slot)
+            raise
+
+    async def _reply_later(self, msg, slot, reply):
+        await self.clock.sleep(reply[1])
+        try:
+            try:
+                await self._respond(msg, reply)
+            except OCPPError as error:
+                self.metrics.call_rejected(slot)
+                await self._send(msg.create_call_error(error).to_json())
+        except websockets.exceptions.ConnectionClosed:
+            pass
+
+    async def _respond(self, msg, reply=None):
+        """ The handling of the ocpp library, with the schemas validating what the validation policy says,
+        and the reply drawn from the response policies if any.
+        """
+        handlers = self.route_map.get(msg.action, {})
+        if '_on_action' not in handlers:
+            raise NotSupportedError(details={'cause': f'No handler for {msg.action} registered.'})
+        validate = not handlers.get('_skip_schema_validation', False)
+        if validate:
+            self.validation.validate(msg, self._ocpp_version)
+        handler = handlers['_on_action']
+        status = None
+        if reply is not None:
+            outcome, _, status = reply
+            if outcome == ERROR:
+                raise InternalError(details={'cause': 'Failure injected by the response policy'})
+        if getattr(handler, '_constant_reply', False):
+            payload = await self._constant_reply(msg, handler, validate, status)
+            await self._send(f'[3,{json.dumps(msg.unique_id)},{payload}]')
+        else:
+            kwargs = camel_to_snake_case(msg.payload)
+            if status is not None:
+                kwargs['status'] = status
+            try:
+                response = handler(**kwargs)
+                if inspect.isawaitable(response):
+                    response = await response
+            except Exception as error:  # pylint: disable=broad-except
+                LOGGER.exception("Error while handling request '%s'", msg)
+                await self._send(msg.create_call_error(error).to_json())
+                return
+            response = msg.create_call_result(snake_to_camel_case(remove_nones(asdict(response))))
+            if validate:
+                self.validation.validate(response, self._ocpp_version)
+            await self._send(response.to_json())
+
+        if '_after_action' in handlers and status is None:
+            # Not awaited, the hook may send calls of its own
+            hook = handlers['_after_action'](**camel_to_snake_case(msg.payload))
+            if inspect.isawaitable(hook):
+                asyncio.ensure_future(hook)
+
+    async def _constant_reply(self, msg, handler, validate: bool, status: str = None) -> str:
+        """ Serialized payload of a constant reply, built on the first request of its handler and status. """
+        key = (handler.__func__, status)
+        try:
+            return _constant_replies[key]
+        except KeyError:
+            pass
+        response = handler() if status is None else handler(status=status)
+        if inspect.isawaitable(response):
+            response = await response
+        response = msg.create_call_result(snake_to_camel_case(remove_nones(asdict(response))))
+        if validate:
+            self.validation.validate(response, self._ocpp_version)
+        payload = _constant_replies[key] = json.dumps(response.payload, separators=(',', ':'))
+        return payload
@@ -0,0 +1,44 @@
+from ocpp.messages import get_validator, validate_payload
+
+ALWAYS, SAMPLED, OFF = 'always', 'sampled', 'off'
+MODES = (ALWAYS, SAMPLED, OFF)
+
+
+class ValidationPolicy:
+    """ Which messages the JSON schemas validate: all of them, one in `every`
+    of each action and direction when sampled, or none.
+
+    The compiled validator of every action and direction is looked up once.
+    Invalid messages go through the validation of the ocpp library again, for
+    the same OCPP errors.
+    """
+
+    def __init__(self, mode: str = ALWAYS, every: int = 100):
+        if mode not in MODES:
+            raise ValueError(f'Unknown validation mode {mode!r}, expected one of {", ".join(MODES)}')
+        self.mode = mode
+        self.every = max(1, every)
+        self._validators = {}
+        self._seen = {}
+
+    def validate(self, message, ocpp_version: str = '2.0.1'):
+        if self.mode == OFF:
+            return
+        key = (message.message_type_id, message.action)
+        if self.mode == SAMPLED:
+            seen = self._seen.get(key, 0)
+            self._seen[key] = seen + 1
+            if seen % self.every:
+                return
+        try:
+            validator = self._validators[key]
+        except KeyError:
+            try:
+                validator = get_validator(message.message_type_id, message.action, ocpp_version)
+            except (OSError, ValueError):
+                # No schema, the ocpp library raises the error
+                validate_payload(message, ocpp_version)
+                return
+            self._validators[key] = validator
+        if not validator.is_valid(message.payload):
+            validate_payload(message, ocpp_version)
@@ -0,0 +1,43 @@
+import asyncio
+
+import websockets.exceptions
+
+from ocpp_simulator.cp_management.station import Station
+
+
+class FakeChargePoint:
+    """ Charge point without a websocket: the calls it is asked to send are
+    kept, and answered at once, or after `latency` seconds of real time.
+    While offline calls are answered None, as when kept in the offline queue,
+    and once `closed` heartbeats fail as on a lost connection.
+    """
+
+    def __init__(self, id, online=True, closed=False, clock=None, latency=0):
+        self.id = id
+        self.online = online
+        self.closed = closed
+        self.clock = clock
+        self.latency = latency
+        self.station = Station()
+        self.beats = []
+        self.payloads = []
+        self.frames = []
+        self.notified = []
+
+    async def call(self, payload, suppress=True):
+        self.payloads.append(payload)
+        return payload if self.online else None
+
+    async def call_template(self, template, *values):
+        if self.closed:
+            raise websockets.exceptions.ConnectionClosedOK(None, None)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.beats.append(self.clock.time() if self.clock else asyncio.get_running_loop().time())
+        return {'currentTime': 'now'}
+
+    async def call_frame(self, action, unique_id, frame, suppress=True):
+        self.frames.append((action, unique_id, frame))
+
+    async def notify_changes(self):
+        self.notified += [self.station.status(*connector) for connector in self.station.pop_changed()]
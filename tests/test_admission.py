@@ -0,0 +1,56 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from .central_system import start_central_system
+from ocpp_simulator.cp_management.admission import HANDSHAKE, AdmissionController
+from ocpp_simulator.cp_management.fleet import Fleet
+
+
+@pytest.mark.asyncio
+async def test_handshakes_are_paced_and_bounded():
+    in_progress = []
+    most = []
+
+    async def connect(uri, **kwargs):
+        in_progress.append(uri)
+        most.append(len(in_progress))
+        await asyncio.sleep(0.05)
+        in_progress.remove(uri)
+        return uri
+
+    controller = AdmissionController(rate=100, concurrency=3)
+    loop = asyncio.get_running_loop()
+    started_at = loop.time()
+    with patch('ocpp_simulator.cp_management.admission.websockets.connect', connect):
+        await asyncio.gather(*(controller.connect(f'ws://cs/{index}') for index in range(20)))
+
+    # 20 handshakes 10ms apart, and never more than 3 of them at once
+    assert loop.time() - started_at >= 0.19
+    assert max(most) == 3
+    assert controller.report['handshakes'] == 20
+    assert controller.latencies.histograms[HANDSHAKE].count == 20
+
+
+@pytest.mark.asyncio
+async def test_failed_handshakes_are_counted():
+    controller = AdmissionController()
+    with pytest.raises(OSError):
+        await controller.connect('ws://127.0.0.1:9001/CP1')
+    assert controller.report['handshakes_failed'] == 1
+    assert controller.report['handshakes_failed_ConnectionRefusedError'] == 1
+    assert HANDSHAKE not in controller.latencies.histograms
+
+
+@pytest.mark.asyncio
+async def test_fleet_records_handshake_latencies():
+    server = await start_central_system()
+    fleet = Fleet('0.0.0.0:9000', 4, id_pattern='STORM{:02d}', connect_rate=200, concurrency=2)
+
+    summary = await fleet.run(duration=0)
+    assert summary['handshakes'] == 4
+    assert fleet.latencies.histograms[HANDSHAKE].count == 4
+
+    server.close()
+    await server.wait_closed()
@@ -0,0 +1,97 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from .central_system import start_central_system
+from .conftest import FakeChargePoint
+from ocpp_simulator.cp_management.clock import Clock, DiscreteClock, ScaledClock, make_clock
+from ocpp_simulator.cp_management.fleet import Fleet
+from ocpp_simulator.cp_management.heartbeat import HeartbeatScheduler
+
+START = datetime(2024, 1, 1)
+
+
+def test_clock_for_a_speed():
+    assert type(make_clock()) is Clock
+    assert isinstance(make_clock(60), ScaledClock)
+    assert isinstance(make_clock(0, START), DiscreteClock)
+
+
+@pytest.mark.asyncio
+async def test_scaled_clock_runs_faster():
+    clock = ScaledClock(100, START)
+    fired = []
+    clock.call_at(clock.time() + 10, fired.append, 'timer')
+    await clock.sleep(5)
+    assert not fired
+    assert 5 <= clock.time() < 8
+    await asyncio.sleep(0.06)
+    assert fired == ['timer']
+    assert START + timedelta(seconds=10) < clock.now() < START + timedelta(seconds=20)
+
+
+@pytest.mark.asyncio
+async def test_discrete_clock_jumps_from_event_to_event():
+    clock = DiscreteClock(START)
+    fired = []
+    for when in (30, 10, 20):
+        clock.call_at(when, fired.append, when)
+    cancelled = clock.call_at(15, fired.append, 15)
+    cancelled.cancel()
+
+    loop = asyncio.get_running_loop()
+    started_at = loop.time()
+    await clock.sleep(24 * 3600)
+    assert loop.time() - started_at < 0.5
+    assert fired == [10, 20, 30]
+    assert clock.now() == START + timedelta(days=1)
+
+
+@pytest.mark.asyncio
+async def test_discrete_clock_waits_for_tracked_tasks():
+    clock = DiscreteClock(START, lookahead=0)
+    seen = []
+
+    def start_work():
+        clock.track(asyncio.ensure_future(asyncio.sleep(0.05)))
+
+    clock.call_at(1, start_work)
+    clock.call_at(2, lambda: seen.append(asyncio.get_running_loop().time()))
+    started_at = asyncio.get_running_loop().time()
+    await clock.sleep(3)
+    # The second timer waited for the work of the first one
+    assert seen[0] - started_at >= 0.05
+
+
+@pytest.mark.asyncio
+async def test_a_simulated_hour_of_heartbeats():
+    clock = DiscreteClock(START)
+    scheduler = HeartbeatScheduler(jitter=0, seed=1, clock=clock)
+    charge_points = [FakeChargePoint(f'CP{index}', clock=clock, latency=0.001) for index in range(10)]
+    for cp in charge_points:
+        scheduler.add(cp, 60)
+    await clock.sleep(3600)
+    await scheduler.stop()
+    for cp in charge_points:
+        assert len(cp.beats) == 60
+        gaps = {round(later - earlier) for earlier, later in zip(cp.beats, cp.beats[1:])}
+        assert gaps == {60}
+
+
+@pytest.mark.asyncio
+async def test_fleet_on_a_discrete_clock():
+    server = await start_central_system()
+    fleet = Fleet('127.0.0.1:9000', 3, id_pattern='DES{}', meter_interval=60, clock_speed=0, clock_start=START)
+    loop = asyncio.get_running_loop()
+    started_at = loop.time()
+    summary = await fleet.run(3600)
+    assert loop.time() - started_at < 20
+    assert fleet.clock.now() == START + timedelta(hours=1)
+    # The central system asks for a heartbeat every 10 seconds, meter values every minute
+    assert 3 * 355 <= summary['heartbeats'] <= 3 * 400
+    assert 3 * 59 <= summary['meter_payloads'] <= 3 * 60
+    for cp in fleet.charge_points.values():
+        assert cp.clock is fleet.clock
+    server.close()
+    await server.wait_closed()
@@ -0,0 +1,30 @@
+import pytest
+
+from .central_system import start_central_system
+from ocpp_simulator.cp_management.connection import PROFILES, ConnectionSettings
+from ocpp_simulator.cp_management.fleet import Fleet
+
+
+def test_settings_are_websockets_options():
+    assert ConnectionSettings().options() == {
+        'max_size': 2 ** 20, 'max_queue': 32, 'read_limit': 2 ** 16, 'write_limit': 2 ** 16, 'compression': 'deflate',
+    }
+    lean = PROFILES['lean'].replace(max_size=2 ** 18, max_queue=None)
+    assert lean.options()['compression'] is None
+    assert (lean.max_size, lean.max_queue) == (2 ** 18, PROFILES['lean'].max_queue)
+
+
+@pytest.mark.asyncio
+async def test_fleet_opens_lean_websockets():
+    server = await start_central_system()
+    fleet = Fleet('127.0.0.1:9000', 3, id_pattern='LEAN{:03d}', connection=PROFILES['lean'])
+
+    await fleet.start()
+    assert fleet.summary['boot_accepted'] == 3
+    for cp in fleet.charge_points.values():
+        assert cp._connection.extensions == []
+        assert cp._connection.max_size == PROFILES['lean'].max_size
+    assert 'connections_rss_kb' in fleet.summary
+    await fleet.stop()
+    server.close()
+    await server.wait_closed()
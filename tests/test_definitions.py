@@ -0,0 +1,15 @@
+import json
+
+from ocpp_simulator.cp_management.definitions import load_definition
+from ocpp_simulator.cp_management.scenario import load_scenario
+
+
+def test_json_and_yaml_definitions(tmp_path):
+    definition = {'steps': [{'send': 'Heartbeat', 'every': 60, 'repeat': 2}]}
+    json_path = tmp_path / 'day.json'
+    json_path.write_text(json.dumps(definition))
+    yaml_path = tmp_path / 'day.yaml'
+    yaml_path.write_text('steps:\n  - send: Heartbeat\n    every: 60\n    repeat: 2\n')
+
+    assert load_definition(str(json_path)) == load_definition(str(yaml_path)) == definition
+    assert len(load_scenario(str(yaml_path))) == 2
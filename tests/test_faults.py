@@ -0,0 +1,92 @@
+import asyncio
+import json
+
+import pytest
+
+from .central_system import start_central_system
+from ocpp_simulator.cp_management.faults import FaultPlan, FaultPolicy, FaultyConnection
+from ocpp_simulator.cp_management.fleet import Fleet
+
+
+class Connection:
+    """ Websocket keeping what is sent. """
+
+    def __init__(self, received=()):
+        self.sent = []
+        self.received = list(received)
+        self.transport = self
+        self.aborted = False
+
+    async def send(self, frame):
+        self.sent.append(frame)
+
+    async def recv(self):
+        return self.received.pop(0)
+
+    def abort(self):
+        self.aborted = True
+
+
+def test_policies_without_faults_leave_the_websocket_alone():
+    plan = FaultPlan(actions={'Heartbeat': {'drop': 0}}, charge_points={'CP2': {'drop': 0.1}})
+    connection = Connection()
+    assert plan.wrap(connection, 'CP1') is connection
+    assert isinstance(plan.wrap(connection, 'CP2'), FaultyConnection)
+    with pytest.raises(ValueError):
+        FaultPolicy(drop=0.6, duplicate=0.6)
+    with pytest.raises(ValueError):
+        FaultPlan({'lose': 0.1})
+
+
+@pytest.mark.asyncio
+async def test_faults_of_the_frames():
+    connection = Connection()
+    plan = FaultPlan(actions={
+        'Heartbeat': {'drop': 1},
+        'Authorize': {'duplicate': 1},
+        'MeterValues': {'corrupt': 1},
+        'StatusNotification': {'reorder': 1},
+        'TransactionEvent': {'kill': 1},
+    }, seed=1)
+    faulty = plan.wrap(connection, 'CP1')
+    await faulty.send('[2,"1","Heartbeat",{}]')
+    await faulty.send('[2,"2","Authorize",{}]')
+    await faulty.send('[2,"3","MeterValues",{}]')
+    await faulty.send('[2,"4","StatusNotification",{}]')
+    await faulty.send('[2,"5","BootNotification",{}]')
+    assert connection.sent == ['[2,"2","Authorize",{}]', '[2,"2","Authorize",{}]', '[2,"3","Mete',
+                               '[2,"5","BootNotification",{}]', '[2,"4","StatusNotification",{}]']
+    assert not connection.aborted
+    await faulty.send('[2,"6","TransactionEvent",{}]')
+    assert connection.aborted
+    assert plan.report == {'frames_dropped': 1, 'frames_duplicated': 1, 'frames_corrupted': 1,
+                           'frames_reordered': 1, 'connections_killed': 1}
+
+
+@pytest.mark.asyncio
+async def test_replies_follow_the_action_of_their_call():
+    connection = Connection(['[2,"42","Reset",{"type":"Immediate"}]'])
+    plan = FaultPlan(actions={'Reset': {'delay': 1, 'latency': '10'}}, reorder_window=0.01)
+    faulty = plan.wrap(connection, 'CP1')
+    await faulty.recv()
+    await faulty.send('[3,"42",{"status":"Accepted"}]')
+    await faulty.send('[3,"43",{}]')
+    assert connection.sent == ['[3,"43",{}]']
+    await asyncio.sleep(0.05)
+    assert connection.sent == ['[3,"43",{}]', '[3,"42",{"status":"Accepted"}]']
+    assert plan.report['frames_delayed'] == 1
+
+
+@pytest.mark.asyncio
+async def test_fleet_injects_faults(tmp_path):
+    path = tmp_path / 'faults.json'
+    path.write_text(json.dumps({'actions': {'BootNotification': {'duplicate': 1}}}))
+    server = await start_central_system()
+    fleet = Fleet('127.0.0.1:9000', 3, id_pattern='FAULT{:03d}', faults=str(path))
+
+    await fleet.start()
+    await fleet.stop()
+    assert fleet.summary['boot_accepted'] == 3
+    assert fleet.summary['frames_duplicated'] == 3
+    server.close()
+    await server.wait_closed()
@@ -0,0 +1,70 @@
+import asyncio
+import functools
+
+import pytest
+
+from .central_system import start_central_system
+from ocpp_simulator.cp_management.config import FleetConfig
+from ocpp_simulator.cp_management.fleet import Fleet
+from ocpp_simulator.cp_management.sharding import run_sharded, shard_config, shard_ranges
+
+
+@pytest.mark.asyncio
+async def test_fleet_boots_every_charge_point():
+    server = await start_central_system()
+    fleet = Fleet('0.0.0.0:9000', 5, id_pattern='FLEET{:03d}')
+
+    await fleet.start()
+    assert sorted(fleet.charge_points) == ['FLEET000', 'FLEET001', 'FLEET002', 'FLEET003', 'FLEET004']
+    assert fleet.summary['connected'] == 5
+    assert fleet.summary['boot_accepted'] == 5
+    assert all(not task.done() for task in fleet.tasks.values())
+    assert fleet.latencies.histograms['BootNotification'].count == 5
+    assert fleet.latencies.histograms['StatusNotification'].count == 5
+
+    await fleet.stop()
+    server.close()
+    await server.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_fleet_counts_failed_connections():
+    fleet = Fleet('0.0.0.0:9001', 3)
+
+    summary = await fleet.run(duration=0)
+    assert summary['started'] == 3
+    assert summary['failed'] == 3
+    assert summary['connected'] == 0
+
+
+def test_shard_ranges_cover_the_whole_id_range():
+    assert shard_ranges(10, 3) == [(0, 4), (4, 3), (7, 3)]
+    assert shard_ranges(10, 3, first_id=100) == [(100, 4), (104, 3), (107, 3)]
+    assert shard_ranges(2, 8) == [(0, 1), (1, 1)]
+
+
+def test_shard_config_splits_the_budgets_of_the_machine():
+    config = FleetConfig(concurrency=500, connect_rate=100, seed=7, record='traffic.log', meter_interval=60)
+    shard = shard_config(config, 1, 50, 0.5)
+    assert (shard.first_id, shard.concurrency, shard.connect_rate) == (50, 250, 50)
+    assert (shard.seed, shard.record, shard.metrics_port) == (8, 'traffic.log.1', None)
+    assert shard.meter_interval == 60
+    # Keyword arguments of the fleet replace the settings of its config
+    assert Fleet('0.0.0.0:9000', 1, config, meter_interval=None).meter is None
+
+
+@pytest.mark.asyncio
+async def test_run_sharded_merges_worker_summaries():
+    server = await start_central_system()
+    loop = asyncio.get_running_loop()
+
+    summary, latencies = await loop.run_in_executor(
+        None, functools.partial(run_sharded, '0.0.0.0:9000', 6, workers=2, duration=0)
+    )
+    assert summary['workers'] == 2
+    assert summary['connected'] == 6
+    assert summary['boot_accepted'] == 6
+    assert latencies.histograms['BootNotification'].count == 6
+
+    server.close()
+    await server.wait_closed()
@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+from .central_system import start_central_system
+from .conftest import FakeChargePoint
+from ocpp_simulator.cp_management.clock import DiscreteClock
+from ocpp_simulator.cp_management.fleet import Fleet
+from ocpp_simulator.cp_management.heartbeat import HeartbeatScheduler
+
+
+@pytest.mark.asyncio
+async def test_charge_points_beat_at_their_interval_without_a_task_each():
+    # Simulated time, the gaps do not depend on the load of the machine
+    clock = DiscreteClock(lookahead=0)
+    scheduler = HeartbeatScheduler(jitter=0.2, seed=1, clock=clock)
+    charge_points = [FakeChargePoint(f'CP{index}', clock=clock) for index in range(200)]
+    tasks = len(asyncio.all_tasks())
+    for cp in charge_points:
+        scheduler.add(cp, 0.1)
+    # The runner of the clock only
+    assert len(asyncio.all_tasks()) == tasks + 1
+
+    await clock.sleep(0.55)
+    await scheduler.stop()
+    await clock.stop()
+    for cp in charge_points:
+        # One beat in the first interval, then one every 80 to 100ms
+        assert 5 <= len(cp.beats) <= 7
+        gaps = [later - earlier for earlier, later in zip(cp.beats, cp.beats[1:])]
+        assert all(0.07 < gap < 0.12 for gap in gaps)
+    assert scheduler.report['heartbeats'] == sum(len(cp.beats) for cp in charge_points)
+
+
+@pytest.mark.asyncio
+async def test_first_beats_are_spread_over_the_interval():
+    scheduler = HeartbeatScheduler(seed=2)
+    charge_points = [FakeChargePoint(f'CP{index}') for index in range(100)]
+    started_at = asyncio.get_running_loop().time()
+    for cp in charge_points:
+        scheduler.add(cp, 0.2)
+
+    await asyncio.sleep(0.1)
+    await scheduler.stop()
+    assert 25 < sum(1 for cp in charge_points if cp.beats) < 75
+    assert all(cp.beats[0] - started_at < 0.11 for cp in charge_points if cp.beats)
+
+
+@pytest.mark.asyncio
+async def test_offline_and_removed_charge_points_stop_beating():
+    scheduler = HeartbeatScheduler(seed=3)
+    closed, offline = FakeChargePoint('closed', closed=True), FakeChargePoint('offline', online=False)
+    removed, kept = FakeChargePoint('removed'), FakeChargePoint('kept')
+    for cp in (closed, offline, removed, kept):
+        scheduler.add(cp, 0.05)
+    scheduler.remove(removed)
+
+    await asyncio.sleep(0.2)
+    assert len(scheduler) == 3
+    assert scheduler.report['heartbeats_failed'] >= 3
+    assert not removed.beats
+    assert not offline.beats
+    assert kept.beats
+
+    # Back online, the charge point beats again at the same interval
+    offline.online = True
+    await asyncio.sleep(0.1)
+    assert offline.beats
+    await scheduler.stop()
+
+
+@pytest.mark.asyncio
+async def test_fleet_heartbeats_at_the_boot_interval():
+    server = await start_central_system()
+    fleet = Fleet('0.0.0.0:9000', 3, id_pattern='BEAT{:02d}')
+
+    await fleet.start()
+    assert len(fleet.heartbeats) == 3
+    assert all(entry.interval == 10 for entry in fleet.heartbeats._entries.values())
+
+    await fleet.stop()
+    assert len(fleet.heartbeats) == 0
+    server.close()
+    await server.wait_closed()
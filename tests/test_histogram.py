@@ -0,0 +1,42 @@
+import pytest
+
+from ocpp_simulator.cp_management.histogram import Histogram, LatencyRecorder, MAX_VALUE
+
+
+def test_percentiles_stay_within_bucket_precision():
+    histogram = Histogram()
+    for value in range(1, 100001):
+        histogram.record(value)
+
+    assert histogram.count == 100000
+    assert histogram.max == 100000
+    assert histogram.percentile(50) == pytest.approx(50000, rel=0.008)
+    assert histogram.percentile(99) == pytest.approx(99000, rel=0.008)
+    assert histogram.percentile(99.9) == pytest.approx(99900, rel=0.008)
+    assert histogram.percentile(100) == 100000
+    assert histogram.summary()['max'] == 100
+
+
+def test_out_of_range_values_are_clamped():
+    histogram = Histogram()
+    histogram.record(-5)
+    histogram.record(MAX_VALUE * 2)
+
+    assert histogram.percentile(0) == 0
+    assert histogram.max == MAX_VALUE
+
+
+def test_recorders_merge_through_dicts():
+    first, second = LatencyRecorder(), LatencyRecorder()
+    for _ in range(90):
+        first.record('Heartbeat', 0.001)
+    for _ in range(10):
+        second.record('Heartbeat', 0.2)
+    second.record('MeterValues', 0.05)
+
+    merged = LatencyRecorder().merge(first).merge(LatencyRecorder.from_dict(second.to_dict()))
+    summary = merged.summary()
+    assert summary['Heartbeat']['count'] == 100
+    assert summary['Heartbeat']['p50'] == pytest.approx(1, rel=0.01)
+    assert summary['Heartbeat']['p99'] == pytest.approx(200, rel=0.01)
+    assert summary['MeterValues']['max'] == pytest.approx(50)
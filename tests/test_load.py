@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+
+from .central_system import start_central_system
+from ocpp_simulator.cp_management.fleet import Fleet, merge_summary
+from ocpp_simulator.cp_management.load import OpenLoopGenerator, RateProfile, build_profile
+
+
+def test_rate_profiles():
+    linear = RateProfile.linear(100, duration=10, ramp=2)
+    assert linear.rate(1) == pytest.approx(50)
+    assert linear.rate(5) == pytest.approx(100)
+    assert linear.expected(2) == pytest.approx(100)
+    assert linear.expected(10) == pytest.approx(900)
+    assert linear.expected(20) == pytest.approx(900)
+
+    step = RateProfile.step(100, duration=4, steps=4)
+    assert [step.rate(second + 0.5) for second in range(4)] == pytest.approx([25, 50, 75, 100])
+    assert step.expected(4) == pytest.approx(250)
+
+    spike = build_profile('spike', 10, duration=10, ramp=1, peak=1000)
+    assert spike.rate(4) == pytest.approx(10)
+    assert spike.rate(5.5) == pytest.approx(1000)
+    assert spike.expected(10) == pytest.approx(9 * 10 + 1000)
+
+    assert RateProfile.constant(100, 10).scaled(0.25).expected(10) == pytest.approx(250)
+
+    with pytest.raises(ValueError):
+        build_profile('sawtooth', 10, 10)
+
+
+@pytest.mark.asyncio
+async def test_messages_in_flight_after_the_drain_are_cancelled():
+    class Stuck:
+        id = 'STUCK'
+
+    cancelled = []
+
+    async def send(cp):
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            cancelled.append(cp.id)
+            raise
+
+    generator = OpenLoopGenerator([Stuck()], send, RateProfile.constant(100, 0.05), drain=0.01)
+    report = await generator.run()
+    assert report['in_flight'] == report['sent'] > 0
+    assert len(cancelled) == report['sent']
+
+
+def test_merge_summary_keeps_maximums():
+    summary = merge_summary(merge_summary({'sent': 0, 'lag_ms_max': 0}, {'sent': 3, 'lag_ms_max': 7}),
+                            {'sent': 2, 'lag_ms_max': 5})
+    assert summary == {'sent': 5, 'lag_ms_max': 7}
+
+
+@pytest.mark.asyncio
+async def test_fleet_open_loop_load():
+    server = await start_central_system()
+    fleet = Fleet('0.0.0.0:9000', 4, load_action='Heartbeat', load_profile=RateProfile.constant(200, 0.5))
+
+    summary = await fleet.run()
+    assert summary['connected'] == 4
+    assert summary['load_target'] == 100
+    assert summary['load_sent'] == pytest.approx(100, abs=2)
+    assert summary['load_completed'] == summary['load_sent']
+    assert summary['load_failed'] == 0
+
+    server.close()
+    await server.wait_closed()
+
+
+def test_open_loop_load_needs_the_wall_clock():
+    with pytest.raises(ValueError):
+        Fleet('0.0.0.0:9000', 4, load_profile=RateProfile.constant(200, 0.5), clock_speed=0)
@@ -0,0 +1,86 @@
+import json
+
+import pytest
+
+from .central_system import start_central_system
+from .conftest import FakeChargePoint
+from ocpp_simulator.cp_management.fleet import Fleet
+from ocpp_simulator.cp_management.meter import MeterEngine, TAPER_SOC
+
+
+def test_power_is_held_then_tapers_off():
+    engine = MeterEngine(seed=1)
+    slot = engine.start_session(FakeChargePoint('CP1'), 1, max_power=11000, soc=0.5, capacity=50000)
+
+    engine.step(60)
+    assert 10600 < engine.power[slot] <= 11000
+    assert 175 < engine.energy[slot] < 184
+    assert 15 < engine.current[slot] < 17
+
+    while engine.soc[slot] < 0.95:
+        engine.step(60)
+    assert engine.power[slot] < 11000 * (1 - 0.95) / (1 - TAPER_SOC)
+    assert engine.energy[slot] == pytest.approx(50000 * (engine.soc[slot] - 0.5))
+
+
+def test_samples_are_packed_in_one_payload():
+    engine = MeterEngine(samples=3, seed=2)
+    cp = FakeChargePoint('CP1')
+    first = engine.start_session(cp, 1)
+    second = engine.start_session(cp, 2)
+
+    assert engine.step(10, 't1') == []
+    assert engine.step(10, 't2') == []
+    assert engine.step(10, 't3') == [first, second]
+
+    template, values = engine.payload(second)
+    payload = json.loads(template.render('id', *values))[3]
+    assert payload['evseId'] == 2
+    assert [meter_value['timestamp'] for meter_value in payload['meterValue']] == ['t1', 't2', 't3']
+    energies = [meter_value['sampledValue'][0]['value'] for meter_value in payload['meterValue']]
+    assert energies == sorted(energies)
+    assert len(payload['meterValue'][0]['sampledValue']) == 4
+    units = [sampled_value.get('unitOfMeasure') for sampled_value in payload['meterValue'][0]['sampledValue']]
+    assert units == [None, {'unit': 'W'}, {'unit': 'A'}, {'unit': 'V'}]
+
+
+def test_stopped_slots_are_reused():
+    engine = MeterEngine(seed=3)
+    cp = FakeChargePoint('CP1')
+    slot = engine.start_session(cp, 1, energy=1000)
+    assert engine.stop_session(slot, flush=False) == 1000
+    assert len(engine) == 0
+    assert engine.start_session(cp, 2) == slot
+    assert engine.energy[slot] == 0
+
+
+def test_the_energy_register_of_an_evse_runs_on():
+    engine = MeterEngine(seed=4)
+    cp = FakeChargePoint('CP1')
+    slots = [engine.start_session(cp, evse_id) for evse_id in (1, 2, 3)]
+    engine.step(600)
+    energy = engine.stop_session(slots[0], flush=False)
+    assert energy > 0
+    # The other sessions go on charging
+    others = [engine.energy[slot] for slot in slots[1:]]
+    assert engine.step(600) == [slots[2], slots[1]]
+    assert all(engine.energy[slot] > before for slot, before in zip(slots[1:], others))
+
+    slot = engine.start_session(cp, 1)
+    assert engine.energy[slot] == energy
+    engine.step(60)
+    assert engine.energy[slot] > energy
+
+
+@pytest.mark.asyncio
+async def test_fleet_streams_meter_values():
+    server = await start_central_system()
+    fleet = Fleet('0.0.0.0:9000', 3, id_pattern='METER{:02d}', meter_interval=0.05, meter_samples=2)
+
+    summary = await fleet.run(duration=0.4)
+    assert summary['meter_failed'] == 0
+    assert summary['meter_payloads'] >= 6
+    assert summary['meter_samples'] == 2 * summary['meter_payloads']
+
+    server.close()
+    await server.wait_closed()
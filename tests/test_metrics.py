@@ -0,0 +1,54 @@
+import asyncio
+
+import pytest
+import websockets
+
+from .central_system import ChargePoint as central_system
+from ocpp_simulator.cp_management import cp as Cp
+from ocpp_simulator.cp_management import metrics as Metrics
+
+
+def test_render_prometheus_text():
+    metrics = Metrics.Metrics(actions=['Heartbeat', 'Reset'])
+    slot = metrics.call_sent('Heartbeat')
+    metrics.call_done(slot, Metrics.CALL_RESULTS)
+    metrics.call_sent('Heartbeat')
+    metrics.call_received('Reset')
+    metrics.connected = 3
+
+    text = metrics.render()
+    assert 'ocpp_simulator_calls_sent_total{action="Heartbeat"} 2' in text
+    assert 'ocpp_simulator_call_results_total{action="Heartbeat"} 1' in text
+    assert 'ocpp_simulator_in_flight{action="Heartbeat"} 1' in text
+    assert 'ocpp_simulator_calls_received_total{action="Reset"} 1' in text
+    assert 'ocpp_simulator_connected_charge_points 3' in text
+    assert '# TYPE ocpp_simulator_in_flight gauge' in text
+
+
+@pytest.mark.asyncio
+async def test_metrics_server_exposes_inbound_calls():
+    metrics = Cp.ChargePoint.metrics
+    received = metrics.value('Reset', Metrics.CALLS_RECEIVED)
+    server = await Cp.start_cp()
+    metrics_server = await Metrics.start_metrics_server(metrics, port=9101)
+    async with websockets.connect(
+        'ws://0.0.0.0:9000/123',
+        subprotocols=['ocpp2.0.1']
+    ) as ws:
+        cp = central_system('123', ws)
+        task = asyncio.get_running_loop().create_task(cp.start())
+        await cp.send_reset()
+
+        reader, writer = await asyncio.open_connection('127.0.0.1', 9101)
+        writer.write(b'GET /metrics HTTP/1.1\r\nHost: localhost\r\n\r\n')
+        response = (await reader.read()).decode('utf-8')
+        writer.close()
+
+        assert response.startswith('HTTP/1.1 200 OK')
+        assert f'ocpp_simulator_calls_received_total{{action="Reset"}} {received + 1}' in response
+        assert 'ocpp_simulator_connected_charge_points 1' in response
+        task.cancel()
+
+    metrics_server.close()
+    server.close()
+    await server.wait_closed()
@@ -0,0 +1,84 @@
+import asyncio
+import json
+import random
+
+import pytest
+import websockets
+from ocpp.exceptions import InternalError
+
+from ocpp_simulator.cp_management import cp as Cp
+from ocpp_simulator.cp_management.mock_csms import Latency, MockBehaviour, start_central_system
+from ocpp_simulator.cp_management.registry import StationRegistry
+
+
+def test_latency_specs():
+    rng = random.Random(1)
+    assert Latency('0').sample(rng) == 0
+    assert Latency('25').sample(rng) == 0.025
+    assert 0.01 <= Latency('uniform:10:20').sample(rng) <= 0.02
+    samples = [Latency('exp:5').sample(rng) for _ in range(5000)]
+    assert 0.0045 < sum(samples) / len(samples) < 0.0055
+    samples = sorted(Latency('lognormal:5:0.5').sample(rng) for _ in range(5001))
+    assert 0.0045 < samples[2500] < 0.0055
+    for spec in ('normal:5', 'uniform:5', 'exp:0', 'fast'):
+        with pytest.raises(ValueError):
+            Latency(spec)
+
+
+def test_behaviour_per_action():
+    behaviour = MockBehaviour.from_dict({
+        'latency': '10',
+        'error_rate': 0.5,
+        'actions': {'Heartbeat': {'error_rate': 0}, 'BootNotification': {'latency': 'uniform:100:200'}},
+    }, seed=3)
+    assert behaviour.policy('Heartbeat').latency.spec == '10'
+    assert behaviour.policy('BootNotification').error_rate == 0.5
+    assert behaviour.policy('Authorize') is behaviour.default
+
+    assert not any(behaviour.draw('Heartbeat')[1] for _ in range(100))
+    failures = sum(behaviour.draw('Authorize')[1] for _ in range(1000))
+    assert 400 < failures < 600
+    assert behaviour.report['csms_calls'] == 1100
+    assert behaviour.report['csms_errors_injected'] == failures
+    with pytest.raises(ValueError):
+        MockBehaviour(error_rate=2)
+
+
+@pytest.mark.asyncio
+async def test_delayed_answers_do_not_hold_up_the_next_ones():
+    behaviour = MockBehaviour(actions={'Heartbeat': {'latency': '200'}})
+    registry = StationRegistry()
+    server = await start_central_system('127.0.0.1', 9011, backlog=10, behaviour=behaviour, registry=registry)
+    ws = await websockets.connect('ws://127.0.0.1:9011/MOCK1', subprotocols=['ocpp2.0.1'])
+    await asyncio.sleep(0.05)
+    assert list(registry.ids()) == ['MOCK1']
+
+    await ws.send(json.dumps([2, 'beat', 'Heartbeat', {}]))
+    await ws.send(json.dumps([2, 'status', 'StatusNotification', {
+        'timestamp': '2024-01-01T00:00:00Z', 'connectorStatus': 'Available', 'evseId': 1, 'connectorId': 1}]))
+    answers = [json.loads(await ws.recv())[1] for _ in range(2)]
+    assert answers == ['status', 'beat']
+
+    await ws.close()
+    server.close()
+    await server.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_injected_errors():
+    behaviour = MockBehaviour(actions={'Authorize': {'error_rate': 1}})
+    server = await start_central_system('127.0.0.1', 9011, backlog=10, behaviour=behaviour,
+                                        registry=StationRegistry())
+    ws = await websockets.connect('ws://127.0.0.1:9011/MOCK2', subprotocols=['ocpp2.0.1'])
+    cp = Cp.ChargePoint('MOCK2', ws)
+    task = asyncio.ensure_future(cp.start())
+
+    assert (await cp.call(Cp.call.HeartbeatPayload(), suppress=False)).current_time
+    with pytest.raises(InternalError):
+        await cp.call(Cp.call.AuthorizePayload(id_token={'idToken': '1234', 'type': 'ISO14443'}), suppress=False)
+    assert behaviour.report == {'csms_calls': 2, 'csms_errors_injected': 1}
+
+    task.cancel()
+    await ws.close()
+    server.close()
+    await server.wait_closed()
@@ -0,0 +1,95 @@
+import asyncio
+import json
+
+import pytest
+from ocpp.v201 import call
+
+from .central_system import start_central_system
+from .conftest import FakeChargePoint
+from ocpp_simulator.cp_management import cp as Cp
+from ocpp_simulator.cp_management.fleet import Fleet
+from ocpp_simulator.cp_management.offline import OfflineQueue
+
+
+@pytest.mark.asyncio
+async def test_frames_are_replayed_in_order(tmp_path):
+    queue = OfflineQueue(str(tmp_path / 'offline.log'))
+    for index in range(3):
+        queue.append('CP1', f'id{index}', 'MeterValues', f'[2,"id{index}","MeterValues",{{}}]')
+    queue.append('CP2', 'other', 'TransactionEvent', '[2,"other","TransactionEvent",{}]')
+    assert len(queue) == 4
+    assert queue.pending('CP1') == 3
+
+    cp = FakeChargePoint('CP1')
+    assert await queue.replay(cp) == 3
+    assert [unique_id for _, unique_id, _ in cp.frames] == ['id0', 'id1', 'id2']
+    assert queue.pending('CP1') == 0
+    assert len(queue) == 1
+    queue.close()
+
+
+@pytest.mark.asyncio
+async def test_unacknowledged_frames_survive_a_restart(tmp_path):
+    path = str(tmp_path / 'offline.log')
+    queue = OfflineQueue(path)
+    queue.append('CP1', 'a', 'MeterValues', '[2,"a","MeterValues",{}]')
+    queue.append('CP1', 'b', 'MeterValues', '[2,"b","MeterValues",{}]')
+    queue.append('CP2', 'c', 'MeterValues', '[2,"c","MeterValues",{}]')
+    await queue.replay(FakeChargePoint('CP2'))
+    queue.close()
+
+    queue = OfflineQueue(path)
+    assert len(queue) == 2
+    cp = FakeChargePoint('CP1')
+    await queue.replay(cp)
+    assert [unique_id for _, unique_id, _ in cp.frames] == ['a', 'b']
+    queue.close()
+    # Nothing pending, the log is emptied
+    assert (tmp_path / 'offline.log').stat().st_size == 0
+
+
+@pytest.mark.asyncio
+async def test_offline_charge_point_queues_transaction_events(tmp_path):
+    queue = OfflineQueue(str(tmp_path / 'offline.log'))
+    cp = Cp.ChargePoint('OFFLINE1', None)
+    cp.online = False
+    cp.offline_queue = queue
+
+    assert await cp.call(call.TransactionEventPayload(
+        event_type='Updated', timestamp='now', trigger_reason='MeterValuePeriodic', seq_no=1,
+        transaction_info={'transactionId': 'tx'})) is None
+    fake = FakeChargePoint('OFFLINE1')
+    await queue.replay(fake)
+    action, unique_id, frame = fake.frames[0]
+    assert action == 'TransactionEvent'
+    assert json.loads(frame)[1] == unique_id
+    assert json.loads(frame)[3]['offline'] is True
+    queue.close()
+
+
+@pytest.mark.asyncio
+async def test_fleet_reconnects_and_replays(tmp_path):
+    server = await start_central_system()
+    fleet = Fleet('0.0.0.0:9000', 3, id_pattern='BACK{:02d}', meter_interval=0.05, backoff_base=0.05,
+                  backoff_max=0.2, offline_queue=str(tmp_path / 'offline.log'), replay_rate=1000)
+    await fleet.start()
+
+    server.close()
+    await server.wait_closed()
+    await asyncio.sleep(0.3)
+    assert not any(cp.online for cp in fleet.charge_points.values())
+    assert len(fleet.offline_queue) > 0
+
+    server = await start_central_system()
+    for _ in range(50):
+        await asyncio.sleep(0.1)
+        if all(cp.online for cp in fleet.charge_points.values()):
+            break
+    assert fleet.summary['disconnected'] == 3
+    assert fleet.summary['reconnected'] == 3
+    assert len(fleet.offline_queue) == 0
+
+    await fleet.stop()
+    assert fleet.summary['offline_replayed'] == fleet.summary['offline_queued'] > 0
+    server.close()
+    await server.wait_closed()
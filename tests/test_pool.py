@@ -0,0 +1,24 @@
+import uuid
+
+from ocpp_simulator.cp_management.pool import ValuePool
+
+
+def test_values_stay_in_range():
+    pool = ValuePool(seed=1, size=64)
+    for _ in range(200):
+        assert 3 <= pool.integer(3, 7) <= 7
+        assert 1 <= len(pool.string(1, 12)) <= 12
+        assert 1 <= pool.decimal(1, 100) <= 100
+        assert uuid.UUID(pool.uuid()).version == 4
+        assert 0 <= pool.uniform() < 1
+    assert pool.url().startswith('https://')
+
+
+def test_same_seed_gives_same_values():
+    first, second = ValuePool(seed=42, size=16), ValuePool(seed=42, size=16)
+    assert [first.string(1, 36) for _ in range(50)] == [second.string(1, 36) for _ in range(50)]
+
+    first.seed(7)
+    second.seed(7)
+    assert [first.uuid() for _ in range(20)] == [second.uuid() for _ in range(20)]
+    assert first.integer() == second.integer()
@@ -0,0 +1,51 @@
+import asyncio
+
+import pytest
+import websockets
+
+from .central_system import start_central_system
+from ocpp_simulator.cp_management import cp as Cp
+from ocpp_simulator.cp_management.providers import FixedProvider, RandomProvider, ValueProvider, choice_values
+
+
+def test_choice_values_accepts_enums_and_plain_strings():
+    assert choice_values(Cp.enums.RegistrationStatusType) == ['Accepted', 'Pending', 'Rejected']
+    assert choice_values(('FirmwareUpdated', 'ResetOrReboot')) == ['FirmwareUpdated', 'ResetOrReboot']
+
+
+def test_providers_implement_value_and_choice():
+    class ValuesOnly(ValueProvider):
+        async def value(self, field: str, question: str, default):
+            return default()
+
+    with pytest.raises(TypeError):
+        ValuesOnly()
+
+
+@pytest.mark.asyncio
+async def test_fixed_provider_falls_back_for_missing_fields():
+    provider = FixedProvider({'model': 'Model T', 'reason_type': 'PowerUp'}, RandomProvider(seed=1))
+
+    assert await provider.value('model', 'Enter charge point model', lambda: 'random') == 'Model T'
+    assert await provider.value('vendor_name', 'Enter charge point vendor name', lambda: 'random') == 'random'
+    assert await provider.choice('reason_type', Cp.enums.BootReasonType, 'Which reason type:') == 'PowerUp'
+    assert await provider.choice('connector_status', Cp.enums.ConnectorStatusType,
+                                 'Which connector status type:') in choice_values(Cp.enums.ConnectorStatusType)
+
+
+@pytest.mark.asyncio
+async def test_every_message_is_sent_without_prompts():
+    server = await start_central_system()
+    async with websockets.connect(
+        'ws://0.0.0.0:9000/123',
+        subprotocols=['ocpp2.0.1']
+    ) as ws:
+        cp = Cp.ChargePoint('123', ws, provider=RandomProvider(seed=42))
+        task = asyncio.get_running_loop().create_task(cp.start())
+
+        for message in cp.messages.values():
+            await message(cp)
+
+        task.cancel()
+    server.close()
+    await server.wait_closed()
@@ -0,0 +1,94 @@
+import asyncio
+import json
+
+import pytest
+
+from ocpp_simulator.cp_management.fleet import Fleet
+from ocpp_simulator.cp_management.mock_csms import MockBehaviour, start_central_system
+from ocpp_simulator.cp_management.recording import RECEIVED, SENT, TrafficRecorder, merge_records, read_records
+from ocpp_simulator.cp_management.registry import StationRegistry
+from ocpp_simulator.cp_management.replay import TrafficReplayer
+
+
+@pytest.mark.asyncio
+async def test_records_are_batched_and_streamed_back(tmp_path):
+    path = str(tmp_path / 'traffic.log')
+    recorder = TrafficRecorder(path, flush_interval=10, batch_size=2)
+    recorder.start()
+    recorder.record('CP1', SENT, '[2,"a","Heartbeat",{}]')
+    assert recorder.report['frames_recorded'] == 0
+    recorder.record('CP1', RECEIVED, '[3,"a",{"currentTime":"2024-01-01T00:00:00Z"}]')
+    await asyncio.sleep(0.05)
+    # The first two frames filled a batch
+    assert recorder.report['frames_recorded'] == 2
+    recorder.record('CP2', SENT, '[2,"b","Heartbeat",{}]')
+    await recorder.close()
+    assert recorder.report['frames_recorded'] == 3
+
+    records = list(read_records(path))
+    assert [(record.cp_id, record.direction) for record in records] == [('CP1', SENT), ('CP1', RECEIVED), ('CP2', SENT)]
+    assert records[0].frame == '[2,"a","Heartbeat",{}]'
+    assert records[0].timestamp <= records[1].timestamp <= records[2].timestamp
+
+    # A torn last record is left out
+    with open(path, 'ab') as log:
+        log.write(b'\x00\x00\x01\x00')
+    assert len(list(read_records(path))) == 3
+
+
+@pytest.mark.asyncio
+async def test_logs_are_merged_in_time_order(tmp_path):
+    paths = [str(tmp_path / 'traffic.log.0'), str(tmp_path / 'traffic.log.1')]
+    recorders = [TrafficRecorder(path) for path in paths]
+    for index in range(4):
+        recorders[index % 2].record(f'CP{index}', SENT, '[2,"a","Heartbeat",{}]')
+    for recorder in recorders:
+        await recorder.close()
+    assert [record.cp_id for record in merge_records(paths)] == ['CP0', 'CP1', 'CP2', 'CP3']
+
+
+@pytest.mark.asyncio
+async def test_recorded_fleet_is_replayed(tmp_path):
+    path = str(tmp_path / 'traffic.log')
+    behaviour = MockBehaviour()
+    server = await start_central_system('127.0.0.1', 9012, behaviour=behaviour, registry=StationRegistry())
+    fleet = Fleet('127.0.0.1:9012', 3, id_pattern='REC{}', record=path)
+    await fleet.run(0.1)
+    assert fleet.summary['frames_recorded'] > 0
+
+    calls = [json.loads(record.frame) for record in read_records(path) if record.direction == SENT]
+    actions = [frame[2] for frame in calls]
+    assert actions.count('BootNotification') == 3
+    answered = {json.loads(record.frame)[1] for record in read_records(path) if record.direction == RECEIVED}
+    assert {frame[1] for frame in calls} <= answered
+
+    behaviour.report.clear()
+    replayer = TrafficReplayer(path, '127.0.0.1:9012', speed=0)
+    report = await replayer.run()
+    assert report['replayed'] == len(calls)
+    assert report['handshakes'] == 3
+    assert behaviour.report['csms_calls'] == len(calls)
+
+    server.close()
+    await server.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_replay_keeps_the_recorded_pace(tmp_path):
+    path = str(tmp_path / 'traffic.log')
+    recorder = TrafficRecorder(path)
+    recorder.record('PACE', SENT, '[2,"a","Heartbeat",{}]')
+    await asyncio.sleep(0.3)
+    recorder.record('PACE', SENT, '[2,"b","Heartbeat",{}]')
+    await recorder.close()
+    server = await start_central_system('127.0.0.1', 9012, registry=StationRegistry())
+
+    loop = asyncio.get_running_loop()
+    for speed, shortest, longest in ((1, 0.3, 1), (10, 0.03, 0.25)):
+        started_at = loop.time()
+        report = await TrafficReplayer(path, '127.0.0.1:9012', speed=speed).run()
+        assert report['replayed'] == 2
+        assert shortest <= loop.time() - started_at < longest
+
+    server.close()
+    await server.wait_closed()
@@ -0,0 +1,50 @@
+import asyncio
+
+import pytest
+import websockets
+
+from .central_system import ChargePoint as central_system
+from .conftest import FakeChargePoint
+from ocpp_simulator.cp_management import cp as Cp
+from ocpp_simulator.cp_management import metrics as Metrics
+from ocpp_simulator.cp_management.registry import StationRegistry
+
+
+def test_a_reconnected_station_replaces_the_previous_one():
+    registry = StationRegistry()
+    first, second = FakeChargePoint('CP1'), FakeChargePoint('CP1')
+    registry.add(first)
+    registry.add(second)
+    registry.remove(first)
+    assert registry['CP1'] is second
+    registry.remove(second)
+    assert 'CP1' not in registry
+    assert len(registry) == 0
+
+
+@pytest.mark.asyncio
+async def test_server_registers_connected_stations():
+    registry = StationRegistry()
+    server = await Cp.start_cp('127.0.0.1', 9010, backlog=10, registry=registry)
+    connections = [
+        await websockets.connect(f'ws://127.0.0.1:9010/REG{index}', subprotocols=['ocpp2.0.1'])
+        for index in range(3)
+    ]
+    await asyncio.sleep(0.05)
+    assert sorted(registry.ids()) == ['REG0', 'REG1', 'REG2']
+
+    cs = central_system('REG1', connections[1])
+    task = asyncio.ensure_future(cs.start())
+    assert (await cs.send_reset()).status == 'Accepted'
+    assert registry.get('REG1').metrics.value('Reset', Metrics.CALLS_RECEIVED) > 0
+    task.cancel()
+
+    await connections[0].close()
+    await asyncio.sleep(0.05)
+    assert sorted(registry.ids()) == ['REG1', 'REG2']
+
+    for connection in connections[1:]:
+        await connection.close()
+    server.close()
+    await server.wait_closed()
+    assert len(registry) == 0
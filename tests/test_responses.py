@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+import websockets
+from ocpp.exceptions import InternalError
+from ocpp.v201 import call
+
+from .central_system import ChargePoint as central_system
+from ocpp_simulator.cp_management import cp as Cp
+from ocpp_simulator.cp_management.responses import ACCEPT, ERROR, REJECT, ResponsePolicies, ResponsePolicy
+from ocpp_simulator.cp_management.transport import reject_status
+
+
+def test_actions_accepted_at_once_are_resolved_to_none():
+    policies = ResponsePolicies(actions={'Reset': {'reject': 0.5}, 'GetLog': {'accept': 1}})
+    assert policies.draw('Reset') is not None
+    assert policies.draw('GetLog') is None
+    assert policies.draw('TriggerMessage') is None
+
+
+def test_ratios_are_weights():
+    policy = ResponsePolicy(accept=2, reject=1, error=1)
+    assert (policy.reject, policy.error) == (0.25, 0.5)
+    # Accept is what the others leave
+    assert ResponsePolicy(reject=0.1).error == pytest.approx(0.1)
+    with pytest.raises(ValueError):
+        ResponsePolicy(reject=-1)
+    with pytest.raises(ValueError):
+        ResponsePolicies.from_dict({'actions': {'Reset': {'rejects': 0.1}}})
+
+
+def test_draws_follow_the_ratios():
+    policies = ResponsePolicies({'delay': '5'}, {'Reset': {'reject': 0.2, 'error': 0.1}}, seed=1)
+    outcomes = [policies.draw('Reset', 'Rejected')[0] for _ in range(10000)]
+    assert outcomes.count(REJECT) == pytest.approx(2000, rel=0.1)
+    assert outcomes.count(ERROR) == pytest.approx(1000, rel=0.1)
+    assert outcomes.count(ACCEPT) + policies.report['replies_rejected'] + policies.report['replies_failed'] == 10000
+    # The default applies to every other action
+    assert policies.draw('GetLog') == (ACCEPT, 0.005, None)
+    assert policies.report['replies_delayed'] == 10001
+
+
+def test_reject_status_of_the_handlers():
+    handler = Cp.ChargePoint(None, None)
+    assert reject_status(handler.on_reset) == 'Rejected'
+    assert reject_status(handler.on_unlock_connector) == 'UnlockFailed'
+    assert reject_status(handler.on_cost_updated) is None
+
+
+@pytest.mark.asyncio
+async def test_charge_points_follow_the_policies():
+    Cp.ChargePoint.responses = ResponsePolicies(actions={
+        'Reset': {'reject': 1},
+        'DataTransfer': {'error': 1},
+        'GetBaseReport': {'delay': '50'},
+        'UnlockConnector': {'reject': 1},
+        'CostUpdated': {'reject': 1},
+    })
+    server = await Cp.start_cp()
+    try:
+        async with websockets.connect('ws://127.0.0.1:9000/RESP1', subprotocols=['ocpp2.0.1']) as ws:
+            cs = central_system('RESP1', ws)
+            task = asyncio.ensure_future(cs.start())
+
+            assert (await cs.send_reset()).status == 'Rejected'
+            with pytest.raises(InternalError):
+                await cs.call(call.DataTransferPayload(vendor_id='test'), suppress=False)
+            delayed = asyncio.ensure_future(cs.send_get_base_report())
+            await asyncio.sleep(0)
+            assert not delayed.done()
+            assert (await delayed).status == 'Accepted'
+            # The closest status of the action when it has no Rejected
+            assert (await cs.send_unlock_connector()).status == 'UnlockFailed'
+            # Accepted and counted so when the reply has no status at all
+            await cs.call(call.CostUpdatedPayload(total_cost=1.5, transaction_id='T1'))
+            assert Cp.ChargePoint.responses.report['replies_rejected'] == 2
+
+            task.cancel()
+    finally:
+        Cp.ChargePoint.responses = None
+        server.close()
+        await server.wait_closed()
@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+import websockets
+
+from .central_system import start_central_system
+from ocpp_simulator.cp_management import cp as Cp
+from ocpp_simulator.cp_management.fleet import Fleet
+from ocpp_simulator.cp_management.scenario import compile_scenario, run_scenario
+
+
+STATION_DAY = {
+    'name': 'station day',
+    'values': {'evse_id': 1, 'connector_id': 1},
+    'steps': [
+        {'send': 'BootNotification', 'values': {'reason_type': 'PowerUp'}},
+        {'send': 'StatusNotification', 'values': {'connector_status': 'Available'}},
+        {'send': 'Authorize'},
+        {'send': 'TransactionEvent', 'values': {'event_type': 'Started'}},
+        {'send': 'Meter Value', 'every': 0.01, 'repeat': 3},
+        {'wait': 0.01},
+        {'send': 'TransactionEvent', 'values': {'event_type': 'Ended'}},
+    ]
+}
+
+
+def test_compile_scenario_builds_a_schedule():
+    scenario = compile_scenario(STATION_DAY)
+
+    assert len(scenario) == 8
+    assert [step.action for step in scenario.schedule][4:7] == ['Meter Value'] * 3
+    assert [step.at for step in scenario.schedule][4:] == pytest.approx([0, 0.01, 0.02, 0.04])
+    assert scenario.duration == pytest.approx(0.04)
+    # Steps with the same values share a provider
+    assert scenario.schedule[4].provider is scenario.schedule[5].provider
+
+
+def test_compile_scenario_rejects_unknown_messages():
+    with pytest.raises(ValueError):
+        compile_scenario({'steps': [{'send': 'Teleport'}]})
+
+
+@pytest.mark.asyncio
+async def test_run_scenario():
+    server = await start_central_system()
+    async with websockets.connect(
+        'ws://0.0.0.0:9000/123',
+        subprotocols=['ocpp2.0.1']
+    ) as ws:
+        cp = Cp.ChargePoint('123', ws)
+        task = asyncio.get_running_loop().create_task(cp.start())
+        provider = cp.provider
+
+        responses = await run_scenario(cp, compile_scenario(STATION_DAY))
+        assert responses[0].status == 'Accepted'
+        assert len(responses) == 8
+        assert cp.provider is provider
+
+        task.cancel()
+    server.close()
+    await server.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_fleet_plays_scenario():
+    server = await start_central_system()
+    fleet = Fleet('0.0.0.0:9000', 3, scenario=compile_scenario(STATION_DAY))
+
+    summary = await fleet.run()
+    assert summary['connected'] == 3
+    assert summary['scenario_completed'] == 3
+
+    server.close()
+    await server.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_fleet_counts_failed_scenarios():
+    server = await start_central_system()
+    broken = {'steps': [{'send': 'StatusNotification', 'values': {'evse_id': 'first'}}]}
+    fleet = Fleet('0.0.0.0:9000', 2, scenario=compile_scenario(broken))
+
+    summary = await fleet.run()
+    assert summary['scenario_failed'] == 2
+    assert summary['scenario_completed'] == 0
+
+    server.close()
+    await server.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_fleet_plays_scenario_on_simulated_time():
+    server = await start_central_system()
+    day = {'steps': [{'send': 'Heartbeat', 'every': 3600, 'repeat': 24}]}
+    fleet = Fleet('0.0.0.0:9000', 2, scenario=compile_scenario(day), clock_speed=0)
+
+    summary = await asyncio.wait_for(fleet.run(), 5)
+    assert summary['scenario_completed'] == 2
+    assert fleet.clock.time() == 23 * 3600
+
+    server.close()
+    await server.wait_closed()
@@ -560,7 +560,7 @@ async def test_transaction_event(mock_typer, mock_ask_question):
         loop = asyncio.get_running_loop()
         loop.create_task(cp.start())
 
-        mock_typer.side_effect = [fake.pystr(1, 36), fake.pyint(1, 100)]
+        mock_typer.side_effect = [1, fake.pystr(1, 36), fake.pyint(1, 100)]
         mock_ask_question.side_effect = ["Started", "Authorized"]
         result = await cp.send_transaction_event()
         assert result.total_cost == 100
@@ -6,6 +6,7 @@ from faker import Faker
 
 from .central_system import ChargePoint as central_system
 from ocpp_simulator.cp_management import cp as Cp
+from ocpp_simulator.cp_management.transport import _constant_replies
 
 
 fake = Faker()
@@ -515,7 +516,7 @@ async def test_set_variable_monitoring():
 
         result = await cp.send_set_variable_monitoring()
         assert result.set_monitoring_result[0]['status'] == 'Accepted'
-        assert result.set_monitoring_result[0]['type'] == 'Delta'
+        assert result.set_monitoring_result[0]['type'] == 'Periodic'
 
         await cancel_tasks()
         server.close()
@@ -609,3 +610,23 @@ async def test_unpublish_firmware():
 #
 #         await cancel_tasks()
 #         server.close()
+
+
+@pytest.mark.asyncio
+async def test_constant_reply_built_once():
+    server = await Cp.start_cp()
+    async with websockets.connect(
+        f'ws://0.0.0.0:9000/123',
+        subprotocols=['ocpp2.0.1']
+    ) as ws:
+        cp = central_system('123', ws)
+        loop = asyncio.get_running_loop()
+        loop.create_task(cp.start())
+
+        for _ in range(3):
+            result = await cp.send_reset()
+            assert result.status == 'Accepted'
+        assert _constant_replies[Cp.ChargePoint.on_reset, None] == '{"status":"Accepted"}'
+
+        await cancel_tasks()
+        server.close()
@@ -0,0 +1,84 @@
+import sys
+
+import pytest
+
+from .central_system import start_central_system
+from ocpp_simulator.cp_management import cp as Cp
+from ocpp_simulator.cp_management.fleet import Fleet
+from ocpp_simulator.cp_management.station import AVAILABLE, OCCUPIED, RESERVED, UNAVAILABLE, Station
+
+
+def test_connectors_are_indexed_by_evse_and_connector_id():
+    station = Station((2, 1, 3))
+    assert station.evses == 3
+    assert [station.slot(1, 1), station.slot(1, 2), station.slot(2, 1), station.slot(3, 3)] == [0, 1, 2, 5]
+    assert station.slot(1, 3) is None
+    assert station.slot(4, 1) is None
+    assert station.slot(0, 1) is None
+    assert list(station.slots(3)) == [3, 4, 5]
+    assert list(station.slots()) == [0, 1, 2, 3, 4, 5]
+    assert station.status(3, 2) == 'Available'
+
+
+def test_availability_keeps_occupied_connectors():
+    station = Station((2, 1))
+    station.set_status(station.slot(1, 1), OCCUPIED)
+    station.set_operative(False)
+    assert list(station.statuses) == [OCCUPIED, UNAVAILABLE, UNAVAILABLE]
+
+    station.release(station.slot(1, 1))
+    assert station.statuses[0] == UNAVAILABLE
+    station.set_operative(True, evse_id=2)
+    assert list(station.statuses) == [UNAVAILABLE, UNAVAILABLE, AVAILABLE]
+    assert station.pop_changed() == [(1, 1), (1, 2), (2, 1)]
+    assert station.pop_changed() == []
+
+
+def test_reservations():
+    station = Station((1, 1))
+    assert station.reserve(7, evse_id=2) == 1
+    assert station.statuses[1] == RESERVED
+    assert station.reserve(8, evse_id=2) is None
+    assert station.cancel_reservation(7)
+    assert not station.cancel_reservation(7)
+    assert station.statuses[1] == AVAILABLE
+
+
+def test_station_stays_small():
+    station = Station((2, 2))
+    size = sys.getsizeof(station) + sum(sys.getsizeof(getattr(station, name)) for name in Station.__slots__)
+    assert size < 2048
+
+
+@pytest.mark.asyncio
+async def test_handlers_update_the_station():
+    cp = Cp.ChargePoint('STATION1', None, station=Station((1, 2)))
+
+    response = await cp.on_change_availability(operational_status='Inoperative', evse={'id': 2, 'connector_id': 2})
+    assert response.status == 'Accepted'
+    assert cp.station.status(2, 2) == 'Unavailable'
+    assert cp.station.status(2, 1) == 'Available'
+
+    assert (await cp.on_reserve_now(id=3, evse_id=2)).status == 'Accepted'
+    assert cp.station.status(2, 1) == 'Reserved'
+    assert (await cp.on_reserve_now(id=4, evse_id=2)).status == 'Occupied'
+    await cp.on_cancel_reservation(reservation_id=3)
+    assert cp.station.status(2, 1) == 'Available'
+
+    cp.station.set_status(cp.station.slot(1, 1), OCCUPIED)
+    assert (await cp.on_unlock_connector(evse_id=1, connector_id=1)).status == 'Unlocked'
+    assert cp.station.status(1, 1) == 'Available'
+
+
+@pytest.mark.asyncio
+async def test_fleet_notifies_every_connector():
+    server = await start_central_system()
+    fleet = Fleet('0.0.0.0:9000', 2, id_pattern='LAYOUT{:02d}', layout=(2, 1))
+
+    await fleet.start()
+    assert fleet.latencies.histograms['StatusNotification'].count == 6
+    assert all(cp.station.evses == 2 for cp in fleet.charge_points.values())
+
+    await fleet.stop()
+    server.close()
+    await server.wait_closed()
@@ -0,0 +1,62 @@
+import asyncio
+import json
+
+import pytest
+import websockets
+from ocpp.v201 import call
+
+from .central_system import start_central_system
+from ocpp_simulator.cp_management import cp as Cp
+from ocpp_simulator.cp_management import templates
+from ocpp_simulator.cp_management.metrics import CALL_RESULTS
+
+
+def test_rendered_frame_matches_serialized_call():
+    template = templates.FrameTemplate(
+        call.StatusNotificationPayload(timestamp='', connector_status='Available', evse_id=0, connector_id=0),
+        ('timestamp', 'connectorStatus', 'evseId', 'connectorId'),
+    )
+    frame = template.render('abc', '2023-01-01 10:00:00', 'Occupied', 2, 1)
+    assert json.loads(frame) == [2, 'abc', 'StatusNotification', {
+        'timestamp': '2023-01-01 10:00:00', 'connectorStatus': 'Occupied', 'evseId': 2, 'connectorId': 1,
+    }]
+
+
+def test_values_are_escaped():
+    template = templates.FrameTemplate(call.HeartbeatPayload())
+    assert json.loads(template.render('say "hi"\n')) == [2, 'say "hi"\n', 'Heartbeat', {}]
+
+
+def test_meter_values_template_is_cached():
+    template = templates.meter_values(('Energy.Active.Import.Register', 'Power.Active.Import'))
+    assert templates.meter_values(('Energy.Active.Import.Register', 'Power.Active.Import')) is template
+    payload = json.loads(template.render('1', 3, 'now', 1200.5, 7000))[3]
+    assert payload['evseId'] == 3
+    assert payload['meterValue'][0]['timestamp'] == 'now'
+    assert [sample['value'] for sample in payload['meterValue'][0]['sampledValue']] == [1200.5, 7000]
+
+
+def test_invalid_sample_payload_is_rejected():
+    with pytest.raises(Exception):
+        templates.FrameTemplate(call.StatusNotificationPayload(
+            timestamp='', connector_status='Unknown', evse_id=0, connector_id=0))
+
+
+@pytest.mark.asyncio
+async def test_call_template_gets_the_response():
+    server = await start_central_system()
+    async with websockets.connect('ws://localhost:9000/CP1', subprotocols=['ocpp2.0.1']) as ws:
+        cp = Cp.ChargePoint('CP1', ws)
+        task = asyncio.ensure_future(cp.start())
+        results = cp.metrics.value('Heartbeat', CALL_RESULTS)
+
+        response = await cp.call_template(templates.heartbeat())
+        assert 'currentTime' in response
+        assert cp.metrics.value('Heartbeat', CALL_RESULTS) == results + 1
+
+        response = await cp.call_template(templates.status_notification(), 'now', 'Available', 1, 1)
+        assert response == {}
+        task.cancel()
+
+    server.close()
+    await server.wait_closed()
@@ -0,0 +1,121 @@
+import asyncio
+
+import pytest
+
+from .central_system import start_central_system
+from .conftest import FakeChargePoint
+from ocpp_simulator.cp_management.clock import DiscreteClock
+from ocpp_simulator.cp_management.fleet import Fleet
+from ocpp_simulator.cp_management.meter import MeterEngine
+from ocpp_simulator.cp_management.pool import ValuePool
+from ocpp_simulator.cp_management.transactions import CHARGING, IDLE, TransactionDriver, TransactionTable
+
+
+def test_sequence_numbers_grow_within_a_transaction():
+    table = TransactionTable(ValuePool(seed=1))
+    slot = table.slot('CP1', 1)
+    assert table.slot('CP1', 1) == slot
+    assert table.slot('CP1', 2) != slot
+
+    transaction_id, seq_no = table.event(slot, 'Started')
+    assert seq_no == 0
+    assert table.states[slot] == CHARGING
+    assert table.event(slot, 'Updated') == (transaction_id, 1)
+    assert table.event(slot, 'Ended') == (transaction_id, 2)
+    assert table.states[slot] == IDLE
+
+    next_transaction_id, seq_no = table.event(slot, 'Started')
+    assert next_transaction_id != transaction_id
+    assert seq_no == 0
+
+
+def test_out_of_order_events_begin_a_new_transaction():
+    table = TransactionTable(ValuePool(seed=2))
+    slot = table.slot('CP1', 1)
+    transaction_id, seq_no = table.event(slot, 'Updated')
+    assert seq_no == 0
+    assert table.states[slot] == CHARGING
+    assert table.event(slot, 'Started')[0] != transaction_id
+
+
+@pytest.mark.asyncio
+async def test_driver_runs_whole_transactions():
+    table = TransactionTable(ValuePool(seed=3))
+    meter = MeterEngine(interval=0.01, seed=3)
+    driver = TransactionDriver(table, meter, update_interval=0.02, session_duration=0.1, idle_duration=0.02,
+                               seed=3)
+    charge_points = [FakeChargePoint(f'CP{index}') for index in range(20)]
+    for cp in charge_points:
+        driver.add(cp, 1)
+    meter.start()
+
+    await asyncio.sleep(0.4)
+    await driver.stop()
+    await meter.stop()
+    for cp in charge_points:
+        events = [(payload.event_type, payload.seq_no) for payload in cp.payloads]
+        started = [index for index, (event_type, _) in enumerate(events) if event_type == 'Started']
+        assert started and started[0] == 0
+        for index, (event_type, seq_no) in enumerate(events):
+            # Sequence numbers count the events since the last Started one
+            assert seq_no == index - max(start for start in started if start <= index)
+        ended = [payload for payload in cp.payloads if payload.event_type == 'Ended']
+        assert ended
+        assert ended[0].transaction_info['transactionId'] == cp.payloads[0].transaction_info['transactionId']
+        assert ended[0].meter_value[0]['sampledValue'][0]['value'] > 0
+    assert len(meter) == 0
+
+
+@pytest.mark.asyncio
+async def test_events_queued_offline_are_not_counted_as_sent():
+    clock = DiscreteClock()
+    driver = TransactionDriver(TransactionTable(ValuePool(seed=5)), update_interval=10, session_duration=60,
+                               idle_duration=10, seed=5, clock=clock)
+    online, offline = FakeChargePoint('CP1'), FakeChargePoint('CP2')
+    offline.online = False
+    driver.add(online, 1)
+    driver.add(offline, 1)
+
+    await clock.sleep(200)
+    await driver.stop()
+    assert offline.payloads and online.payloads
+    assert driver.report['transaction_events_queued'] == len(offline.payloads)
+    sent = sum(count for key, count in driver.report.items() if key.startswith('transactions_'))
+    assert sent == len(online.payloads)
+
+
+@pytest.mark.asyncio
+async def test_driver_occupies_the_connector_during_a_session():
+    clock = DiscreteClock()
+    driver = TransactionDriver(TransactionTable(ValuePool(seed=4)), update_interval=50, session_duration=100,
+                               idle_duration=10, seed=4, clock=clock)
+    cp = FakeChargePoint('CP1')
+    driver.add(cp, 1)
+
+    await clock.sleep(16)
+    assert [payload.event_type for payload in cp.payloads] == ['Started']
+    assert cp.station.status(1, 1) == 'Occupied'
+    assert cp.notified == ['Occupied']
+    while cp.payloads[-1].event_type != 'Ended':
+        await clock.sleep(1)
+    # Released before the next session starts
+    assert cp.station.status(1, 1) == 'Available'
+    assert cp.notified == ['Occupied', 'Available']
+    await driver.stop()
+    await clock.stop()
+
+
+@pytest.mark.asyncio
+async def test_fleet_sends_transaction_events():
+    server = await start_central_system()
+    fleet = Fleet('0.0.0.0:9000', 2, id_pattern='TX{:02d}', meter_interval=0.05, transaction_interval=0.05,
+                  session_duration=0.2, idle_duration=0.05)
+
+    summary = await fleet.run(duration=0.6)
+    assert summary['transactions_started'] >= 2
+    assert summary['transactions_updated'] >= 2
+    assert summary['transactions_ended'] >= 2
+    assert summary['transaction_events_failed'] == 0
+
+    server.close()
+    await server.wait_closed()
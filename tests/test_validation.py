@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+import websockets
+from ocpp.exceptions import FormatViolationError, ProtocolError
+from ocpp.messages import Call
+from ocpp.v201 import call
+
+from .central_system import start_central_system
+from ocpp_simulator.cp_management import cp as Cp
+from ocpp_simulator.cp_management import metrics as Metrics
+from ocpp_simulator.cp_management.validation import OFF, SAMPLED, ValidationPolicy
+
+INVALID = Call('1', 'StatusNotification', {'timestamp': 'now', 'connectorStatus': 'Bogus', 'evseId': 1,
+                                           'connectorId': 1})
+VALID = Call('2', 'Heartbeat', {})
+
+
+def test_always_validates():
+    policy = ValidationPolicy()
+    policy.validate(VALID)
+    with pytest.raises(FormatViolationError):
+        policy.validate(INVALID)
+    with pytest.raises(ProtocolError):
+        policy.validate(Call('3', 'StatusNotification', {}))
+    # One compiled validator per action and direction
+    assert len(policy._validators) == 2
+
+
+def test_sampled_validates_one_in_every():
+    policy = ValidationPolicy(SAMPLED, every=3)
+    failures = 0
+    for _ in range(9):
+        try:
+            policy.validate(INVALID)
+        except FormatViolationError:
+            failures += 1
+    assert failures == 3
+    # Counted per action
+    with pytest.raises(ProtocolError):
+        policy.validate(Call('3', 'Authorize', {}))
+
+
+def test_off_validates_nothing():
+    ValidationPolicy(OFF).validate(INVALID)
+    with pytest.raises(ValueError):
+        ValidationPolicy('sometimes')
+
+
+@pytest.mark.asyncio
+async def test_charge_point_follows_its_policy():
+    server = await start_central_system()
+    ws = await websockets.connect('ws://127.0.0.1:9000/VAL1', subprotocols=['ocpp2.0.1'])
+    cp = Cp.ChargePoint('VAL1', ws)
+    task = asyncio.ensure_future(cp.start())
+    payload = call.StatusNotificationPayload(timestamp='now', connector_status='Bogus', evse_id=1, connector_id=1)
+
+    sent = cp.metrics.value('StatusNotification', Metrics.CALLS_SENT)
+    errors = cp.metrics.value('StatusNotification', Metrics.CALL_ERRORS)
+    with pytest.raises(FormatViolationError):
+        await cp.call(payload)
+    assert cp.metrics.value('StatusNotification', Metrics.CALLS_SENT) == sent
+
+    # Sent as is, the central system rejects it
+    cp.validation = ValidationPolicy(OFF)
+    assert await cp.call(payload) is None
+    assert cp.metrics.value('StatusNotification', Metrics.CALL_ERRORS) == errors + 1
+    assert (await cp.call(call.HeartbeatPayload())).current_time
+
+    task.cancel()
+    await ws.close()
+    server.close()
+    await server.wait_closed()